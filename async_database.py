@@ -0,0 +1,96 @@
+"""
+Async facade over NotesDatabase.
+
+pymongo is synchronous, so every call is run in a bounded thread pool sized
+to the MongoDB connection pool. Handlers await these methods instead of
+blocking the event loop while a search is running.
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+
+from database import NotesDatabase
+
+
+class AsyncNotesDatabase:
+    """Awaitable wrapper around a NotesDatabase instance"""
+
+    def __init__(self, db: NotesDatabase, max_workers: Optional[int] = None):
+        self.db = db
+        # One worker per pooled connection - more threads would only queue on the pool
+        self.max_workers = max_workers or db.pool_size
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="notes-db")
+
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking database call in the executor"""
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context (the update's correlation ID) into the thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, context.run, functools.partial(func, *args, **kwargs))
+
+    async def search_notes(self, query: str, limit: int = 10, semester: Optional[str] = None) -> Dict:
+        return await self._run(self.db.search_notes, query, limit, semester)
+
+    async def get_semester_branches(self, semester: str) -> List[str]:
+        return await self._run(self.db.get_semester_branches, semester)
+
+    async def count_notes(self) -> int:
+        return await self._run(self.db.count_notes)
+
+    async def refresh_catalog_version(self) -> bool:
+        return await self._run(self.db.refresh_catalog_version)
+
+    async def reconcile_indexes(self) -> int:
+        return await self._run(self.db.reconcile_indexes)
+
+    async def warm_catalog(self) -> int:
+        return await self._run(self.db.warm_catalog)
+
+    async def ensure_snapshot(self) -> bool:
+        return await self._run(self.db.ensure_snapshot)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the executor threads"""
+        self._executor.shutdown(wait=wait)
+
+
+if __name__ == "__main__":
+    # Concurrency check: N parallel searches should take about max(latency), not sum(latency).
+    # Runs offline against a stand-in whose searches block for a fixed time, like a pymongo call.
+    import time
+
+    from search_common import build_partial_result
+
+    class SlowNotesDatabase:
+        pool_size = 8
+
+        def __init__(self, latencies: Dict[str, float]):
+            self.latencies = latencies
+
+        def search_notes(self, query: str, limit: int = 10, semester: Optional[str] = None) -> Dict:
+            time.sleep(self.latencies[query])
+            return build_partial_result([], query, 0)
+
+    async def run_check():
+        latencies = {"bcs301": 0.05, "dbms": 0.1, "data structures": 0.15, "4th sem": 0.2,
+                     "os": 0.05, "math": 0.1, "networks": 0.15, "xyz": 0.2}
+        db = AsyncNotesDatabase(SlowNotesDatabase(latencies))
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(db.search_notes(query) for query in latencies))
+        concurrent = time.perf_counter() - started
+        db.shutdown()
+
+        total, slowest = sum(latencies.values()), max(latencies.values())
+        assert [result["query"] for result in results] == list(latencies), "results out of order"
+        assert all(result["type"] == "none" for result in results), results
+        assert concurrent < slowest * 1.5, (
+            f"{len(latencies)} searches took {concurrent * 1000:.0f}ms, expected about "
+            f"max(latency)={slowest * 1000:.0f}ms (sum {total * 1000:.0f}ms)")
+        print(f"{len(latencies)} searches in {concurrent * 1000:.0f}ms: "
+              f"max(latency)={slowest * 1000:.0f}ms, sum(latency)={total * 1000:.0f}ms")
+
+    asyncio.run(run_check())
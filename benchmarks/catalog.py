@@ -0,0 +1,106 @@
+"""
+Synthetic VTU-style notes catalog and query mix for benchmarks.
+
+Subject codes look like BCS301 / 21CS51 / BAI405, spread over the six
+semesters and the branches the bot links to, with each subject offered in
+several branches just like the real catalog.
+"""
+
+import random
+from typing import List, Dict, Tuple
+
+SEMESTERS = ["Chemistrycycle", "Physicscycle", "Sem3", "Sem4", "Sem5", "Sem6"]
+BRANCHES = ["computerscience", "informationscience", "electronicsandcommunications", "aiml", "aids",
+            "electrical", "mechanical", "civil"]
+CODE_PREFIXES = ["B", "21", "22", "18"]
+DEPARTMENTS = ["CS", "IS", "EC", "AI", "AD", "MA", "PH", "CH", "EE", "ME", "CV", "BK"]
+
+SUBJECT_WORDS = [
+    "Data", "Structures", "Operating", "Systems", "Computer", "Networks", "Analysis", "Design",
+    "Algorithms", "Software", "Engineering", "Mathematics", "Digital", "Logic", "Machine",
+    "Learning", "Theory", "Computation", "Database", "Management", "Microcontrollers", "Cloud",
+    "Computing", "Artificial", "Intelligence", "Compiler", "Graphics", "Security", "Biology",
+    "Physics", "Chemistry", "Electronics", "Signals", "Control", "Communication", "Statistics",
+    "Probability", "Discrete", "Object", "Oriented", "Programming", "Python", "Java", "Web",
+    "Technologies", "Internet", "Things", "Embedded", "Principles", "Applied", "Fundamentals"
+]
+
+ABBREVIATION_QUERIES = ["math", "os", "cn", "dbms", "ds", "ada", "oops", "se", "coa", "mp", "dms"]
+SEMESTER_QUERIES = ["3rd sem", "4th sem", "sem 5", "6th semester", "chemistry cycle", "physics cycle"]
+MISS_QUERIES = ["xyzzy", "quantum basket weaving", "zz999", "lorem ipsum", "qwerty"]
+
+
+def generate_catalog(size: int, seed: int = 42) -> List[Dict]:
+    """Generate about `size` notes: subjects offered in 1-5 branches each"""
+    rnd = random.Random(seed)
+    notes = []
+    used_codes = set()
+
+    while len(notes) < size:
+        semester_index = rnd.randrange(len(SEMESTERS))
+        semester = SEMESTERS[semester_index]
+        semester_digit = max(semester_index + 1, 1)
+
+        code = None
+        while code is None or code in used_codes:
+            code = (f"{rnd.choice(CODE_PREFIXES)}{rnd.choice(DEPARTMENTS)}"
+                    f"{semester_digit}{rnd.randint(0, 9)}{rnd.randint(1, 9)}")
+            if rnd.random() < 0.2:
+                code += rnd.choice("ABCDE")
+        used_codes.add(code)
+
+        name = " ".join(rnd.sample(SUBJECT_WORDS, rnd.randint(2, 5)))
+        for branch in rnd.sample(BRANCHES, rnd.randint(1, 5)):
+            notes.append({
+                "subject_code": code,
+                "subject_name": name,
+                "branch_url": f"/{semester}/{branch}",
+                "semester": semester,
+                "branch": branch
+            })
+            if len(notes) >= size:
+                break
+
+    return notes
+
+
+def _typo(rnd: random.Random, text: str) -> str:
+    """Introduce a single swap, deletion or substitution"""
+    position = rnd.randrange(len(text) - 1)
+    edit = rnd.choice(("swap", "delete", "replace"))
+    if edit == "swap":
+        return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+    if edit == "delete":
+        return text[:position] + text[position + 1:]
+    return text[:position] + rnd.choice("abcdefghijklmnopqrstuvwxyz0123456789") + text[position + 1:]
+
+
+def generate_queries(notes: List[Dict], count: int, seed: int = 7) -> List[Tuple[str, str]]:
+    """A realistic (category, query) mix: mostly codes and names, some abbreviations,
+    semester phrases, typos and misses"""
+    rnd = random.Random(seed)
+    mix = [("code", 0.35), ("name", 0.20), ("partial", 0.10), ("abbreviation", 0.10),
+           ("semester", 0.10), ("typo", 0.10), ("miss", 0.05)]
+    categories = [category for category, _ in mix]
+    weights = [weight for _, weight in mix]
+
+    queries = []
+    for _ in range(count):
+        category = rnd.choices(categories, weights)[0]
+        note = rnd.choice(notes)
+        if category == "code":
+            query = rnd.choice([note["subject_code"], note["subject_code"].lower()])
+        elif category == "name":
+            query = note["subject_name"].lower()
+        elif category == "partial":
+            query = rnd.choice(note["subject_name"].split()).lower()
+        elif category == "abbreviation":
+            query = rnd.choice(ABBREVIATION_QUERIES)
+        elif category == "semester":
+            query = rnd.choice(SEMESTER_QUERIES)
+        elif category == "typo":
+            query = _typo(rnd, note["subject_code"].lower())
+        else:
+            query = rnd.choice(MISS_QUERIES)
+        queries.append((category, query))
+    return queries
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Messages per second through the query classifier.
+
+Compares query_parser.classify_message with the previous per-message
+approach (literals rebuilt and up to 9 regexes run on every message):
+
+    python benchmarks/classifier_benchmark.py
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from query_parser import classify_message
+
+MESSAGES = [
+    "hi", "Hello", "good morning", "namaste", "4th sem", "for 3rd sem link", "chemistry cycle",
+    "semester 5", "data structures 3rd sem", "bcs301", "BCS401", "dbms", "os", "data structures",
+    "operating systems", "machine learning", "mathematics", "18cs51", "computer networks", "xyz",
+]
+
+
+def legacy_classify(message: str) -> str:
+    """The classification the greeting handler used to do inline"""
+    message_text = message.lower().strip()
+    semester_patterns = [
+        r'(?:for\s+)?(\d+)(?:st|nd|rd|th)?\s*sem(?:ester)?(?:\s+link)?',
+        r'(?:for\s+)?sem(?:ester)?\s*(\d+)(?:\s+link)?',
+        r'(?:for\s+)?(\w+)\s*cycle(?:\s+link)?'
+    ]
+    for pattern in semester_patterns:
+        match = re.search(pattern, message_text)
+        if match:
+            semester_mapping = {
+                '1': 'Chemistrycycle', 'first': 'Chemistrycycle', '1st': 'Chemistrycycle',
+                '2': 'Physicscycle', 'second': 'Physicscycle', '2nd': 'Physicscycle',
+                '3': 'Sem3', 'third': 'Sem3', '3rd': 'Sem3',
+                '4': 'Sem4', 'fourth': 'Sem4', '4th': 'Sem4',
+                '5': 'Sem5', 'fifth': 'Sem5', '5th': 'Sem5',
+                '6': 'Sem6', 'sixth': 'Sem6', '6th': 'Sem6',
+                'chemistry': 'Chemistrycycle', 'physics': 'Physicscycle'
+            }
+            if semester_mapping.get(match.group(1).lower()):
+                return "semester_browse"
+    greeting_patterns = [
+        r'^(hi|hello|hey|hai|hii|helo)$',
+        r'^(good\s*(morning|afternoon|evening|night|day))$',
+        r'^(gm|gn|gd\s*mrng|gd\s*day|gd\s*evng|gd\s*night)$',
+        r'^(namaste|namaskar|vanakkam|salaam|assalamualaikum)$',
+        r'^(howdy|sup|yo|wassup|what\'s\s*up)$',
+        r'^(greetings|welcome|bonjour|hola|ciao|aloha)$'
+    ]
+    for pattern in greeting_patterns:
+        if re.match(pattern, message_text):
+            return "greeting"
+    return "search"
+
+
+def messages_per_second(classify, rounds: int = 5000) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for message in MESSAGES:
+            classify(message)
+    return rounds * len(MESSAGES) / (time.perf_counter() - started)
+
+
+def main():
+    legacy = messages_per_second(legacy_classify)
+    current = messages_per_second(classify_message)
+    print(f"legacy inline patterns : {legacy:>12,.0f} msg/s")
+    print(f"query_parser           : {current:>12,.0f} msg/s ({current / legacy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Fuzzy matching latency as the catalog grows.
+
+Builds FuzzyIndex over synthetic VTU-style subject codes and names and times
+typo lookups. Runs without MongoDB:
+
+    python benchmarks/fuzzy_benchmark.py
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fuzzy_index import FuzzyIndex
+from catalog import generate_catalog
+
+CODE_TYPOS = ["bcs31", "bsc301", "18cs5l", "bcs3011", "bis40"]
+NAME_TYPOS = ["data structers", "operatng systems", "machne learning", "computr networks"]
+
+
+def synthetic_catalog(size: int):
+    notes = generate_catalog(size)
+    codes = {note["subject_code"] for note in notes}
+    names = {note["subject_name"] for note in notes}
+    return codes, names
+
+
+def time_lookups(lookup, queries, repeat: int = 20):
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            lookup(query)
+            samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    print(f"{'notes':>8} {'codes':>7} {'names':>7} {'build ms':>9} {'code p50':>9} {'code p95':>9} {'name p50':>9} {'name p95':>9}")
+    for size in (1_000, 5_000, 10_000, 25_000, 50_000):
+        codes, names = synthetic_catalog(size)
+
+        started = time.perf_counter()
+        index = FuzzyIndex(codes, names)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        code_p50, code_p95 = time_lookups(index.match_codes, CODE_TYPOS)
+        name_p50, name_p95 = time_lookups(index.match_names, NAME_TYPOS)
+        print(f"{size:>8} {len(codes):>7} {len(names):>7} {build_ms:>9.0f} "
+              f"{code_p50:>9.3f} {code_p95:>9.3f} {name_p50:>9.3f} {name_p95:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
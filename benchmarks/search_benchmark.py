@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Search benchmark suite.
+
+Loads synthetic VTU catalogs into a local MongoDB stand-in, replays a query
+mix (exact codes, names, abbreviations, semester phrases, typos and misses)
+through NotesDatabase.search_notes and reports p50/p95/p99 latency, MongoDB
+round trips per query and allocations per query.
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/search_benchmark.py                        # mongomock, regex mode
+    python benchmarks/search_benchmark.py --mode index --sizes 1000,10000,100000
+    python benchmarks/search_benchmark.py --mongodb-uri mongodb://localhost:27017 --sizes 1000,10000,100000
+
+mongomock evaluates queries in Python, so its absolute latencies are much
+higher than a real server's. Use a local mongod for realistic numbers and
+mongomock for round trip and allocation comparisons.
+
+Every run is saved to benchmarks/results/ and compared with the previous
+run for the same backend, mode and catalog size, so regressions show up
+between commits.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from catalog import generate_catalog, generate_queries
+from database import NotesDatabase
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+BENCH_DB_NAME = "notezy_bench"
+
+# Collection methods that each cost (at least) one MongoDB round trip
+ROUND_TRIP_METHODS = ("find", "find_one", "aggregate", "distinct", "count_documents",
+                      "insert_one", "insert_many", "delete_one", "bulk_write")
+
+
+class RoundTripCounter:
+    """Collection proxy counting the operations that go to the server"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if name in ROUND_TRIP_METHODS:
+            def counted(*args, **kwargs):
+                self.calls += 1
+                return attribute(*args, **kwargs)
+            return counted
+        return attribute
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def make_client(mongodb_uri: Optional[str]):
+    if mongodb_uri:
+        from pymongo import MongoClient
+        return MongoClient(mongodb_uri)
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("❌ mongomock not installed. Run: pip install -r benchmarks/requirements.txt")
+    return mongomock.MongoClient()
+
+
+def load_database(size: int, mode: str, mongodb_uri: Optional[str]) -> NotesDatabase:
+    """Fresh NotesDatabase over a generated catalog"""
+    client = make_client(mongodb_uri)
+    client.drop_database(BENCH_DB_NAME)
+
+    db = NotesDatabase(db_name=BENCH_DB_NAME, use_search_index=False, client=client)
+    db.bulk_insert(generate_catalog(size))
+
+    # Measure the search strategies, not the result cache
+    db.search_cache.max_size = 0
+    if mode == "aggregate":
+        db.partial_search_mode = "aggregate"
+    elif mode == "index":
+        db.load_search_index()
+    return db
+
+
+def run_benchmark(size: int, mode: str, query_count: int, mongodb_uri: Optional[str]) -> Dict:
+    db = load_database(size, mode, mongodb_uri)
+    queries = generate_queries(list(db.collection.find({}, {"_id": 0})), query_count)
+
+    counter = RoundTripCounter(db.collection)
+    db.collection = counter
+
+    # Warm up (first fuzzy index build, connection pool)
+    for _, query in queries[:10]:
+        db.search_notes(query, limit=100)
+
+    latencies = []
+    round_trips = []
+    by_category: Dict[str, List[float]] = {}
+    result_types: Dict[str, int] = {}
+    for category, query in queries:
+        calls_before = counter.calls
+        started = time.perf_counter()
+        result = db.search_notes(query, limit=100)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        latencies.append(elapsed_ms)
+        round_trips.append(counter.calls - calls_before)
+        by_category.setdefault(category, []).append(elapsed_ms)
+        result_types[result["type"]] = result_types.get(result["type"], 0) + 1
+
+    # Allocations are measured in a separate pass - tracemalloc skews latency
+    allocated = []
+    tracemalloc.start()
+    for _, query in queries[:min(len(queries), 200)]:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        db.search_notes(query, limit=100)
+        _, peak = tracemalloc.get_traced_memory()
+        allocated.append(peak - before)
+    tracemalloc.stop()
+
+    db.client.drop_database(BENCH_DB_NAME)
+
+    return {
+        "size": size,
+        "mode": mode,
+        "backend": "mongod" if mongodb_uri else "mongomock",
+        "queries": len(queries),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "round_trips_per_query": round(statistics.mean(round_trips), 2),
+        "max_round_trips": max(round_trips),
+        "peak_alloc_kb_per_query": round(statistics.mean(allocated) / 1024, 1),
+        "p50_ms_by_category": {category: round(percentile(samples, 50), 3)
+                               for category, samples in sorted(by_category.items())},
+        "result_types": result_types
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def previous_run(run_key: str) -> Optional[Dict]:
+    """Most recent saved result for the same backend/mode/size"""
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    for filename in sorted(os.listdir(RESULTS_DIR), reverse=True):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(RESULTS_DIR, filename), "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        for result in saved.get("results", []):
+            if f"{result['backend']}-{result['mode']}-{result['size']}" == run_key:
+                return {**result, "revision": saved.get("revision")}
+    return None
+
+
+def print_result(result: Dict, previous: Optional[Dict]):
+    def delta(key):
+        if not previous or not previous.get(key):
+            return ""
+        change = (result[key] - previous[key]) / previous[key] * 100
+        return f" ({change:+.0f}%)"
+
+    print(f"\n📊 {result['backend']} | mode={result['mode']} | {result['size']:,} notes | {result['queries']} queries")
+    print(f"  latency p50/p95/p99: {result['p50_ms']}{delta('p50_ms')} / {result['p95_ms']}{delta('p95_ms')} / "
+          f"{result['p99_ms']}{delta('p99_ms')} ms")
+    print(f"  round trips/query:   {result['round_trips_per_query']}{delta('round_trips_per_query')} "
+          f"(max {result['max_round_trips']})")
+    print(f"  peak alloc/query:    {result['peak_alloc_kb_per_query']} KB{delta('peak_alloc_kb_per_query')}")
+    print(f"  p50 by category:     " + ", ".join(f"{category}={value}ms"
+                                                 for category, value in result['p50_ms_by_category'].items()))
+    if previous:
+        print(f"  (compared with {previous.get('revision')})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NotesDatabase.search_notes")
+    parser.add_argument("--sizes", default="1000",
+                        help="Comma separated catalog sizes in notes (1000-100000; large regex runs are slow on mongomock)")
+    parser.add_argument("--mode", default="regex", choices=["regex", "aggregate", "index"],
+                        help="Search path to measure")
+    parser.add_argument("--queries", type=int, default=300, help="Queries replayed per catalog")
+    parser.add_argument("--mongodb-uri", default=os.getenv("BENCH_MONGODB_URI"),
+                        help="Local mongod to use instead of mongomock")
+    parser.add_argument("--no-save", action="store_true", help="Don't write results to benchmarks/results")
+    args = parser.parse_args()
+
+    results = []
+    for size in (int(value) for value in args.sizes.split(",")):
+        result = run_benchmark(size, args.mode, args.queries, args.mongodb_uri)
+        print_result(result, previous_run(f"{result['backend']}-{result['mode']}-{result['size']}"))
+        results.append(result)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        revision = git_revision()
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = os.path.join(RESULTS_DIR, f"{timestamp}-{revision}-{args.mode}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"revision": revision, "timestamp": timestamp, "results": results}, f, indent=2)
+        print(f"\n💾 Saved results to {os.path.relpath(path, ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Partial match ranking: materialize-and-sort vs streaming top-k.
+
+Replays the documents the regex partial search receives from MongoDB (a
+contains and a word boundary find per query variation and field, each capped
+at limit * 2) and ranks them two ways:
+
+  before - copy every match, de-duplicate, fully sort, slice
+  after  - BestMatches: best score per note, heapq top-k, copy only the winners
+
+Runs without MongoDB; the finds are answered in Python beforehand so only
+the ranking is measured:
+
+    python benchmarks/topk_benchmark.py
+    python benchmarks/topk_benchmark.py --sizes 10000,100000 --limit 100
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import List, Dict, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from catalog import generate_catalog, generate_queries
+from database import NotesDatabase
+from search_common import (
+    SEARCH_FIELDS, BestMatches, score_match, note_key, query_variations
+)
+
+Stream = List[Tuple[str, int, str, List[Dict]]]
+
+
+def with_full_names(notes: List[Dict]) -> List[Dict]:
+    return [{**note, **NotesDatabase.normalized_fields(note["subject_code"], note["subject_name"]),
+             "full_name": f"{note['subject_code']} - {note['subject_name']}"} for note in notes]
+
+
+def find_streams(notes: List[Dict], query: str, limit: int) -> Stream:
+    """What the regex path's finds return for a query, as fresh documents per find"""
+    streams = []
+    for query_var in query_variations(query.lower().strip()):
+        for field, weight in SEARCH_FIELDS:
+            patterns = [re.compile(re.escape(query_var), re.IGNORECASE)]
+            if len(query_var) > 2:
+                patterns.append(re.compile(r'\b' + re.escape(query_var), re.IGNORECASE))
+            for pattern in patterns:
+                matches = [dict(note) for note in notes if pattern.search(str(note.get(field) or ""))]
+                streams.append((query_var, weight, field, matches[:limit * 2]))
+    return streams
+
+
+def rank_before(streams: Stream, limit: int):
+    partial_matches = []
+    for query_var, weight, field, documents in streams:
+        for match in documents:
+            if not match.get(field):
+                continue
+            score = score_match(field, weight, str(match[field]).lower(), query_var)
+            partial_matches.append({
+                **match,
+                'score': score,
+                'matched_field': field,
+                'matched_query': query_var
+            })
+
+    seen = set()
+    unique_matches = []
+    for match in partial_matches:
+        key = note_key(match)
+        if key not in seen:
+            seen.add(key)
+            unique_matches.append(match)
+
+    unique_matches.sort(key=lambda x: x['score'], reverse=True)
+    return unique_matches[:limit], len(unique_matches)
+
+
+def rank_after(streams: Stream, limit: int):
+    best_matches = BestMatches()
+    for query_var, weight, field, documents in streams:
+        for match in documents:
+            if not match.get(field):
+                continue
+            score = score_match(field, weight, str(match[field]).lower(), query_var)
+            best_matches.add(match, score, field, query_var)
+    return best_matches.top(limit), len(best_matches)
+
+
+def measure(rank, workload: List[Stream], limit: int, repeat: int) -> Dict:
+    latencies = []
+    for _ in range(repeat):
+        for streams in workload:
+            started = time.perf_counter()
+            rank(streams, limit)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    # Allocations in a separate pass - tracemalloc skews latency
+    peaks = []
+    tracemalloc.start()
+    for streams in workload:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        rank(streams, limit)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "alloc_kb": statistics.mean(peaks) / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare partial match ranking strategies")
+    parser.add_argument("--sizes", default="10000,100000", help="Comma separated catalog sizes")
+    parser.add_argument("--limit", type=int, default=100, help="Result limit (the handlers use 100)")
+    parser.add_argument("--queries", type=int, default=20, help="Partial queries per catalog")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing passes over the queries")
+    args = parser.parse_args()
+
+    print(f"{'notes':>8} {'docs/q':>7} {'':>7} {'p50 ms':>8} {'p95 ms':>8} {'alloc KB':>9}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        notes = with_full_names(generate_catalog(size))
+        queries = [query for category, query in generate_queries(notes, args.queries * 10)
+                   if category in ("partial", "abbreviation", "semester")][:args.queries]
+        workload = [find_streams(notes, query, args.limit) for query in queries]
+        docs_per_query = statistics.mean(sum(len(documents) for *_, documents in streams)
+                                         for streams in workload)
+
+        # Both strategies must agree on how many unique notes matched
+        for streams in workload:
+            assert rank_before(streams, args.limit)[1] == rank_after(streams, args.limit)[1]
+
+        for label, rank in (("before", rank_before), ("after", rank_after)):
+            result = measure(rank, workload, args.limit, args.repeat)
+            print(f"{size:>8} {docs_per_query:>7.0f} {label:>7} {result['p50_ms']:>8.3f} "
+                  f"{result['p95_ms']:>8.3f} {result['alloc_kb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Webhook acknowledgement cost: requests/second through webhook_handler.
+
+Calls webhook_bot.webhook_handler directly with in-memory requests carrying
+realistic message and callback_query payloads, so only the work done before
+Telegram gets its 200 is measured (no HTTP server, Telegram or MongoDB; the
+bot and update queue are stubbed and queued updates are discarded):
+
+  before - request.json(), key dump print, Update.de_json, then dedupe
+  after  - raw bytes decoded with json (and orjson when installed), dedupe
+           on update_id from the payload, Update built later by the worker
+
+    python benchmarks/webhook_decode_benchmark.py
+    python benchmarks/webhook_decode_benchmark.py --requests 50000 --duplicates 0.1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from aiohttp import web
+from telegram import Update
+
+import webhook_bot
+from update_dedupe import UpdateDeduplicator
+
+
+class StubApplication:
+    _initialized = True
+    bot = None
+
+
+class StubQueue:
+    max_size = 256
+    accepting = True
+
+    def submit(self, update) -> bool:
+        return True
+
+    def depth(self) -> int:
+        return 0
+
+
+class FakeRequest:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    async def read(self) -> bytes:
+        return self.body
+
+    async def json(self):
+        return json.loads(self.body)
+
+
+async def original_handler(request):
+    """The handler before this change, for comparison"""
+    data = await request.json()
+    print("📨 Received webhook request")
+    print(f"📦 Update data keys: {list(data.keys()) if isinstance(data, dict) else 'not dict'}")
+    update = Update.de_json(data, webhook_bot.application.bot)
+    if not await webhook_bot.deduplicator.claim(update.update_id):
+        return web.Response(text="DUPLICATE", status=200)
+    if not webhook_bot.update_queue.submit(update):
+        return web.Response(text="BUSY", status=503)
+    print(f"📥 Queued update {update.update_id} (depth {webhook_bot.update_queue.depth()})")
+    return web.Response(text="OK")
+
+
+def make_payload(update_id: int, rng: random.Random) -> dict:
+    user = {"id": 1000 + update_id % 500, "is_bot": False, "first_name": "Student",
+            "username": f"student{update_id % 500}", "language_code": "en"}
+    chat = {"id": user["id"], "first_name": "Student", "username": user["username"], "type": "private"}
+    message = {"message_id": update_id, "from": user, "chat": chat, "date": 1700000000 + update_id,
+               "text": rng.choice(["BCS401", "operating systems", "4th sem", "hi", "cse 5th sem dbms"])}
+    if rng.random() < 0.25:
+        bot_message = {**message, "from": {"id": 1, "is_bot": True, "first_name": "Notezy"},
+                       "text": "📚 Choose a semester",
+                       "reply_markup": {"inline_keyboard": [[{"text": f"Sem {i}", "callback_data": f"sem_{i}"}]
+                                                            for i in range(1, 9)]}}
+        return {"update_id": update_id, "callback_query": {
+            "id": str(update_id), "from": user, "message": bot_message,
+            "chat_instance": "42", "data": f"sem_{rng.randint(1, 8)}"}}
+    return {"update_id": update_id, "message": message}
+
+
+def make_bodies(count: int, duplicates: float, seed: int = 7):
+    rng = random.Random(seed)
+    bodies = []
+    for update_id in range(1, count + 1):
+        body = json.dumps(make_payload(update_id, rng)).encode("utf-8")
+        bodies.append(body)
+        if rng.random() < duplicates:
+            bodies.append(body)  # Telegram redelivery
+    return bodies
+
+
+async def run(handler, bodies) -> float:
+    webhook_bot.deduplicator = UpdateDeduplicator(capacity=len(bodies))
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for body in bodies:
+            response = await handler(FakeRequest(body))
+            assert response.status == 200, response.text
+    return len(bodies) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure webhook_handler requests/second")
+    parser.add_argument("--requests", type=int, default=20000, help="Distinct updates per pass")
+    parser.add_argument("--duplicates", type=float, default=0.05, help="Fraction of updates delivered twice")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes per variant (best is reported)")
+    args = parser.parse_args()
+
+    webhook_bot.application = StubApplication()
+    webhook_bot.update_queue = StubQueue()
+    bodies = make_bodies(args.requests, args.duplicates)
+    average = sum(map(len, bodies)) / len(bodies)
+    print(f"{len(bodies)} requests, average payload {average:.0f} bytes\n")
+
+    variants = [("before (request.json + de_json)", original_handler, None),
+                ("after (json)", webhook_bot.webhook_handler, json.loads)]
+    try:
+        import orjson
+        variants.append(("after (orjson)", webhook_bot.webhook_handler, orjson.loads))
+    except ImportError:
+        print("orjson not installed - skipping that variant\n")
+
+    baseline = None
+    for name, handler, loads in variants:
+        if loads is not None:
+            webhook_bot.json_loads = loads
+        rate = max(asyncio.run(run(handler, bodies)) for _ in range(args.repeat))
+        baseline = baseline or rate
+        print(f"{name:<34} {rate:>10,.0f} req/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Webhook throughput as the number of worker processes grows.
+
+Starts the pre-fork server (prefork.serve, as used by WEBHOOK_PROCESSES>1)
+with a stand-in webhook route that does the CPU-bound part of handling a
+message - JSON decode, classify_message and an in-memory index search over
+a synthetic catalog - then fires concurrent POSTs at it and reports
+requests/second and latency for each worker count. No Telegram or MongoDB
+access is needed:
+
+    python benchmarks/webhook_load_test.py
+    python benchmarks/webhook_load_test.py --workers 1,2,4,8 --concurrency 64 --duration 10
+
+Throughput can only scale up to the number of CPU cores on the machine.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from aiohttp import ClientSession, web
+
+import prefork
+from catalog import generate_catalog, generate_queries
+from query_parser import classify_message
+from search_index import SearchIndex
+
+SEARCH_INDEX = None  # Built in the parent, shared copy-on-write with the workers
+
+
+def create_app() -> web.Application:
+    async def webhook(request):
+        data = await request.json()
+        intent = classify_message(data["message"]["text"])
+        result = SEARCH_INDEX.search(intent.query or data["message"]["text"], 100)
+        return web.json_response({"type": result["type"], "worker": prefork.worker_index()})
+
+    app = web.Application()
+    app.router.add_post('/webhook', webhook)
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(url: str, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    async with ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.post(url, json={"message": {"text": "ping"}}) as response:
+                    if response.status == 200:
+                        return
+            except OSError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def load(url: str, payloads, concurrency: int, duration: float):
+    latencies = []
+    workers_seen = set()
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def client(session: ClientSession, offset: int):
+        nonlocal errors
+        index = offset
+        while time.monotonic() < deadline:
+            payload = payloads[index % len(payloads)]
+            index += concurrency
+            started = time.perf_counter()
+            try:
+                async with session.post(url, data=payload,
+                                        headers={"Content-Type": "application/json"}) as response:
+                    body = await response.json()
+                    workers_seen.add(body["worker"])
+            except Exception:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    async with ClientSession() as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(session, offset) for offset in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed, errors, workers_seen
+
+
+def main():
+    global SEARCH_INDEX
+
+    parser = argparse.ArgumentParser(description="Load test the pre-fork webhook server")
+    parser.add_argument("--workers", default="1,2,4", help="Comma separated worker process counts")
+    parser.add_argument("--size", type=int, default=10000, help="Synthetic catalog size")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent client connections")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per worker count")
+    args = parser.parse_args()
+
+    notes = generate_catalog(args.size)
+    for note in notes:
+        note["full_name"] = f"{note['subject_code']} - {note['subject_name']}"
+    SEARCH_INDEX = SearchIndex(notes)
+
+    queries = generate_queries(notes, 500, seed=random.randrange(1000))
+    payloads = [json.dumps({"update_id": i, "message": {"text": query}}).encode()
+                for i, (_, query) in enumerate(queries)]
+
+    print(f"CPU cores: {os.cpu_count()} | catalog: {args.size:,} notes | concurrency: {args.concurrency}")
+    print(f"{'workers':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'served by':>10}")
+    baseline = None
+    for workers in (int(value) for value in args.workers.split(",")):
+        port = free_port()
+        url = f"http://127.0.0.1:{port}/webhook"
+        server = multiprocessing.get_context("fork").Process(
+            target=prefork.serve, args=(create_app, "127.0.0.1", port, workers), daemon=False)
+        server.start()
+        try:
+            asyncio.run(wait_until_up(url))
+            latencies, elapsed, errors, workers_seen = asyncio.run(
+                load(url, payloads, args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            server.join()
+
+        throughput = len(latencies) / elapsed
+        baseline = baseline or throughput
+        latencies.sort()
+        print(f"{workers:>8} {throughput:>9.0f} {statistics.median(latencies):>8.1f} "
+              f"{latencies[int(len(latencies) * 0.95) - 1]:>8.1f} {errors:>7} {len(workers_seen):>10}"
+              f"   ({throughput / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
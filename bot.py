@@ -1,21 +1,63 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand
-from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
+from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler, TypeHandler
 from telegram.error import Conflict
 import os
 from dotenv import load_dotenv
 from database import NotesDatabase
-import re
+from async_database import AsyncNotesDatabase
+from rate_limiter import SearchRateLimiter, SearchBusy, BUSY_REPLY
+from update_processor import ChatOrderedUpdateProcessor
+from search_reply import SearchReply
+from outbound_scheduler import OutboundScheduler
+from metrics import STARTUP
+from warmup import warm_up
+from catalog_watcher import CatalogWatcher
+from query_parser import (
+    classify_message, strip_search_command, QueryIntent,
+    GREETING, SEMESTER_BROWSE, FILTERED_SEARCH, SEMESTER_DISPLAY_NAMES, BRANCH_NAMES
+)
+from logs import configure_logging, bind_update
+from typing import Optional
 import asyncio
+import logging
 import time
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger("bot")
+
 # Database will be initialized in main() to avoid import-time connections
 db = None
+async_db = None  # Non-blocking facade used by the handlers
+rate_limiter = None  # Per-user/chat token buckets and the global search ceiling
 
 # Sync functionality removed - bot now focused on search and help only
 
+# Static menus, built once at import instead of on every command or button press
+SEMESTER_LINKS = {
+    "1st Semester": "https://www.notezy.online/Chemistrycycle",
+    "2nd Semester": "https://www.notezy.online/Physicscycle",
+    "3rd Semester": "https://www.notezy.online/Sem3",
+    "4th Semester": "https://www.notezy.online/Sem4",
+    "5th Semester": "https://www.notezy.online/Sem5",
+    "6th Semester": "https://www.notezy.online/Sem6"
+}
+BACK_TO_MENU_BUTTON = InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")
+MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📚 Semesters", callback_data="semesters")],
+    [InlineKeyboardButton("🏫 Branches", callback_data="branches")],
+    [InlineKeyboardButton("🔍 Search Notes", callback_data="search")],
+    [InlineKeyboardButton("ℹ️ About", callback_data="about")],
+    [InlineKeyboardButton("📝 Feedback", callback_data="feedback")],
+    [InlineKeyboardButton("🆘 Help", callback_data="help")]
+])
+BACK_TO_MENU_MARKUP = InlineKeyboardMarkup([[BACK_TO_MENU_BUTTON]])
+SEMESTERS_MENU_MARKUP = InlineKeyboardMarkup(
+    [[InlineKeyboardButton(sem, url=link)] for sem, link in SEMESTER_LINKS.items()] + [[BACK_TO_MENU_BUTTON]])
+SEMESTER_LINKS_MARKUP = InlineKeyboardMarkup(
+    [[InlineKeyboardButton(sem, url=link)] for sem, link in SEMESTER_LINKS.items()])
+
 # AI features removed - keeping bot lightweight and focused
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -26,19 +68,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "Choose an option below to get started:"
     )
 
-    # Create main menu buttons
-    keyboard = [
-        [InlineKeyboardButton("📚 Semesters", callback_data="semesters")],
-        [InlineKeyboardButton("🏫 Branches", callback_data="branches")],
-        [InlineKeyboardButton("🔍 Search Notes", callback_data="search")],
-        [InlineKeyboardButton("ℹ️ About", callback_data="about")],
-        [InlineKeyboardButton("📝 Feedback", callback_data="feedback")],
-        [InlineKeyboardButton("🆘 Help", callback_data="help")]
-    ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    await update.message.reply_text(welcome_text, reply_markup=reply_markup)
+    await update.message.reply_text(welcome_text, reply_markup=MAIN_MENU_MARKUP)
 
 
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -51,25 +81,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if callback_data == "semesters":
         # Show semester selection
         text = "📚 Choose your semester to view notes:"
-        
-        semesters = {
-            "1st Semester": "https://www.notezy.online/Chemistrycycle",
-            "2nd Semester": "https://www.notezy.online/Physicscycle", 
-            "3rd Semester": "https://www.notezy.online/Sem3",
-            "4th Semester": "https://www.notezy.online/Sem4",
-            "5th Semester": "https://www.notezy.online/Sem5",
-            "6th Semester": "https://www.notezy.online/Sem6"
-        }
-        
-        keyboard = []
-        for sem, link in semesters.items():
-            keyboard.append([InlineKeyboardButton(sem, url=link)])
-        
-        # Add back button
-        keyboard.append([InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(text, reply_markup=reply_markup)
+        await query.edit_message_text(text, reply_markup=SEMESTERS_MENU_MARKUP)
 
     elif callback_data == "branches":
         # Show branches info
@@ -83,8 +95,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "📖 Notes are available for all branches across all semesters!"
         )
         
-        keyboard = [[InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_MENU_MARKUP
         
         await query.edit_message_text(text, reply_markup=reply_markup)
 
@@ -98,8 +109,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Just type your search query below! 📝"
         )
         
-        keyboard = [[InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_MENU_MARKUP
         
         await query.edit_message_text(search_text, reply_markup=reply_markup, parse_mode='Markdown')
 
@@ -120,8 +130,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "💬 For support: notezyhelp@gmail.com"
         )
         
-        keyboard = [[InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_MENU_MARKUP
         
         await query.edit_message_text(text, reply_markup=reply_markup)
 
@@ -133,8 +142,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Your feedback helps us improve Notezy Bot for all students! 🙏"
         )
         
-        keyboard = [[InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_MENU_MARKUP
         
         await query.edit_message_text(text, reply_markup=reply_markup)
 
@@ -156,8 +164,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "🌐 Visit: https://www.notezy.online"
         )
         
-        keyboard = [[InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_MENU_MARKUP
         
         await query.edit_message_text(text, reply_markup=reply_markup)
 
@@ -168,39 +175,13 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Your quick and chat-responsive study companion!\n"
             "Choose an option below to get started:"
         )
-
-        keyboard = [
-            [InlineKeyboardButton("📚 Semesters", callback_data="semesters")],
-            [InlineKeyboardButton("🏫 Branches", callback_data="branches")],
-            [InlineKeyboardButton("🔍 Search Notes", callback_data="search")],
-            [InlineKeyboardButton("ℹ️ About", callback_data="about")],
-            [InlineKeyboardButton("📝 Feedback", callback_data="feedback")],
-            [InlineKeyboardButton("🆘 Help", callback_data="help")]
-        ]
-
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(welcome_text, reply_markup=reply_markup)
+        await query.edit_message_text(welcome_text, reply_markup=MAIN_MENU_MARKUP)
 
 
 async def semesters_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Display semester options with inline keyboard"""
     text = "📚 Choose your semester to view notes:"
-    
-    semesters = {
-        "1st Semester": "https://www.notezy.online/Chemistrycycle",
-        "2nd Semester": "https://www.notezy.online/Physicscycle", 
-        "3rd Semester": "https://www.notezy.online/Sem3",
-        "4th Semester": "https://www.notezy.online/Sem4",
-        "5th Semester": "https://www.notezy.online/Sem5",
-        "6th Semester": "https://www.notezy.online/Sem6"
-    }
-    
-    keyboard = []
-    for sem, link in semesters.items():
-        keyboard.append([InlineKeyboardButton(sem, url=link)])
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(text, reply_markup=reply_markup)
+    await update.message.reply_text(text, reply_markup=SEMESTER_LINKS_MARKUP)
 
 
 async def branches_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -274,143 +255,92 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(help_message)
 
 
-async def greeting(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    message_text = update.message.text.strip()
+async def send_semester_links(update: Update, semester: str) -> bool:
+    """Reply with the branch links for a semester, False if it has no notes"""
+    # Get all branches for this semester
+    branches = await async_db.get_semester_branches(semester)
+    if not branches:
+        return False
 
-    # Define semester query patterns
-    semester_patterns = [
-        r'(?:for\s+)?(\d+)(?:st|nd|rd|th)?\s*sem(?:ester)?(?:\s+link)?',
-        r'(?:for\s+)?sem(?:ester)?\s*(\d+)(?:\s+link)?',
-        r'(?:for\s+)?(\w+)\s*cycle(?:\s+link)?'
-    ]
+    semester_display = SEMESTER_DISPLAY_NAMES.get(semester, semester)
 
-    # Check if message matches any semester pattern
-    for pattern in semester_patterns:
-        match = re.search(pattern, message_text)
-        if match:
-            semester_num = match.group(1)
-
-            # Map semester numbers/names to database semesters
-            semester_mapping = {
-                '1': 'Chemistrycycle', 'first': 'Chemistrycycle', '1st': 'Chemistrycycle',
-                '2': 'Physicscycle', 'second': 'Physicscycle', '2nd': 'Physicscycle',
-                '3': 'Sem3', 'third': 'Sem3', '3rd': 'Sem3',
-                '4': 'Sem4', 'fourth': 'Sem4', '4th': 'Sem4',
-                '5': 'Sem5', 'fifth': 'Sem5', '5th': 'Sem5',
-                '6': 'Sem6', 'sixth': 'Sem6', '6th': 'Sem6',
-                'chemistry': 'Chemistrycycle', 'physics': 'Physicscycle'
-            }
+    # Create branch links
+    branch_links = []
+    for branch in sorted(branches):
+        branch_url = f"https://www.notezy.online/{semester}/{branch}"
+        branch_display = BRANCH_NAMES.get(branch, branch.title())
+        branch_links.append(f"🔗 [{branch_display}]({branch_url})")
 
-            semester = semester_mapping.get(semester_num.lower())
-            if semester:
-                # Get all branches for this semester
-                branches = db.collection.distinct("branch", {"semester": semester})
-
-                if branches:
-                    # Format semester name for display
-                    display_names = {
-                        'Chemistrycycle': '1st Semester (Chemistry Cycle)',
-                        'Physicscycle': '2nd Semester (Physics Cycle)',
-                        'Sem3': '3rd Semester',
-                        'Sem4': '4th Semester',
-                        'Sem5': '5th Semester',
-                        'Sem6': '6th Semester'
-                    }
-
-                    semester_display = display_names.get(semester, semester)
-
-                    # Create branch links
-                    branch_links = []
-                    branch_names = {
-                        'computerscience': 'Computer Science',
-                        'electronicsandcommunications': 'ECE',
-                        'informationscience': 'Information Science',
-                        'aiml': 'AI & ML',
-                        'aids': 'AI & DS'
-                    }
-
-                    for branch in sorted(branches):
-                        branch_url = f"https://www.notezy.online/{semester}/{branch}"
-                        branch_display = branch_names.get(branch, branch.title())
-                        branch_links.append(f"🔗 [{branch_display}]({branch_url})")
-
-                    response_text = (
-                        f"📚 *{semester_display} Notes*\n\n"
-                        f"Choose your branch:\n" +
-                        "\n".join(branch_links) +
-                        f"\n\n💡 Or search for specific subjects like 'Data Structures' or '18CS51'"
-                    )
-
-                    await update.message.reply_text(
-                        response_text,
-                        parse_mode='Markdown',
-                        disable_web_page_preview=True
-                    )
-                    return
-
-    # Define greeting patterns
-    greeting_patterns = [
-        r'^(hi|hello|hey|hai|hii|helo)$',  # Basic greetings
-        r'^(good\s*(morning|afternoon|evening|night|day))$',  # Good morning/afternoon etc.
-        r'^(gm|gn|gd\s*mrng|gd\s*day|gd\s*evng|gd\s*night)$',  # Abbreviations
-        r'^(namaste|namaskar|vanakkam|salaam|assalamualaikum)$',  # Cultural greetings
-        r'^(howdy|sup|yo|wassup|what\'s\s*up)$',  # Casual greetings
-        r'^(greetings|welcome|bonjour|hola|ciao|aloha)$'  # Other languages
-    ]
+    response_text = (
+        f"📚 *{semester_display} Notes*\n\n"
+        f"Choose your branch:\n" +
+        "\n".join(branch_links) +
+        f"\n\n💡 Or search for specific subjects like 'Data Structures' or '18CS51'"
+    )
 
-    # Check if message matches any greeting pattern
-    for pattern in greeting_patterns:
-        if re.match(pattern, message_text):
-            # Get user's first name if available
-            user_name = update.effective_user.first_name or "there"
-
-            # Simple greeting response
-            await update.message.reply_text(
-                f"👋 Hello {user_name}! I'm your Notezy assistant for VTU engineering notes! 📚\n\n"
-                "💡 Try searching for subjects like 'Data Structures' or '18CS51'\n"
-                "🔍 What notes are you looking for today?",
-                parse_mode='Markdown'
-            )
+    await update.message.reply_text(
+        response_text,
+        parse_mode='Markdown',
+        disable_web_page_preview=True
+    )
+    return True
+
+
+async def greeting(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    intent = classify_message(update.message.text)
 
+    if intent.kind == SEMESTER_BROWSE:
+        if await send_semester_links(update, intent.semester):
             return
 
-        # If not a greeting or semester query, let it fall through to search handler
-    await search(update, context)
+    elif intent.kind == GREETING:
+        # Get user's first name if available
+        user_name = update.effective_user.first_name or "there"
 
-# Sync functionality removed for stability
+        # Simple greeting response
+        await update.message.reply_text(
+            f"👋 Hello {user_name}! I'm your Notezy assistant for VTU engineering notes! 📚\n\n"
+            "💡 Try searching for subjects like 'Data Structures' or '18CS51'\n"
+            "🔍 What notes are you looking for today?",
+            parse_mode='Markdown'
+        )
+        return
 
-async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    global db
+    # If not a greeting or semester query, let it fall through to search handler
+    await search(update, context, intent)
+
+
+async def run_search(query: str, limit: int, semester: Optional[str] = None):
+    """Search through the global concurrent search ceiling"""
+    async with rate_limiter.search_slot():
+        return await async_db.search_notes(query, limit=limit, semester=semester)
+
+
+async def search(update: Update, context: ContextTypes.DEFAULT_TYPE, intent: Optional[QueryIntent] = None):
+    global db, async_db
     
     # Initialize database if not already done
     if db is None:
         try:
             db = NotesDatabase()
-            print("✅ Database initialized for search")
+            async_db = AsyncNotesDatabase(db)
+            logger.info("✅ Database initialized for search")
         except Exception as e:
             await update.message.reply_text(f"❌ Database connection failed: {str(e)}")
             return
     
-    # Get query from command args if available, otherwise from message text
+    # Get query from command args if available, otherwise from the classified message
+    semester = None
     if context.args:
         # Called as /search query - use the args
         query = " ".join(context.args).strip()
+    elif intent is not None:
+        query = intent.query
+        if intent.kind == FILTERED_SEARCH:
+            semester = intent.semester
     else:
-        # Called as direct message - use full text but remove /search prefix if present
-        query = update.message.text.strip()
-        
-        # Handle different command formats
-        # /search query
-        if query.lower().startswith('/search '):
-            query = query[8:].strip()  # Remove '/search ' prefix
-        # /search@botname query
-        elif query.lower().startswith('/search@'):
-            # Find the space after @botname and extract everything after it
-            space_index = query.find(' ')
-            if space_index != -1:
-                query = query[space_index + 1:].strip()
-            else:
-                query = ""  # Just the command with @botname, no query
+        # Called as direct message - use full text but remove /search or /search@botname prefix
+        query = strip_search_command(update.message.text)
 
     if not query:
         await update.message.reply_text(
@@ -423,17 +353,23 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    # Send searching message to user
-    search_message = await update.message.reply_text(
-        f"🔍 *Searching for '{query}'...*\n⏳ Please wait...",
-        parse_mode='Markdown'
-    )
+    # Answer in one message when the search is fast; post a placeholder only if it overruns
+    reply = SearchReply(update.message, f"🔍 *Searching for '{query}'...*\n⏳ Please wait...")
 
     # Use query as-is without AI enhancement
     enhanced_query = query
 
     # Search in database with enhanced query - increased limit for more comprehensive results
-    search_result = db.search_notes(enhanced_query, limit=100)
+    try:
+        search_result = await reply.run(run_search(enhanced_query, limit=100, semester=semester))
+    except SearchBusy:
+        await reply.send(BUSY_REPLY)
+        return
+
+    # Nothing for this subject in the requested semester - show the semester's branches instead
+    if semester and search_result["type"] == "none" and await send_semester_links(update, semester):
+        await reply.discard(extra_calls=1)
+        return
 
     if search_result["type"] == "exact":
         # Found exact matches
@@ -492,7 +428,10 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
             first_semester = results[0]['semester']
             
             # Search for related subjects in same semester using partial search
-            related_search = db.search_notes(f"semester:{first_semester}", limit=20)
+            try:
+                related_search = await run_search(f"semester:{first_semester}", limit=20)
+            except SearchBusy:
+                related_search = {"type": "none", "results": []}  # Skip the extras when busy
             if related_search["type"] == "partial" and len(related_search["results"]) > 0:
                 response_text += f"\n\n📖 *Other subjects in {first_semester}:*\n"
                 
@@ -506,7 +445,7 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 if related_subjects:
                     response_text += "• " + "\n• ".join(related_subjects[:6])
 
-        await search_message.edit_text(
+        await reply.send(
             response_text,
             parse_mode='Markdown',
             disable_web_page_preview=True
@@ -550,7 +489,7 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if total_matches > 20:
             response_text += f"\n\n💡 *Tip: Try more specific terms like subject codes (e.g., BCS301) for exact matches*"
 
-        await search_message.edit_text(
+        await reply.send(
             response_text,
             parse_mode='Markdown',
             disable_web_page_preview=True
@@ -594,7 +533,7 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         response_text = "\n\n".join(response_parts)
 
-        await search_message.edit_text(
+        await reply.send(
             response_text,
             parse_mode='Markdown',
             disable_web_page_preview=True
@@ -602,7 +541,7 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     else:
         # No matches at all - simple message without AI
-        total_notes = db.count_notes()
+        total_notes = await async_db.count_notes()
         
         response_text = (
             f"❌ *{query}* not found in our database.\n\n"
@@ -611,29 +550,101 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"🔍 Try searching for a different subject or semester!"
         )
 
-        await search_message.edit_text(
+        await reply.send(
             response_text,
             parse_mode='Markdown'
         )
 
 if __name__ == "__main__":
-    # Initialize database here to avoid import-time connections
-    print("📊 Initializing database...")
+    # Initialize database here to avoid import-time connections.
+    # Only the ping is waited for; indexes are reconciled in the background once polling starts,
+    # and the catalog is loaded by the warm-up
+    configure_logging()
+    logger.info("📊 Initializing database...")
     try:
-        db = NotesDatabase()
-        print("✅ Database initialized successfully")
+        db = NotesDatabase(ensure_indexes=False, load_catalog=False)
+        async_db = AsyncNotesDatabase(db)
+        logger.info(f"✅ Database initialized successfully ({STARTUP.mark('db_ready'):.2f}s after start)")
     except Exception as e:
-        print(f"❌ Database initialization failed: {e}")
+        logger.error(f"❌ Database initialization failed: {e}")
         raise
 
+    rate_limiter = SearchRateLimiter.from_env()
+
     # Get bot token from environment variable
     BOT_TOKEN = os.getenv("BOT_TOKEN")
 
     if not BOT_TOKEN:
-        print("❌ Error: BOT_TOKEN not found in .env file")
+        logger.error("❌ Error: BOT_TOKEN not found in .env file")
         exit(1)
 
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    # Bot command menu, registered from post_init
+    commands = [
+        BotCommand("start", "Welcome message & semester links"),
+        BotCommand("search", "Search for notes by subject code or name"),
+        BotCommand("help", "Show help message"),
+        BotCommand("semesters", "List all semesters with links"),
+        BotCommand("branches", "List all VTU branches"),
+        BotCommand("about", "Info about Notezy Bot"),
+        BotCommand("feedback", "Send feedback"),
+        # BotCommand("sync", "Sync notes from database (Admin only)"),  # REMOVED
+    ]
+
+    async def set_commands(application):
+        try:
+            await application.bot.set_my_commands(commands)
+            logger.info("✅ Bot commands registered successfully")
+            # Verify commands were set
+            current_commands = await application.bot.get_my_commands()
+            logger.info(f"📋 Current commands: {[cmd.command for cmd in current_commands]}")
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to register commands: {e}")
+
+    async def reconcile_indexes():
+        started = time.perf_counter()
+        try:
+            await async_db.reconcile_indexes()
+            logger.info(f"✅ Indexes reconciled in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            logger.warning(f"⚠️ Index reconciliation failed: {e}")
+
+    startup_tasks = []  # Keep references so the tasks aren't garbage collected
+
+    async def post_init(application):
+        """Runs on the polling loop; polling starts once the caches are warm"""
+        startup_tasks.append(asyncio.create_task(set_commands(application)))
+        startup_tasks.append(asyncio.create_task(reconcile_indexes()))
+        # Pick up catalog changes made by import/sync scripts and other processes
+        startup_tasks.append(asyncio.create_task(CatalogWatcher.from_env(db).run()))
+        await warm_up(async_db)
+        STARTUP.mark("warm")
+
+    async def post_shutdown(application):
+        """Stop the background tasks (the catalog watcher's thread exits with them)"""
+        for task in startup_tasks:
+            task.cancel()
+        await asyncio.gather(*startup_tasks, return_exceptions=True)
+
+    async def tag_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Correlation ID for the update's log lines; times the first update"""
+        bind_update(update.update_id)
+        if "first_update" not in STARTUP.phases:
+            logger.info(f"⏱️ First update received {STARTUP.mark('first_update'):.2f}s after start")
+
+    # Handle updates concurrently, but each chat's updates in order; pace outbound calls
+    # to Telegram's flood limits
+    app = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(ChatOrderedUpdateProcessor(int(os.getenv("CONCURRENT_UPDATES", "8"))))
+        .rate_limiter(OutboundScheduler.from_env())
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+
+    # Runs before the real handlers (group -1) for every update
+    app.add_handler(TypeHandler(Update, tag_update), group=-1)
 
     # Add handlers for bot functionality
     app.add_handler(CommandHandler("start", start))
@@ -645,58 +656,28 @@ if __name__ == "__main__":
     # Sync functionality removed for stability
     
     # Handle search command
-    app.add_handler(CommandHandler("search", search))
+    app.add_handler(CommandHandler("search", rate_limiter.limit(search)))
     
     # Handle callback queries for inline buttons
     app.add_handler(CallbackQueryHandler(handle_callback))
     
     # Handle all other text messages as search (greeting function handles this)
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, greeting))
-
-    # Register bot commands synchronously using the app's bot
-    commands = [
-        BotCommand("start", "Welcome message & semester links"),
-        BotCommand("search", "Search for notes by subject code or name"),
-        BotCommand("help", "Show help message"),
-        BotCommand("semesters", "List all semesters with links"),
-        BotCommand("branches", "List all VTU branches"),
-        BotCommand("about", "Info about Notezy Bot"),
-        BotCommand("feedback", "Send feedback"),
-        # BotCommand("sync", "Sync notes from database (Admin only)"),  # REMOVED
-    ]
-
-    # Try to set commands synchronously
-    try:
-        # Create a new event loop just for this operation
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        async def set_commands():
-            await app.bot.set_my_commands(commands)
-            print("✅ Bot commands registered successfully")
-            # Verify commands were set
-            current_commands = await app.bot.get_my_commands()
-            print(f"📋 Current commands: {[cmd.command for cmd in current_commands]}")
-
-        loop.run_until_complete(set_commands())
-        # Don't close the loop - let Telegram manage it
-    except Exception as e:
-        print(f"⚠️ Failed to register commands: {e}")
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, rate_limiter.limit(greeting)))
 
-    print("🤖 Notezy Bot is starting...")
-    print("💡 Use /sync command to update notes from database")
-    print("🔒 Only one instance should be running to avoid conflicts")
+    logger.info("🤖 Notezy Bot is starting...")
+    logger.info("💡 Use /sync command to update notes from database")
+    logger.info("🔒 Only one instance should be running to avoid conflicts")
 
     try:
         app.run_polling(
-            allowed_updates=Update.ALL_TYPES,
+            allowed_updates=[Update.MESSAGE, Update.CALLBACK_QUERY],  # The only types handled
             drop_pending_updates=True,  # Drop pending updates on startup
             poll_interval=1.0  # Poll every second
         )
     except KeyboardInterrupt:
-        print("🛑 Bot stopped by user")
+        logger.info("🛑 Bot stopped by user")
     except Exception as e:
-        print(f"❌ Bot error: {e}")
+        logger.exception(f"❌ Bot error: {e}")
         raise
     
 #     # Define semester query patterns
@@ -0,0 +1,195 @@
+"""
+Compact on-disk snapshot of the notes catalog.
+
+Written after each sync (and whenever the bot sees the catalog change) so a
+process can boot without MongoDB and keep answering searches, read-only,
+while MongoDB is unreachable or slow.
+
+File layout (little-endian):
+
+  header   magic "NZCS", format, catalog version, written at, note count,
+           string table size
+  strings  string count, then each distinct field value's UTF-8 byte
+           length (uint32), then the values back to back
+  rows     one uint32 string id per field per note (0xFFFFFFFF = missing)
+  ids      the note's 12-byte ObjectId (zeros if it has none)
+  crc32    of everything above
+
+Rows and ids are fixed width, so they can be sliced straight out of a
+memory-mapped file without parsing.
+"""
+
+import array
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+
+from search_index import NOTE_PROJECTION
+
+MAGIC = b"NZCS"
+FORMAT = 2
+HEADER = struct.Struct("<4sHQdII")  # magic, format, catalog version, written at, notes, string bytes
+CRC = struct.Struct("<I")
+COUNT = struct.Struct("<I")
+FIELDS = tuple(NOTE_PROJECTION)
+MISSING = 0xFFFFFFFF
+ID_SIZE = 12
+
+
+class SnapshotError(Exception):
+    """The snapshot file is truncated, corrupt or written in another format"""
+
+
+class CatalogSnapshot:
+    """The notes catalog at a given catalog version"""
+
+    def __init__(self, notes: List[Dict], catalog_version: int, written_at: Optional[float] = None):
+        self.notes = notes
+        self.catalog_version = catalog_version
+        self.written_at = written_at if written_at is not None else time.time()
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def to_bytes(self) -> bytes:
+        string_ids: Dict[str, int] = {}
+        rows = array.array("I")
+        ids = bytearray()
+        for note in self.notes:
+            for field in FIELDS:
+                value = note.get(field)
+                if value is None:
+                    rows.append(MISSING)
+                else:
+                    rows.append(string_ids.setdefault(str(value), len(string_ids)))
+            doc_id = note.get("_id")
+            ids += doc_id.binary if isinstance(doc_id, ObjectId) else bytes(ID_SIZE)
+        if sys.byteorder != "little":
+            rows.byteswap()
+
+        encoded = [value.encode("utf-8") for value in string_ids]
+        lengths = array.array("I", map(len, encoded))
+        if sys.byteorder != "little":
+            lengths.byteswap()
+        strings = COUNT.pack(len(encoded)) + lengths.tobytes() + b"".join(encoded)
+        body = (HEADER.pack(MAGIC, FORMAT, self.catalog_version, self.written_at, len(self.notes), len(strings))
+                + strings + rows.tobytes() + bytes(ids))
+        return body + CRC.pack(zlib.crc32(body))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CatalogSnapshot":
+        if len(data) < HEADER.size + CRC.size:
+            raise SnapshotError("file too short")
+        magic, file_format, catalog_version, written_at, count, strings_size = HEADER.unpack_from(data)
+        if magic != MAGIC or file_format != FORMAT:
+            raise SnapshotError(f"unsupported snapshot (magic {magic!r}, format {file_format})")
+        rows_size = count * len(FIELDS) * 4
+        end = HEADER.size + strings_size + rows_size + count * ID_SIZE
+        if len(data) != end + CRC.size or CRC.unpack_from(data, end)[0] != zlib.crc32(memoryview(data)[:end]):
+            raise SnapshotError("checksum mismatch")
+
+        view = memoryview(data)
+        offset = HEADER.size
+        strings = cls._read_strings(view[offset:offset + strings_size])
+        offset += strings_size
+        rows = array.array("I")
+        rows.frombytes(view[offset:offset + rows_size])
+        if sys.byteorder != "little":
+            rows.byteswap()
+        offset += rows_size
+
+        notes = []
+        width = len(FIELDS)
+        empty_id = bytes(ID_SIZE)
+        for index in range(count):
+            row = rows[index * width:(index + 1) * width]
+            try:
+                note = {field: (strings[value] if value != MISSING else None) for field, value in zip(FIELDS, row)}
+            except IndexError:
+                raise SnapshotError("string id out of range") from None
+            raw_id = bytes(view[offset + index * ID_SIZE:offset + (index + 1) * ID_SIZE])
+            note["_id"] = ObjectId(raw_id) if raw_id != empty_id else None
+            notes.append(note)
+        return cls(notes, catalog_version, written_at)
+
+    @staticmethod
+    def _read_strings(table: memoryview) -> List[str]:
+        if len(table) < COUNT.size:
+            raise SnapshotError("string table too short")
+        count = COUNT.unpack_from(table)[0]
+        start = COUNT.size + count * 4
+        if start > len(table):
+            raise SnapshotError("string table too short")
+        lengths = array.array("I")
+        lengths.frombytes(table[COUNT.size:start])
+        if sys.byteorder != "little":
+            lengths.byteswap()
+        if start + sum(lengths) != len(table):
+            raise SnapshotError("string table size mismatch")
+
+        strings = []
+        for length in lengths:
+            try:
+                strings.append(str(table[start:start + length], "utf-8"))
+            except UnicodeDecodeError as e:
+                raise SnapshotError(f"string table is not UTF-8: {e}") from None
+            start += length
+        return strings
+
+    @classmethod
+    def load(cls, path: str) -> "CatalogSnapshot":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    def save(self, path: str) -> int:
+        """Write atomically (temp file + rename); returns the file size"""
+        data = self.to_bytes()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".catalog-", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return len(data)
+
+
+if __name__ == "__main__":
+    # Round trip and size check against JSON on a synthetic catalog
+    import json
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+    from catalog import generate_catalog
+
+    notes = [{**note, "_id": ObjectId()} for note in generate_catalog(10000)]
+    snapshot = CatalogSnapshot(notes, catalog_version=42)
+    data = snapshot.to_bytes()
+
+    started = time.perf_counter()
+    loaded = CatalogSnapshot.from_bytes(data)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    expected = [{field: note.get(field) for field in FIELDS + ("_id",)} for note in notes]
+    assert loaded.notes == expected and loaded.catalog_version == 42, "round trip changed the catalog"
+    json_size = len(json.dumps([{**note, "_id": str(note["_id"])} for note in expected]).encode("utf-8"))
+    print(f"{len(loaded)} notes: {len(data) / 1024:.0f} KiB (JSON {json_size / 1024:.0f} KiB), "
+          f"loaded in {load_ms:.1f}ms")
+
+    # Values are stored by length, so separators inside them and empty tables round-trip
+    for edge in ([{"subject_code": "A\0B", "subject_name": "", "semester": "Sem3\0"}], [{}], []):
+        loaded = CatalogSnapshot.from_bytes(CatalogSnapshot(edge, catalog_version=1).to_bytes())
+        assert loaded.notes == [{field: note.get(field) for field in FIELDS + ("_id",)} for note in edge], edge
@@ -0,0 +1,213 @@
+"""
+Keeps this process's in-memory view of the notes catalog in step with
+writes made elsewhere (import_notes.py, sync_from_source, other workers
+and replicas).
+
+When the deployment supports change streams (replica sets, Atlas) the
+watcher follows one on the notes and meta collections and folds each
+insert, update and delete into the search index, fuzzy index and caches.
+Otherwise it polls a cheap marker - the shared catalog version, the
+estimated document count and the highest _id - fetching only the new notes
+when the change is a plain append and refreshing everything otherwise.
+
+The delay between a write and this process applying it is exported as
+notezy_catalog_propagation_seconds{mode}. It is measured against the
+server's clock, so clock skew between the app and MongoDB shows up in it.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CHANGES = REGISTRY.counter(
+    "notezy_catalog_changes_total", "Catalog changes made elsewhere and applied in-process",
+    ["mode", "operation"])
+CATALOG_PROPAGATION_SECONDS = REGISTRY.histogram(
+    "notezy_catalog_propagation_seconds", "Delay between a catalog write and this process applying it",
+    ["mode"], buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300))
+
+# Server error codes meaning "no change streams here" (standalone server, unsupported command)
+CHANGE_STREAMS_UNSUPPORTED = {40573, 115}
+CHANGE_STREAM_HISTORY_LOST = 286
+
+CatalogMarker = namedtuple("CatalogMarker", ["version", "count", "max_id", "changed_at"])
+
+
+def observe_propagation(mode: str, written_at: Optional[datetime]):
+    if written_at is None:
+        return
+    if written_at.tzinfo is None:  # pymongo returns naive UTC datetimes
+        written_at = written_at.replace(tzinfo=timezone.utc)
+    delay = (datetime.now(timezone.utc) - written_at).total_seconds()
+    CATALOG_PROPAGATION_SECONDS.observe(max(0.0, delay), mode=mode)
+
+
+class CatalogWatcher:
+    """Applies catalog changes made by other processes to one NotesDatabase"""
+
+    def __init__(self, database, mode: str = "auto", poll_interval: float = 30, retry_delay: float = 5):
+        self.database = database
+        self.mode = mode  # "auto" (change stream if supported) or "poll"
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.active_mode: Optional[str] = None
+        self.marker: Optional[CatalogMarker] = None
+        self._resume_token = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls, database) -> "CatalogWatcher":
+        return cls(
+            database,
+            mode=os.getenv("CATALOG_WATCH", "auto").lower(),
+            poll_interval=float(os.getenv("CATALOG_REFRESH_INTERVAL", "30"))
+        )
+
+    def _set_mode(self, mode: str):
+        if self.active_mode != mode:
+            self.active_mode = mode
+            label = "change stream" if mode == "changes" else f"polling every {self.poll_interval:g}s"
+            logger.info(f"👀 Watching the catalog for changes ({label})")
+
+    # Change stream
+
+    def follow_changes(self):
+        """Apply change events until stopped or the stream is invalidated (blocking; runs in a thread)"""
+        database = self.database
+        collections = [database.collection.name, database.meta.name]
+        options = {"full_document": "updateLookup", "max_await_time_ms": 1000}
+        if self._resume_token is not None:
+            options["resume_after"] = self._resume_token
+
+        with database.db.watch([{"$match": {"ns.coll": {"$in": collections}}}], **options) as stream:
+            database.mark_online()
+            self._set_mode("changes")
+            if self._resume_token is None:
+                # Writes between loading the catalog and opening the stream
+                database.refresh_catalog_version()
+            while not self._stop.is_set():
+                change = stream.try_next()
+                self._resume_token = stream.resume_token
+                if change is None:
+                    continue
+                self.apply_change(change)
+                if change["operationType"] == "invalidate":
+                    self._resume_token = None
+                    return
+
+    def apply_change(self, change: Dict):
+        """Fold one change stream event into the database's index and caches"""
+        database = self.database
+        operation = change["operationType"]
+        if change.get("ns", {}).get("coll") == database.meta.name:
+            document = change.get("fullDocument") or {}
+            if document.get("_id") == "catalog":
+                database.apply_catalog_changes(shared_version=document.get("version", 0))
+            return
+
+        document = change.get("fullDocument")
+        if operation == "insert":
+            database.apply_catalog_changes(inserted=[document])
+        elif operation in ("update", "replace") and document is not None:
+            database.apply_catalog_changes(updated=[document])
+        elif operation in ("update", "replace", "delete"):  # Updated, then deleted before the lookup
+            database.apply_catalog_changes(deleted=[change["documentKey"]["_id"]])
+        else:  # drop, rename, dropDatabase, invalidate
+            operation = "reload"
+            database.refresh_catalog_version(force=True)
+
+        CATALOG_CHANGES.inc(mode="changes", operation=operation)
+        written_at = change.get("wallTime")  # MongoDB 6.0+, otherwise the cluster time (seconds)
+        if written_at is None and change.get("clusterTime") is not None:
+            written_at = change["clusterTime"].as_datetime()
+        observe_propagation("changes", written_at)
+
+    # Polling
+
+    def read_marker(self) -> CatalogMarker:
+        """Shared version, estimated count and newest _id - three cheap reads"""
+        database = self.database
+        meta = database.meta.find_one({"_id": "catalog"}) or {}
+        count = database.collection.estimated_document_count()
+        newest = database.collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        database.mark_online()
+        return CatalogMarker(meta.get("version", 0), count, newest["_id"] if newest else None,
+                             meta.get("changed_at"))
+
+    def poll_once(self) -> bool:
+        """Compare the marker with the previous one and apply what changed; True if anything did"""
+        database = self.database
+        marker = self.read_marker()
+        previous, self.marker = self.marker, marker
+        if previous is None:
+            # First look: catch writes made since the catalog was loaded
+            return database.refresh_catalog_version()
+        if marker[:3] == previous[:3]:
+            return False
+
+        # A plain append (import/sync) only needs the new notes
+        added = marker.count - previous.count
+        if added > 0 and marker.max_id is not None:
+            query = {"_id": {"$gt": previous.max_id}} if previous.max_id is not None else {}
+            notes = list(database.collection.find(query))
+            if len(notes) == added:
+                database.apply_catalog_changes(inserted=notes, shared_version=marker.version)
+                CATALOG_CHANGES.inc(added, mode="poll", operation="insert")
+                observe_propagation("poll", min(note["_id"].generation_time for note in notes))
+                return True
+
+        # Updates, deletes or a mix: reload
+        database.refresh_catalog_version(force=True)
+        CATALOG_CHANGES.inc(mode="poll", operation="reload")
+        observe_propagation("poll", marker.changed_at)
+        return True
+
+    async def _poll_forever(self):
+        loop = asyncio.get_running_loop()
+        self._set_mode("poll")
+        while True:
+            try:
+                if await loop.run_in_executor(None, self.poll_once):
+                    logger.info(f"🔄 Catalog changed elsewhere - applied (version {self.database.catalog_version})")
+            except PyMongoError as e:
+                logger.warning(f"⚠️ Catalog poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def run(self):
+        """Watch the catalog until cancelled: change stream when supported, polling otherwise"""
+        loop = asyncio.get_running_loop()
+        self._stop.clear()
+        try:
+            while self.mode != "poll":
+                try:
+                    await loop.run_in_executor(None, self.follow_changes)
+                except OperationFailure as e:
+                    if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                        logger.info(f"ℹ️ Change streams not supported here ({e.code}) - polling instead")
+                        break
+                    if e.code == CHANGE_STREAM_HISTORY_LOST:
+                        # Too far behind to resume: start over from the current catalog
+                        self._resume_token = None
+                        await loop.run_in_executor(None, self.database.refresh_catalog_version, True)
+                        continue
+                    logger.warning(f"⚠️ Catalog change stream failed: {e} - retrying in {self.retry_delay:g}s")
+                    await asyncio.sleep(self.retry_delay)
+                except PyMongoError as e:
+                    logger.warning(f"⚠️ Catalog change stream failed: {e} - retrying in {self.retry_delay:g}s")
+                    await asyncio.sleep(self.retry_delay)
+                except Exception as e:  # e.g. stand-in clients (benchmarks) without change streams
+                    logger.warning(f"⚠️ Catalog change stream unavailable ({e}) - polling instead")
+                    break
+            await self._poll_forever()
+        finally:
+            self._stop.set()  # Lets a change stream thread exit within max_await_time_ms
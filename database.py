@@ -1,34 +1,388 @@
 import os
-from typing import List, Dict, Optional
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+from contextlib import nullcontext
+from typing import List, Dict, Optional, Tuple
+import pymongo
+from pymongo import MongoClient, UpdateOne, ReturnDocument, IndexModel
+from pymongo.errors import ConnectionFailure, PyMongoError, ServerSelectionTimeoutError
 import json
+import logging
 import re
+import threading
+import time
+from search_common import (
+    SEARCH_FIELDS, score_match, note_key, BestMatches, build_exact_result, build_partial_result,
+    query_variations as build_query_variations
+)
+from search_index import SearchIndex, NOTE_PROJECTION
+from search_cache import SearchCache, normalize_query
+from search_pipeline import build_partial_search_pipeline, partial_search_combos
+from fuzzy_index import FuzzyIndex
+from catalog_snapshot import CatalogSnapshot, SnapshotError
+from metrics import REGISTRY, COMMAND_COUNTER
+from logs import sampled, sampled_in
+
+logger = logging.getLogger(__name__)
+
+SEARCH_REQUESTS = REGISTRY.counter(
+    "notezy_search_requests_total", "search_notes calls by source (cache/index/mongo) and result type",
+    ["source", "result_type"])
+SEARCH_SECONDS = REGISTRY.histogram(
+    "notezy_search_seconds", "search_notes latency by source", ["source"])
+SEARCH_ROUND_TRIPS = REGISTRY.histogram(
+    "notezy_search_round_trips", "MongoDB round trips per search_notes call",
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64))
+STRATEGY_SECONDS = REGISTRY.histogram(
+    "notezy_search_strategy_seconds", "Time spent in each search strategy", ["strategy"])
+STRATEGY_ROUND_TRIPS = REGISTRY.counter(
+    "notezy_search_strategy_round_trips_total", "MongoDB round trips made by each search strategy", ["strategy"])
+STRATEGY_RESULTS = REGISTRY.histogram(
+    "notezy_search_strategy_results", "Notes matched by each search strategy", ["strategy"],
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250))
+SEARCH_CACHE_ENTRIES = REGISTRY.gauge(
+    "notezy_search_cache_entries", "Entries in the search result cache")
+SEARCH_CACHE_LOOKUPS = REGISTRY.counter(
+    "notezy_search_cache_lookups_total", "Search cache lookups by result (hit/miss)", ["result"])
+SEARCH_CACHE_HIT_RATIO = REGISTRY.gauge(
+    "notezy_search_cache_hit_ratio", "Search cache hits / lookups")
+CATALOG_VERSION = REGISTRY.gauge(
+    "notezy_catalog_version", "In-process catalog version (bumped on every write)")
+SNAPSHOT_READS = REGISTRY.counter(
+    "notezy_snapshot_reads_total", "Reads answered from the catalog snapshot instead of MongoDB, and why",
+    ["operation", "reason"])
+MONGO_OFFLINE = REGISTRY.gauge(
+    "notezy_mongo_offline", "1 while MongoDB is unreachable and reads are served from the snapshot")
+
+NOTE_INDEXES = [
+    IndexModel([("subject_code", 1)]),
+    IndexModel([("subject_name", 1)]),
+    IndexModel([("full_name", 1)]),
+    IndexModel([("semester", 1), ("branch", 1)]),
+    IndexModel([("subject_code_norm", 1)]),
+    IndexModel([("subject_name_norm", 1)]),
+]
 
 class NotesDatabase:
-    def __init__(self, db_name="notezy_bot"):
-        mongodb_uri = os.getenv("MONGODB_URI")
-        if not mongodb_uri:
-            raise ValueError("MONGODB_URI not found in environment variables")
+    def __init__(self, db_name="notezy_bot", use_search_index: Optional[bool] = None, client=None,
+                 ensure_indexes: bool = True, load_catalog: bool = True):
+        # Connection pool size, also used to size the async executor
+        self.pool_size = int(os.getenv("MONGODB_POOL_SIZE", "20"))
+        
+        # Local catalog snapshot (CATALOG_SNAPSHOT, empty disables): lets the bot boot and answer
+        # read-only searches while MongoDB is unreachable or slower than MONGODB_READ_TIMEOUT_MS
+        self.snapshot_path = os.getenv("CATALOG_SNAPSHOT", "catalog.snapshot")
+        self.read_timeout = float(os.getenv("MONGODB_READ_TIMEOUT_MS", "1500")) / 1000
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self.snapshot_version: Optional[int] = None
+        self._snapshot_index: Optional[SearchIndex] = None  # Built on first use, see snapshot_index
+        self._snapshot_lock = threading.Lock()
+        self.offline = False
+        MONGO_OFFLINE.set_function(lambda: int(self.offline))
+        self.load_snapshot()
+        
+        # An existing client (e.g. a local stand-in for benchmarks) can be passed in
+        if client is None:
+            mongodb_uri = os.getenv("MONGODB_URI")
+            if not mongodb_uri:
+                raise ValueError("MONGODB_URI not found in environment variables")
         
         try:
-            self.client = MongoClient(mongodb_uri)
+            self.client = client if client is not None else MongoClient(
+                mongodb_uri, maxPoolSize=self.pool_size, event_listeners=[COMMAND_COUNTER])
             self.db = self.client[db_name]
             self.collection = self.db.notes
+            self.meta = self.db.meta  # Shared catalog version, seen by every process
             
-            # Test connection
-            self.client.admin.command('ping')
-            print("✅ Connected to MongoDB successfully")
+            # Test connection (bounded when the snapshot can take over)
+            boot_timeout = float(os.getenv("MONGODB_BOOT_TIMEOUT_MS", "5000")) / 1000
+            with self._read_deadline(boot_timeout):
+                self.client.admin.command('ping')
+            logger.info("✅ Connected to MongoDB successfully")
             
-            # Create indexes for better performance
-            self.collection.create_index([("subject_code", 1)])
-            self.collection.create_index([("subject_name", 1)])
-            self.collection.create_index([("full_name", 1)])
-            self.collection.create_index([("semester", 1), ("branch", 1)])
+            # Indexes and migrations; the bots pass ensure_indexes=False and load_catalog=False
+            # and run reconcile_indexes() and load_catalog() after startup, so only the ping blocks it
+            if ensure_indexes:
+                self.reconcile_indexes()
             
         except ConnectionFailure:
-            print("❌ Failed to connect to MongoDB")
-            raise
+            if self.snapshot is None:
+                logger.error("❌ Failed to connect to MongoDB")
+                raise
+            self.offline = True
+            logger.warning(f"⚠️ MongoDB unreachable - serving read-only searches from catalog snapshot "
+                           f"v{self.snapshot_version}")
+        
+        # catalog_version is local; the shared version tells us about writes made by other processes
+        # (None until load_catalog has read it)
+        self.catalog_version = 0
+        self._shared_catalog_version: Optional[int] = None
+        self._refresh_lock = threading.Lock()
+        
+        # Optional in-memory search index (SEARCH_INDEX=1 to enable by default)
+        if use_search_index is None:
+            use_search_index = os.getenv("SEARCH_INDEX", "").lower() in ("1", "true", "yes")
+        self.use_search_index = use_search_index
+        self.search_index = None
+        self._index_lock = threading.Lock()  # Orders index changes against full reloads
+        
+        # Booted offline, reads fall back to the snapshot; the catalog is loaded once MongoDB answers
+        if load_catalog and not self.offline:
+            self.load_catalog()
+        
+        # Partial search mode: "regex" (one find per variation/field) or "aggregate" (one round trip)
+        self.partial_search_mode = os.getenv("PARTIAL_SEARCH_MODE", "regex").lower()
+        
+        # Typo-tolerant index over codes and names, rebuilt in the background when the catalog changes
+        self._fuzzy_index = None
+        self._fuzzy_index_version = None
+        self._fuzzy_lock = threading.Lock()
+        self._fuzzy_rebuilding = False
+        
+        # Search result cache, invalidated whenever the catalog version changes
+        self._semester_branches: Dict[str, List[str]] = {}
+        self._semester_branches_version = None
+        self.search_cache = SearchCache(
+            max_size=int(os.getenv("SEARCH_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("SEARCH_CACHE_TTL", "300"))
+        )
+        
+        # Read at scrape time by the /metrics endpoint
+        SEARCH_CACHE_ENTRIES.set_function(lambda: self.search_cache.stats()["size"])
+        SEARCH_CACHE_HIT_RATIO.set_function(lambda: self.search_cache.stats()["hit_ratio"])
+        CATALOG_VERSION.set_function(lambda: self.catalog_version)
+    
+    def bump_catalog_version(self):
+        """Mark the catalog as changed so cached search results are discarded"""
+        self.catalog_version += 1
+        
+        # Let other worker processes and replicas know (see refresh_catalog_version)
+        try:
+            doc = self.meta.find_one_and_update(
+                {"_id": "catalog"}, {"$inc": {"version": 1}, "$currentDate": {"changed_at": True}},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+            self._shared_catalog_version = doc["version"]
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Failed to publish catalog version: {e}")
+    
+    def _read_shared_catalog_version(self) -> int:
+        with self._read_deadline():
+            doc = self.meta.find_one({"_id": "catalog"}) or {}
+        return doc.get("version", 0)
+    
+    def refresh_catalog_version(self, force: bool = False) -> bool:
+        """Pick up catalog changes made by other processes; True if local caches were invalidated"""
+        with self._refresh_lock:  # The watcher and warm-up may both get here first
+            shared_version = self._read_shared_catalog_version()
+            self.mark_online()
+            if shared_version == self._shared_catalog_version and not force:
+                return False
+            
+            self._shared_catalog_version = shared_version
+            if self.use_search_index:
+                if self.snapshot_is_current():
+                    with self._index_lock:
+                        self.search_index = self.snapshot_index  # Already built from an up-to-date snapshot
+                else:
+                    self.load_search_index()
+            self.catalog_version += 1
+            return True
+    
+    def load_catalog(self):
+        """Read the shared catalog version and, with SEARCH_INDEX, load the search index"""
+        if self._shared_catalog_version is None:
+            self.refresh_catalog_version()
+    
+    def mark_online(self):
+        """Called after a successful MongoDB read; leaves snapshot mode if we were in it"""
+        if self.offline:
+            self.offline = False
+            logger.info("✅ MongoDB reachable again - leaving read-only snapshot mode")
+    
+    def apply_catalog_changes(self, inserted: List[Dict] = (), updated: List[Dict] = (), deleted: List = (),
+                              shared_version: Optional[int] = None):
+        """Fold notes written by other processes into the index and caches without reloading them"""
+        if shared_version is not None:
+            self._shared_catalog_version = shared_version
+        if not (inserted or updated or deleted):
+            return
+        fuzzy_current = self._fuzzy_index is not None and self._fuzzy_index_version == self.catalog_version
+        branches_current = self._semester_branches_version == self.catalog_version
+        
+        # Our own writes are already indexed, so changed notes are removed before being re-added
+        changed = list(inserted) + list(updated)
+        self._update_search_index(added=changed, removed=list(deleted) + [note["_id"] for note in changed])
+        # Only now, so no search caches an answer from the unchanged index under the new version
+        self.catalog_version += 1
+        
+        # Removed codes and names may linger in the fuzzy index; they just match no notes
+        if fuzzy_current:
+            for note in list(inserted) + list(updated):
+                self._fuzzy_index.add(note.get("subject_code_norm") or note.get("subject_code"),
+                                      note.get("subject_name_norm") or note.get("subject_name"))
+            self._fuzzy_index_version = self.catalog_version
+        
+        # Updates and deletes can take a branch out of a semester, so those semesters are re-read
+        if branches_current:
+            if updated or deleted:
+                self._semester_branches.clear()
+            for note in inserted:
+                branches = self._semester_branches.get(note.get("semester"))
+                if branches is not None and note.get("branch") and note["branch"] not in branches:
+                    branches.append(note["branch"])
+            self._semester_branches_version = self.catalog_version
+    
+    def _update_search_index(self, added: List[Dict] = (), removed: List = ()):
+        """Apply note changes to the search index (SearchIndex locks out searches while it changes)"""
+        with self._index_lock:
+            if self.search_index is not None and (added or removed):
+                self.search_index.update(added, removed)
+    
+    def _read_deadline(self, seconds: Optional[float] = None):
+        """Client-side timeout for a MongoDB read, only when the snapshot can answer instead"""
+        if self.snapshot is None:
+            return nullcontext()
+        return pymongo.timeout(seconds if seconds is not None else self.read_timeout)
+    
+    def _read_with_fallback(self, operation: str, mongo_read, snapshot_read):
+        """Run a MongoDB read, answering from the snapshot when MongoDB is down or too slow"""
+        if self.offline and self.snapshot is not None:
+            SNAPSHOT_READS.inc(operation=operation, reason="offline")
+            return snapshot_read()
+        try:
+            with self._read_deadline():
+                return mongo_read()
+        except PyMongoError as e:
+            if self.snapshot is None:
+                raise
+            if isinstance(e, ServerSelectionTimeoutError):
+                # No server to talk to: skip MongoDB until refresh_catalog_version reaches it again
+                self.offline = True
+                logger.warning(f"⚠️ MongoDB unreachable ({e}) - serving read-only searches from the snapshot")
+                reason = "unreachable"
+            else:
+                reason = "timeout" if getattr(e, "timeout", False) else "error"
+            SNAPSHOT_READS.inc(operation=operation, reason=reason)
+            return snapshot_read()
+    
+    def load_snapshot(self) -> bool:
+        """Read CATALOG_SNAPSHOT (its search index is built on first use); False if there is none or it is unreadable"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        started = time.perf_counter()
+        try:
+            snapshot = CatalogSnapshot.load(self.snapshot_path)
+        except (OSError, SnapshotError) as e:
+            logger.warning(f"⚠️ Ignoring catalog snapshot {self.snapshot_path}: {e}")
+            return False
+        self.snapshot = snapshot
+        self.snapshot_version = snapshot.catalog_version
+        logger.info(f"💾 Catalog snapshot v{snapshot.catalog_version} loaded: {len(snapshot)} notes "
+                    f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return True
+    
+    @property
+    def snapshot_index(self) -> Optional[SearchIndex]:
+        """Search index over the snapshot, built the first time a read falls back to it"""
+        if self._snapshot_index is None and self.snapshot is not None:
+            with self._snapshot_lock:
+                if self._snapshot_index is None:
+                    started = time.perf_counter()
+                    self._snapshot_index = SearchIndex(self.snapshot.notes)
+                    logger.info(f"💾 Snapshot search index built in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return self._snapshot_index
+    
+    def snapshot_is_current(self) -> bool:
+        return self.snapshot is not None and self.snapshot_version == self._shared_catalog_version
+    
+    def write_snapshot(self) -> Optional[int]:
+        """Save the catalog to CATALOG_SNAPSHOT; returns notes written (None when disabled)"""
+        if not self.snapshot_path:
+            return None
+        version = self._read_shared_catalog_version()
+        notes = list(self.collection.find({}, NOTE_PROJECTION))
+        snapshot = CatalogSnapshot(notes, version)
+        size = snapshot.save(self.snapshot_path)
+        with self._snapshot_lock:
+            self.snapshot, self._snapshot_index = snapshot, None
+        self.snapshot_version = version
+        logger.info(f"💾 Catalog snapshot v{version} written: {len(notes)} notes, {size / 1024:.0f} KiB")
+        return len(notes)
+    
+    def ensure_snapshot(self) -> bool:
+        """Rewrite the snapshot if it is missing or older than the catalog; True if written"""
+        if not self.snapshot_path or self.offline or self.snapshot_is_current():
+            return False
+        self.write_snapshot()
+        return True
+    
+    def _memory_index(self) -> Optional[SearchIndex]:
+        """The in-memory index to search: SEARCH_INDEX, or the snapshot while MongoDB is offline"""
+        if self.search_index is not None:
+            return self.search_index
+        return self.snapshot_index if self.offline else None
+    
+    @staticmethod
+    def normalized_fields(subject_code: Optional[str], subject_name: Optional[str]) -> Dict:
+        """Lowercased shadow fields used for index-backed exact lookups"""
+        return {
+            "subject_code_norm": (subject_code or "").lower(),
+            "subject_name_norm": (subject_name or "").lower()
+        }
+    
+    def reconcile_indexes(self) -> int:
+        """Create any missing note indexes and backfill normalized fields; returns indexes created"""
+        existing = {tuple(index["key"].items()) for index in self.collection.list_indexes()}
+        missing = [model for model in NOTE_INDEXES if tuple(model.document["key"].items()) not in existing]
+        if missing:
+            self.collection.create_indexes(missing)
+            logger.info(f"✅ Created {len(missing)} missing indexes")
+        
+        # Backfill normalized lookup fields on notes inserted before they existed
+        self.migrate_normalized_fields()
+        return len(missing)
+    
+    def migrate_normalized_fields(self, batch_size: int = 500) -> int:
+        """Add subject_code_norm/subject_name_norm to notes that are missing them"""
+        missing = self.collection.find(
+            {"$or": [{"subject_code_norm": {"$exists": False}}, {"subject_name_norm": {"$exists": False}}]},
+            {"subject_code": 1, "subject_name": 1}
+        )
+        
+        updated = 0
+        operations = []
+        for doc in missing:
+            operations.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": self.normalized_fields(doc.get("subject_code"), doc.get("subject_name"))}
+            ))
+            if len(operations) >= batch_size:
+                updated += self.collection.bulk_write(operations, ordered=False).modified_count
+                operations = []
+        if operations:
+            updated += self.collection.bulk_write(operations, ordered=False).modified_count
+        
+        if updated:
+            logger.info(f"✅ Added normalized search fields to {updated} notes")
+        return updated
+    
+    def load_search_index(self) -> SearchIndex:
+        """Load the whole notes collection into an in-memory search index"""
+        with self._index_lock:  # A change applied to the old index meanwhile would be lost
+            notes = list(self.collection.find({}, NOTE_PROJECTION))
+            self.search_index = SearchIndex(notes)
+        logger.info(f"✅ Search index loaded with {len(self.search_index)} notes")
+        return self.search_index
+    
+    def warm_catalog(self) -> int:
+        """Read the catalog once (warming MongoDB's working set) and build the fuzzy index; returns notes read"""
+        self.load_catalog()
+        index = self._memory_index()
+        if index is not None:
+            read = len(index)
+        else:
+            read = sum(1 for _ in self.collection.find({}, NOTE_PROJECTION).batch_size(1000))
+        self.get_fuzzy_index()
+        return read
     
     def add_note(self, subject_code: str, subject_name: str, branch_url: str, 
                  semester: str = None, branch: str = None):
@@ -41,10 +395,13 @@ class NotesDatabase:
             "full_name": full_name,
             "branch_url": branch_url,
             "semester": semester,
-            "branch": branch
+            "branch": branch,
+            **self.normalized_fields(subject_code, subject_name)
         }
         
         result = self.collection.insert_one(note_doc)
+        self._update_search_index(added=[note_doc])
+        self.bump_catalog_version()
         return result.inserted_id
     
     def bulk_insert(self, notes_list: List[Dict]):
@@ -62,208 +419,272 @@ class NotesDatabase:
                 "full_name": full_name,
                 "branch_url": note['branch_url'],
                 "semester": note.get('semester'),
-                "branch": note.get('branch')
+                "branch": note.get('branch'),
+                **self.normalized_fields(subject_code, subject_name)
             }
             documents.append(doc)
         
         if documents:
             result = self.collection.insert_many(documents)
-            print(f"✅ Inserted {len(result.inserted_ids)} notes successfully")
+            self._update_search_index(added=documents)
+            self.bump_catalog_version()
+            logger.info(f"✅ Inserted {len(result.inserted_ids)} notes successfully")
             return result.inserted_ids
         return []
     
-    def search_notes(self, query: str, limit: int = 10) -> Dict:
-        """Advanced search with multiple strategies"""
+    def search_notes(self, query: str, limit: int = 10, semester: Optional[str] = None) -> Dict:
+        """Advanced search with multiple strategies, served from the result cache when possible"""
+        started = time.perf_counter()
+        round_trips = COMMAND_COUNTER.current()
+        key = (normalize_query(query), limit, semester)
+        version = self.catalog_version
+        
+        cached = self.search_cache.get(key, version)
+        SEARCH_CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+        if cached is not None:
+            source = "cache"
+            result = {**cached, "query": query}
+        else:
+            result, source = self._search_notes_uncached(query, limit, semester)
+            # Snapshot answers are retried against MongoDB once it answers again, and misses or
+            # typo matches from a fuzzy index still being rebuilt once the new one is ready
+            fuzzy_stale = (result["type"] == "none" or result.get("fuzzy")) and self._fuzzy_index_version != version
+            if source != "snapshot" and not fuzzy_stale:
+                self.search_cache.put(key, result, version)
+        
+        elapsed = time.perf_counter() - started
+        round_trips = COMMAND_COUNTER.current() - round_trips
+        SEARCH_REQUESTS.inc(source=source, result_type=result["type"])
+        SEARCH_SECONDS.observe(elapsed, source=source)
+        SEARCH_ROUND_TRIPS.observe(round_trips)
+        if sampled_in():
+            logger.info("🔍 Search %r: %s from %s in %.1fms", query, result["type"], source, elapsed * 1000,
+                        extra=sampled(source=source, result_type=result["type"], results=len(result["results"]),
+                                      duration_ms=round(elapsed * 1000, 1), round_trips=round_trips))
+        return result
+    
+    def _search_notes_uncached(self, query: str, limit: int, semester: Optional[str] = None) -> Tuple[Dict, str]:
+        """Run the search strategies against the index, MongoDB or the snapshot; returns (result, source)
+        
+        A semester restricts every strategy before the top `limit` matches are picked.
+        """
+        # Serve from the in-memory index when it is loaded (no MongoDB round trips)
+        if self.search_index is not None:
+            source = "index"
+            result = self._search_index(self.search_index, query, limit, semester)
+        else:
+            source = "mongo"
+            
+            def from_snapshot():
+                nonlocal source
+                source = "snapshot"
+                return self._search_index(self.snapshot_index, query, limit, semester)
+            
+            result = self._read_with_fallback("search", lambda: self._search_mongo(query, limit, semester), from_snapshot)
+        
+        # Strategy 4: typo-tolerant match, only when everything else missed
+        if result["type"] == "none":
+            started = self._strategy_started()
+            try:
+                with self._read_deadline():
+                    result = self._fuzzy_search(query, limit, semester) or result
+            except PyMongoError:
+                if self.snapshot is None:
+                    raise
+                source = "snapshot"  # Keep the miss; MongoDB is struggling, don't cache it
+            self._strategy_finished("fuzzy", started, self._result_count(result))
+        return result, source
+    
+    def _search_index(self, index: SearchIndex, query: str, limit: int, semester: Optional[str]) -> Dict:
+        started = self._strategy_started()
+        result = index.search(query, limit, semester)
+        self._strategy_finished("index", started, self._result_count(result))
+        return result
+    
+    @staticmethod
+    def _strategy_started():
+        return time.perf_counter(), COMMAND_COUNTER.current()
+    
+    @staticmethod
+    def _strategy_finished(strategy: str, started, result_count: int):
+        """Record timing, round trips and matches for one search strategy"""
+        start_time, round_trips = started
+        STRATEGY_SECONDS.observe(time.perf_counter() - start_time, strategy=strategy)
+        STRATEGY_ROUND_TRIPS.inc(COMMAND_COUNTER.current() - round_trips, strategy=strategy)
+        STRATEGY_RESULTS.observe(result_count, strategy=strategy)
+    
+    @staticmethod
+    def _result_count(result: Dict) -> int:
+        return result.get("total_matches", len(result["results"]))
+    
+    def _search_mongo(self, query: str, limit: int, semester: Optional[str]) -> Dict:
+        """Exact and partial strategies against MongoDB"""
         query_lower = query.lower().strip()
-        original_query = query_lower
+        in_semester = {"semester": semester} if semester else {}
         
         # Preprocess query for better matching
-        query_variations = [query_lower]
-        
-        # Handle semester queries (e.g., "3rd sem" -> "sem3")
-        sem_match = re.search(r'(\d+)(?:st|nd|rd|th)?\s*sem(?:ester)?', query_lower)
-        if sem_match:
-            sem_num = sem_match.group(1)
-            query_variations.extend([f"sem{sem_num}", f"Sem{sem_num}"])
-        
-        # Handle common abbreviations
-        abbreviations = {
-            'math': ['mathematics', 'maths'],
-            'os': ['operating systems', 'operating system'],
-            'cn': ['computer networks', 'computer network', 'networks'],
-            'dbms': ['database', 'database management'],
-            'ds': ['data structures', 'data structure'],
-            'ada': ['analysis and design of algorithms', 'algorithms'],
-            'oops': ['object oriented programming', 'oop'],
-            'se': ['software engineering'],
-            'coa': ['computer organization', 'computer architecture'],
-            'mp': ['microprocessor', 'microcontroller'],
-            'dms': ['discrete mathematical structures', 'discrete mathematics']
-        }
-        
-        if query_lower in abbreviations:
-            query_variations.extend(abbreviations[query_lower])
+        query_variations = build_query_variations(query_lower)
         
         # Strategy 1: Exact subject code match (highest priority)
-        for query_var in query_variations:
-            exact_code_match = list(self.collection.find({
-                "subject_code": {"$regex": f"^{re.escape(query_var)}$", "$options": "i"}
-            }).limit(limit))
-            
-            if exact_code_match:
-                results = []
-                for note in exact_code_match:
-                    results.append({
-                        'full_name': note['full_name'],
-                        'branch_url': note['branch_url'],
-                        'semester': note['semester'],
-                        'branch': note['branch'],
-                        'subject_code': note.get('subject_code', ''),
-                        'subject_name': note.get('subject_name', ''),
-                        'exact_match': True,
-                        'match_type': 'exact_code'
-                    })
-                return {"type": "exact", "results": results, "query": query}
+        started = self._strategy_started()
+        exact_code_match = self._exact_lookup("subject_code_norm", query_variations, limit, semester)
+        self._strategy_finished("exact_code", started, len(exact_code_match))
+        if exact_code_match:
+            return build_exact_result(exact_code_match, query, 'exact_code')
         
         # Strategy 2: Exact subject name match
-        for query_var in query_variations:
-            exact_name_match = list(self.collection.find({
-                "subject_name": {"$regex": f"^{re.escape(query_var)}$", "$options": "i"}
-            }).limit(limit))
-            
-            if exact_name_match:
-                results = []
-                for note in exact_name_match:
-                    results.append({
-                        'full_name': note['full_name'],
-                        'branch_url': note['branch_url'],
-                        'semester': note['semester'],
-                        'branch': note['branch'],
-                        'subject_code': note.get('subject_code', ''),
-                        'subject_name': note.get('subject_name', ''),
-                        'exact_match': True,
-                        'match_type': 'exact_name'
-                    })
-                return {"type": "exact", "results": results, "query": query}
+        started = self._strategy_started()
+        exact_name_match = self._exact_lookup("subject_name_norm", query_variations, limit, semester)
+        self._strategy_finished("exact_name", started, len(exact_name_match))
+        if exact_name_match:
+            return build_exact_result(exact_name_match, query, 'exact_name')
         
         # Strategy 3: Partial matches with improved scoring
-        partial_matches = []
-        
-        # Search in multiple fields with different weights
-        search_fields = [
-            ("subject_code", 10),    # Highest weight
-            ("subject_name", 8),     # High weight
-            ("full_name", 6),        # Medium weight
-            ("semester", 3),         # Lower weight
-            ("branch", 2)            # Lowest weight
-        ]
+        started = self._strategy_started()
+        if self.partial_search_mode == "aggregate":
+            top_matches, total_matches = self._partial_search_aggregate(query_variations, limit, semester)
+            self._strategy_finished("partial_aggregate", started, total_matches)
+            return build_partial_result(top_matches, query, total_matches)
+        
+        best_matches = BestMatches()
         
         # Try multiple search strategies for partial matching
         for query_var in query_variations:
-            for field, weight in search_fields:
+            for field, weight in SEARCH_FIELDS:
                 # Strategy 1: Contains match (most flexible)
-                contains_matches = list(self.collection.find({
-                    field: {"$regex": re.escape(query_var), "$options": "i"}
-                }).limit(limit * 2))
+                cursors = [self.collection.find({
+                    field: {"$regex": re.escape(query_var), "$options": "i"}, **in_semester
+                }).limit(limit * 2)]
                 
-                # Strategy 2: Word boundary match (more precise)
-                if len(query_var) > 2:  # Only for longer queries
-                    word_boundary_matches = list(self.collection.find({
-                        field: {"$regex": r'\b' + re.escape(query_var), "$options": "i"}
+                # Strategy 2: Word boundary match (more precise, only for longer queries)
+                if len(query_var) > 2:
+                    cursors.append(self.collection.find({
+                        field: {"$regex": r'\b' + re.escape(query_var), "$options": "i"}, **in_semester
                     }).limit(limit * 2))
-                else:
-                    word_boundary_matches = []
                 
-                all_matches = contains_matches + word_boundary_matches
-                
-                for match in all_matches:
-                    if not match.get(field):  # Skip if field is None or empty
-                        continue
-                        
-                    # Calculate relevance score
-                    score = weight
-                    field_value = str(match[field]).lower()
-                    
-                    # Higher score for exact word matches
-                    if query_var in field_value.split():
-                        score += 8
-                    # Medium score for substring matches
-                    elif query_var in field_value:
-                        score += 4
-                    
-                    # Bonus for starting with query
-                    if field_value.startswith(query_var):
-                        score += 5
-                    
-                    # Bonus for shorter matches (more specific)
-                    if len(field_value) < 50:
-                        score += 3
-                    
-                    # Extra bonus if matched in subject name or code
-                    if field in ['subject_name', 'subject_code']:
-                        score += 2
-                    
-                    partial_matches.append({
-                        **match,
-                        'score': score,
-                        'matched_field': field,
-                        'matched_query': query_var
-                    })
+                # Score documents as they stream in, keeping only the best score per note
+                for cursor in cursors:
+                    for match in cursor:
+                        if not match.get(field):  # Skip if field is None or empty
+                            continue
+                        score = score_match(field, weight, str(match[field]).lower(), query_var)
+                        best_matches.add(match, score, field, query_var)
         
-        # Remove duplicates and sort by score
-        seen = set()
-        unique_matches = []
-        for match in partial_matches:
-            key = (match['subject_code'], match['subject_name'], match['semester'], match['branch'])
-            if key not in seen:
-                seen.add(key)
-                unique_matches.append(match)
-        
-        # Sort by score (highest first)
-        unique_matches.sort(key=lambda x: x['score'], reverse=True)
-        top_matches = unique_matches[:limit]
-        
-        if top_matches:
-            # Group by branch for better display
-            branch_groups = {}
-            for match in top_matches:
-                url = match['branch_url']
-                if url not in branch_groups:
-                    branch_groups[url] = {
-                        'subjects': [],
-                        'semester': match['semester'],
-                        'branch': match['branch'],
-                        'max_score': 0
-                    }
-                branch_groups[url]['subjects'].append({
-                    'full_name': match['full_name'],
-                    'score': match['score'],
-                    'matched_field': match['matched_field']
-                })
-                branch_groups[url]['max_score'] = max(branch_groups[url]['max_score'], match['score'])
+        top_matches = best_matches.top(limit)
+        self._strategy_finished("partial_regex", started, len(best_matches))
+        
+        return build_partial_result(top_matches, query, len(best_matches))
+    
+    def get_fuzzy_index(self) -> FuzzyIndex:
+        """Fuzzy index for the catalog, built on first use
+        
+        After a catalog change the previous index keeps answering while a fresh
+        one is built in the background, so no search waits for the rebuild.
+        """
+        if self._fuzzy_index is None:
+            with self._fuzzy_lock:
+                if self._fuzzy_index is None:
+                    self._build_fuzzy_index()
+        elif self._fuzzy_index_version != self.catalog_version and not self._fuzzy_rebuilding:
+            with self._fuzzy_lock:
+                if not self._fuzzy_rebuilding:
+                    self._fuzzy_rebuilding = True
+                    threading.Thread(target=self._rebuild_fuzzy_index, name="fuzzy-index", daemon=True).start()
+        return self._fuzzy_index
+    
+    def _build_fuzzy_index(self):
+        version = self.catalog_version
+        index = self._memory_index()
+        if index is not None:
+            codes = index.distinct_values("subject_code")
+            names = index.distinct_values("subject_name")
+        else:
+            codes = self.collection.distinct("subject_code_norm")
+            names = self.collection.distinct("subject_name_norm")
+        self._fuzzy_index = FuzzyIndex(codes, names)
+        self._fuzzy_index_version = version
+    
+    def _rebuild_fuzzy_index(self):
+        try:
+            self._build_fuzzy_index()
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Fuzzy index rebuild failed, keeping the previous one: {e}")
+        finally:
+            self._fuzzy_rebuilding = False
+    
+    def _fuzzy_search(self, query: str, limit: int, semester: Optional[str] = None) -> Optional[Dict]:
+        """Match subject codes, then names, within a small edit distance of the query"""
+        fuzzy_index = self.get_fuzzy_index()
+        
+        for field, weight, matcher in (("subject_code", 10, fuzzy_index.match_codes),
+                                       ("subject_name", 8, fuzzy_index.match_names)):
+            matches = matcher(query)
+            if not matches:
+                continue
             
-            # Sort branches by best score
-            sorted_branches = sorted(branch_groups.items(), 
-                                   key=lambda x: x[1]['max_score'], reverse=True)
+            distances = {value: distance for distance, value in matches}
+            index = self._memory_index()
+            if index is not None:
+                notes = index.exact_notes(field, list(distances))
+            else:
+                notes = list(self.collection.find({f"{field}_norm": {"$in": list(distances)}}))
+            if semester:
+                notes = [note for note in notes if note.get("semester") == semester]
             
-            results = []
-            for branch_url, data in sorted_branches:
-                results.append({
-                    'branch_url': branch_url,
-                    'semester': data['semester'],
-                    'branch': data['branch'],
-                    'subjects': data['subjects'][:10],  # Top 10 subjects per branch
-                    'total_subjects': len(data['subjects'])
-                })
+            unique_matches = {}
+            for note in notes:
+                key = note_key(note)
+                if key not in unique_matches:
+                    unique_matches[key] = {
+                        **note,
+                        'score': weight - distances[str(note.get(field) or "").lower()],
+                        'matched_field': field,
+                        'matched_query': query
+                    }
             
-            return {
-                "type": "partial", 
-                "results": results, 
-                "query": query,
-                "total_matches": len(unique_matches)
-            }
+            if unique_matches:
+                ranked = sorted(unique_matches.values(), key=lambda x: x['score'], reverse=True)
+                result = build_partial_result(ranked[:limit], query, len(ranked))
+                result["fuzzy"] = True
+                result["suggestions"] = list(distances)[:5]
+                return result
+        return None
+    
+    def _exact_lookup(self, norm_field: str, query_variations: List[str], limit: int,
+                      semester: Optional[str] = None) -> List[Dict]:
+        """Single indexed $in lookup over all variations, keeping the first variation that matched"""
+        norm_values = list(dict.fromkeys(query_var.lower() for query_var in query_variations))
+        query = {norm_field: {"$in": norm_values}}
+        if semester:
+            query["semester"] = semester
+        matches = list(self.collection.find(query))
+        
+        for norm_value in norm_values:
+            notes = [note for note in matches if note.get(norm_field) == norm_value]
+            if notes:
+                return notes[:limit]
+        return []
+    
+    def _partial_search_aggregate(self, query_variations: List[str], limit: int, semester: Optional[str] = None):
+        """Score, de-duplicate and rank partial matches in a single aggregation"""
+        pipeline = build_partial_search_pipeline(query_variations, limit, semester)
+        facets = next(self.collection.aggregate(pipeline), {"top": [], "total": []})
+        combos = partial_search_combos(query_variations)
+        
+        top_matches = []
+        for match in facets["top"]:
+            field, query_var = combos[match["combo"]]
+            top_matches.append({
+                **match["_id"],
+                'full_name': match.get('full_name'),
+                'branch_url': match.get('branch_url'),
+                'score': match['score'],
+                'matched_field': field,
+                'matched_query': query_var
+            })
         
-        return {"type": "none", "results": [], "query": query}
+        total_matches = facets["total"][0]["count"] if facets["total"] else 0
+        return top_matches, total_matches
     
     def get_all_notes(self) -> List[Dict]:
         """Get all notes from database"""
@@ -294,13 +715,39 @@ class NotesDatabase:
         
         self.bulk_insert(notes_list)
     
+    def get_semester_branches(self, semester: str) -> List[str]:
+        """Get all branches that have notes for a semester (cached until the catalog changes)"""
+        if self._semester_branches_version != self.catalog_version:
+            self._semester_branches = {}
+            self._semester_branches_version = self.catalog_version
+        branches = self._semester_branches.get(semester)
+        if branches is None:
+            snapshot_read = False
+            
+            def from_snapshot():
+                nonlocal snapshot_read
+                snapshot_read = True
+                notes = self.snapshot.notes
+                return sorted({n["branch"] for n in notes if n.get("semester") == semester and n.get("branch")})
+            
+            branches = self._read_with_fallback(
+                "semester_branches", lambda: self.collection.distinct("branch", {"semester": semester}), from_snapshot)
+            if not snapshot_read:
+                self._semester_branches[semester] = branches
+        return list(branches)
+    
     def count_notes(self) -> int:
         """Count total number of notes in the database"""
-        return self.collection.count_documents({})
+        return self._read_with_fallback(
+            "count", lambda: self.collection.count_documents({}), lambda: len(self.snapshot))
+    
+    def close(self):
+        """Close the MongoDB connection pool"""
+        self.client.close()
     
     def remove_duplicates(self):
         """Remove duplicate notes from the database"""
-        print("🧹 Starting duplicate removal...")
+        logger.info("🧹 Starting duplicate removal...")
         
         # Group documents by their unique combination
         pipeline = [
@@ -326,6 +773,7 @@ class NotesDatabase:
         duplicates = list(self.collection.aggregate(pipeline))
         total_removed = 0
         
+        removed_ids = []
         for group in duplicates:
             # Keep the first document, remove the rest
             docs = group["docs"]
@@ -333,12 +781,15 @@ class NotesDatabase:
             
             for doc in docs_to_remove:
                 self.collection.delete_one({"_id": doc["_id"]})
+                removed_ids.append(doc["_id"])
                 total_removed += 1
+        self._update_search_index(removed=removed_ids)
         
         if total_removed > 0:
-            print(f"✅ Removed {total_removed} duplicate notes")
+            self.bump_catalog_version()
+            logger.info(f"✅ Removed {total_removed} duplicate notes")
         else:
-            print("✅ No duplicates found")
+            logger.info("✅ No duplicates found")
             
         return total_removed
     
@@ -347,9 +798,9 @@ class NotesDatabase:
         try:
             # Remove duplicates first if requested
             if remove_duplicates_first:
-                print("🧹 Removing existing duplicates before sync...")
+                logger.info("🧹 Removing existing duplicates before sync...")
                 duplicates_removed = self.remove_duplicates()
-                print(f"📊 Removed {duplicates_removed} duplicates")
+                logger.info(f"📊 Removed {duplicates_removed} duplicates")
             
             # Connect to source database
             source_db = self.client[source_db_name]
@@ -357,7 +808,7 @@ class NotesDatabase:
             
             # Get all source documents
             source_docs = list(source_coll.find({}))
-            print(f"📡 Found {len(source_docs)} documents in source")
+            logger.info(f"📡 Found {len(source_docs)} documents in source")
             
             # Transform and prepare for bulk insert
             notes_list = []
@@ -403,11 +854,14 @@ class NotesDatabase:
             # Insert new notes
             if notes_list:
                 self.bulk_insert(notes_list)
-                print(f"✅ Synced {len(notes_list)} new notes")
+                logger.info(f"✅ Synced {len(notes_list)} new notes")
             else:
-                print("✅ No new notes to sync")
+                logger.info("✅ No new notes to sync")
+            
+            # Keep the local snapshot in step for boots and MongoDB outages
+            self.ensure_snapshot()
             
-            print(f"📊 Skipped {existing_count} existing notes")
+            logger.info(f"📊 Skipped {existing_count} existing notes")
             
             return {
                 "success": True,
@@ -418,7 +872,7 @@ class NotesDatabase:
             }
             
         except Exception as e:
-            print(f"❌ Sync failed: {e}")
+            logger.exception(f"❌ Sync failed: {e}")
             return {
                 "success": False,
                 "error": str(e)
@@ -427,6 +881,9 @@ class NotesDatabase:
 
 if __name__ == "__main__":
     # Example usage
+    from logs import configure_logging
+    
+    configure_logging()
     db = NotesDatabase()
     
     print(f"📊 Total notes in database: {db.count_notes()}")
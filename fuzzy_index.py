@@ -0,0 +1,206 @@
+"""
+Typo-tolerant lookup of subject codes and names.
+
+Subject codes are short, so they live in a symmetric-delete index (every
+code plus its variants with up to two characters deleted) that finds
+candidates with a handful of dict lookups. Subject names are longer, so candidates are first narrowed
+with a length-bucketed trigram index (a match is within d characters of
+the query's length and shares all but at most 3d of its trigrams, so only
+names passing that count filter are kept) and then verified with a bounded
+Levenshtein distance.
+"""
+
+from collections import Counter
+from itertools import chain
+from typing import List, Dict, Iterable, Optional, Set, Tuple
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> Optional[int]:
+    """Levenshtein distance between a and b, or None if it exceeds max_distance
+
+    Bit-parallel (Myers/Hyyrö): one column of the DP table is a pair of bit
+    vectors, so each character of b costs a few integer operations instead
+    of a Python loop over a.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return len(b)
+
+    masks: Dict[str, int] = {}
+    for i, char in enumerate(a):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    width = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+
+    positive, negative = width, 0  # vertical +1 / -1 deltas of the current column
+    distance = len(a)
+    remaining = len(b)
+    for char in b:
+        match = masks.get(char, 0)
+        vertical = match | negative
+        horizontal = (((match & positive) + positive) ^ positive) | match
+        up = negative | ~(horizontal | positive)
+        down = positive & horizontal
+        if up & last:
+            distance += 1
+        elif down & last:
+            distance -= 1
+        remaining -= 1
+        if distance - remaining > max_distance:
+            return None  # Each remaining character lowers the distance by at most one
+        up = (up << 1) | 1
+        down <<= 1
+        positive = (down | ~(vertical | up)) & width
+        negative = up & vertical
+
+    return distance if distance <= max_distance else None
+
+
+def max_edits(query: str) -> int:
+    """Allowed typos for a query of this length"""
+    if len(query) < 4:
+        return 0
+    if len(query) < 8:
+        return 1 if len(query) < 5 else 2
+    return min(3, len(query) // 8 + 1)
+
+
+def _deletes(word: str, depth: int) -> Set[str]:
+    """The word plus every string reachable by deleting up to depth characters"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+class DeleteIndex:
+    """Symmetric-delete index: two strings within edit distance d share a string
+    obtained by deleting at most d characters from each"""
+
+    def __init__(self, words: Iterable[str] = (), max_distance: int = 2):
+        self.max_distance = max_distance
+        self.words: Set[str] = set()
+        # Variants keyed by how many deletions produced them, so a radius-1 lookup
+        # never sees the (far more numerous) two-deletion variants
+        self._deletes: List[Dict[str, List[str]]] = [{} for _ in range(max_distance + 1)]
+        for word in words:
+            self.add(word)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def add(self, word: str):
+        if word in self.words:
+            return
+        self.words.add(word)
+        self._deletes[0].setdefault(word, []).append(word)
+        seen = frontier = {word}
+        for depth in range(1, self.max_distance + 1):
+            frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))} - seen
+            seen = seen | frontier
+            for variant in frontier:
+                self._deletes[depth].setdefault(variant, []).append(word)
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[int, str]]:
+        """Words at the smallest edit distance (up to max_distance), as (distance, word) pairs"""
+        max_distance = min(max_distance, self.max_distance)
+
+        # Single typos are by far the most common, so try the cheap radius first
+        for radius in range(1, max_distance + 1):
+            candidates = set()
+            for variant in _deletes(word, radius):
+                for depth in range(radius + 1):
+                    candidates.update(self._deletes[depth].get(variant, ()))
+
+            matches = []
+            for candidate in candidates:
+                distance = bounded_levenshtein(word, candidate, radius)
+                if distance is not None:
+                    matches.append((distance, candidate))
+            if matches:
+                matches.sort()
+                return matches
+        return []
+
+
+class FuzzyIndex:
+    """Fuzzy lookup over distinct lowercased subject codes and names"""
+
+    def __init__(self, codes: Iterable[str] = (), names: Iterable[str] = ()):
+        self.codes = DeleteIndex(code.lower() for code in codes if code)
+
+        # Names are bucketed by length: a match is at most max_distance characters longer or
+        # shorter, so only a few buckets' postings are ever read
+        self._names: List[str] = []
+        self._name_set: Set[str] = set()
+        self._name_lengths: Dict[int, List[int]] = {}
+        self._name_grams: Dict[int, Dict[str, List[int]]] = {}
+        for name in sorted({name.lower() for name in names if name}):
+            self._add_name(name)
+
+    def _add_name(self, name: str):
+        position = len(self._names)
+        self._names.append(name)
+        self._name_set.add(name)
+        self._name_lengths.setdefault(len(name), []).append(position)
+        grams = self._name_grams.setdefault(len(name), {})
+        for gram in {name[i:i + 3] for i in range(len(name) - 2)}:
+            grams.setdefault(gram, []).append(position)
+
+    def add(self, code: Optional[str], name: Optional[str]):
+        """Index one more subject code and name (for notes added after the index was built)"""
+        if code:
+            self.codes.add(code.lower())
+        name = (name or "").lower()
+        if name and name not in self._name_set:
+            self._add_name(name)
+
+    def match_codes(self, query: str) -> List[Tuple[int, str]]:
+        """Closest subject codes within the allowed edit distance of the query"""
+        query = query.lower().replace(" ", "")
+        max_distance = max_edits(query)
+        if not max_distance:
+            return []
+        return self.codes.search(query, max_distance)
+
+    def match_names(self, query: str) -> List[Tuple[int, str]]:
+        """Closest subject names within the allowed edit distance of the query"""
+        query = " ".join(query.lower().split())
+        max_distance = max_edits(query)
+        if not max_distance:
+            return []
+
+        grams = {query[i:i + 3] for i in range(len(query) - 2)}
+        shared_by_length: Dict[int, Counter] = {}
+
+        # As with codes, look for single typos first: the count filter is tightest there
+        for radius in range(1, max_distance + 1):
+            required = len(grams) - 3 * radius
+            matches = []
+            for length in range(len(query) - radius, len(query) + radius + 1):
+                if required > 0:
+                    # Count filter: a match shares at least `required` of the query's trigrams
+                    # (Counter counts in C, so this stays cheap on long postings)
+                    shared = shared_by_length.get(length)
+                    if shared is None:
+                        postings = self._name_grams.get(length, {})
+                        shared = shared_by_length[length] = Counter(
+                            chain.from_iterable(postings.get(gram, ()) for gram in grams))
+                    candidates = [position for position, count in shared.items() if count >= required]
+                else:
+                    candidates = self._name_lengths.get(length, ())
+
+                for position in candidates:
+                    name = self._names[position]
+                    distance = bounded_levenshtein(query, name, radius)
+                    if distance is not None:
+                        matches.append((distance, name))
+            if matches:
+                best = min(distance for distance, _ in matches)
+                return sorted(match for match in matches if match[0] == best)
+        return []
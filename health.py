@@ -0,0 +1,139 @@
+"""
+Liveness and readiness checks for the webhook server.
+
+/livez says whether the process should be restarted: the event loop
+answered, and the update workers are still running. /readyz says whether
+the process should get traffic. It only uses figures already in memory, so
+the probe never waits on MongoDB itself: the last background ping and its
+latency, the update queue depth, the search cache hit ratio and the
+catalog version.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import pymongo
+from pymongo.errors import PyMongoError
+
+from metrics import REGISTRY, STARTUP
+
+logger = logging.getLogger(__name__)
+
+MONGO_PING_SECONDS = REGISTRY.gauge(
+    "notezy_mongo_ping_seconds", "Latency of the last successful background MongoDB ping")
+MONGO_PING_FAILURES = REGISTRY.counter(
+    "notezy_mongo_ping_failures_total", "Background MongoDB pings that failed or timed out")
+READINESS_FAILURES = REGISTRY.counter(
+    "notezy_readiness_failures_total", "Readiness probes answered 503, by reason", ["reason"])
+
+
+class MongoPing:
+    """Pings MongoDB in the background so health probes never wait on it"""
+
+    def __init__(self, database, interval: float = 5, timeout: float = 2):
+        self.database = database
+        self.interval = interval
+        self.timeout = timeout
+        self.ok = False
+        self.latency: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None  # time.monotonic() of the last ping
+
+    @classmethod
+    def from_env(cls, database) -> "MongoPing":
+        return cls(
+            database,
+            interval=float(os.getenv("HEALTH_PING_INTERVAL", "5")),
+            timeout=float(os.getenv("HEALTH_PING_TIMEOUT_MS", "2000")) / 1000
+        )
+
+    def ping(self) -> bool:
+        started = time.perf_counter()
+        try:
+            with pymongo.timeout(self.timeout):
+                self.database.client.admin.command("ping")
+        except PyMongoError as e:
+            if self.ok or self.checked_at is None:
+                logger.warning(f"⚠️ MongoDB ping failed: {e}")
+            self.ok = False
+            self.error = str(e)
+            MONGO_PING_FAILURES.inc()
+        else:
+            self.latency = time.perf_counter() - started
+            self.ok = True
+            self.error = None
+            MONGO_PING_SECONDS.set(self.latency)
+        self.checked_at = time.monotonic()
+        return self.ok
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last ping"""
+        return None if self.checked_at is None else time.monotonic() - self.checked_at
+
+    def reachable(self) -> bool:
+        """Last ping succeeded and is recent (a hung ping loop counts as unreachable)"""
+        age = self.age()
+        return self.ok and age is not None and age <= 3 * self.interval + self.timeout
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await loop.run_in_executor(None, self.ping)
+            await asyncio.sleep(self.interval)
+
+
+def liveness(update_queue) -> Tuple[bool, Dict]:
+    """Alive unless the update workers have died while still accepting updates"""
+    workers = update_queue.live_workers()
+    alive = workers > 0 or not update_queue.started or not update_queue.accepting
+    return alive, {
+        "status": "ok" if alive else "update workers stopped",
+        "uptime_seconds": round(time.perf_counter() - STARTUP.started, 1),
+        "update_workers": workers
+    }
+
+
+def readiness(database, update_queue, mongo_ping: MongoPing, saturation: float = 0.9) -> Tuple[bool, Dict]:
+    """(ready, report) from in-memory state only"""
+    reachable = mongo_ping.reachable()
+    depth = update_queue.depth()
+    age = mongo_ping.age()
+    report = {
+        "mongo": {
+            "reachable": reachable,
+            "ping_ms": round(mongo_ping.latency * 1000, 1) if mongo_ping.latency is not None else None,
+            "checked_seconds_ago": round(age, 1) if age is not None else None,
+            "error": mongo_ping.error,
+            "serving_from_snapshot": not reachable and database.snapshot is not None
+        },
+        "queue": {
+            "depth": depth,
+            "capacity": update_queue.max_size,
+            "busy_workers": update_queue.busy,
+            "accepting": update_queue.accepting
+        },
+        "search_cache": {"hit_ratio": database.search_cache.stats()["hit_ratio"]},
+        "catalog": {"version": database.catalog_version, "snapshot_version": database.snapshot_version}
+    }
+
+    reasons = []
+    if not update_queue.accepting:
+        reasons.append("shutting down")
+    if "warm" not in STARTUP.phases:
+        reasons.append("warming up")
+    if depth >= saturation * update_queue.max_size:
+        reasons.append("update queue saturated")
+    # Searches can still be answered read-only from the catalog snapshot (see NotesDatabase)
+    if not reachable and database.snapshot is None:
+        reasons.append("mongodb unreachable")
+
+    for reason in reasons:
+        READINESS_FAILURES.inc(reason=reason)
+    if reasons:
+        report["status"] = ", ".join(reasons)
+    else:
+        report["status"] = "ok" if reachable else "degraded"
+    return not reasons, report
@@ -3,6 +3,7 @@ Import notes from various sources into the database
 """
 
 from database import NotesDatabase
+from logs import configure_logging
 import json
 import csv
 import os
@@ -201,6 +202,7 @@ def create_sample_csv():
     print("✅ Created notes_template.csv - Fill this with your data")
 
 if __name__ == "__main__":
+    configure_logging()  # Database progress lines (inserted, duplicates removed...) go through logging
     print("=" * 50)
     print("📥 Notes Import Tool")
     print("=" * 50)
@@ -211,9 +213,10 @@ if __name__ == "__main__":
     print("4. Import from PostgreSQL database")
     print("5. Create CSV template")
     print("6. Import from MongoDB")  # Added MongoDB option
+    print("7. Backfill normalized search fields")
     print()
     
-    choice = input("Enter your choice (1-6): ").strip()
+    choice = input("Enter your choice (1-7): ").strip()
     
     if choice == '1':
         file = input("Enter JSON file path (default: notes_data.json): ").strip() or "notes_data.json"
@@ -245,6 +248,10 @@ if __name__ == "__main__":
         print("\n🔄 Importing from MongoDB...")
         import_from_mongodb()
     
+    elif choice == '7':
+        print("\n🔄 Backfilling normalized search fields...")
+        NotesDatabase().migrate_normalized_fields()
+    
     # Show stats
     db = NotesDatabase()
     print(f"\n📊 Total notes in database: {db.count_notes()}")
@@ -0,0 +1,184 @@
+"""
+Structured, non-blocking logging for the bots.
+
+Loggers only put records on a bounded in-memory queue; a background thread
+formats them and writes to stdout, so a slow stdout (or a burst of log
+lines) never stalls the event loop. When the queue is full, records are
+dropped and counted rather than waited on.
+
+Every record carries the correlation ID of the update being handled (see
+bind_update) and is rendered as text or, with LOG_FORMAT=json, one JSON
+object per line including any extra= fields. Success-path lines logged
+with extra=SAMPLED (or sampled(...)) are kept for LOG_SAMPLE_RATE of
+updates. The decision is made once per update, so a kept update keeps all
+of its lines, and hot paths can check sampled_in() to skip building the
+record at all. Warnings and errors are never sampled out.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from metrics import REGISTRY
+
+LOG_RECORDS = REGISTRY.counter(
+    "notezy_log_records_total", "Log records by level: written, sampled out or dropped (queue full)",
+    ["level", "result"])
+
+# (correlation ID, whether this update's sampled lines are kept)
+_correlation: contextvars.ContextVar[Tuple[Optional[str], Optional[bool]]] = contextvars.ContextVar(
+    "correlation", default=(None, None))
+_sample_rate = 1.0
+
+SAMPLED = {"sampled": True}
+
+# Attributes every LogRecord has; anything else came in through extra=
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "correlation_id", "sampled"}
+
+_handler: Optional["NonBlockingQueueHandler"] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_listening = False  # _listener has been started and not stopped since
+
+
+def sampled(**fields) -> Dict[str, Any]:
+    """extra= for a success-path line subject to LOG_SAMPLE_RATE, with structured fields"""
+    return {**fields, "sampled": True}
+
+
+def _keep(cid: Optional[str]) -> bool:
+    if _sample_rate >= 1:
+        return True
+    if _sample_rate <= 0:
+        return False
+    if cid is None:
+        return random.random() < _sample_rate
+    return zlib.crc32(cid.encode("utf-8")) % 10000 < _sample_rate * 10000
+
+
+def bind_update(update_id) -> contextvars.Token:
+    """Tag the current task's log records with an update's correlation ID"""
+    cid = f"u{update_id}"
+    return _correlation.set((cid, _keep(cid)))
+
+
+def correlation_id() -> Optional[str]:
+    return _correlation.get()[0]
+
+
+def sampled_in() -> bool:
+    """Whether sampled lines are kept for the current update (decided once in bind_update)"""
+    keep = _correlation.get()[1]
+    return _keep(None) if keep is None else keep
+
+
+class ContextFilter(logging.Filter):
+    """Adds the correlation ID and applies sampling, in the caller's thread (where the ID is set)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        cid, keep = _correlation.get()
+        record.correlation_id = cid
+        if getattr(record, "sampled", False) and record.levelno < logging.WARNING \
+                and not (_keep(None) if keep is None else keep):
+            LOG_RECORDS.inc(level=record.levelname.lower(), result="sampled_out")
+            return False
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same process: formatting is left to the listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            LOG_RECORDS.inc(level=record.levelname.lower(), result="written")
+        except queue.Full:
+            LOG_RECORDS.inc(level=record.levelname.lower(), result="dropped")
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s%(cid)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.cid = f" [{record.correlation_id}]" if getattr(record, "correlation_id", None) else ""
+        return super().format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, correlation ID and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if getattr(record, "correlation_id", None):
+            entry["correlation_id"] = record.correlation_id
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and key != "cid":
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def _start_listener(stream_handler: logging.Handler):
+    global _listener, _listening
+    _listener = logging.handlers.QueueListener(_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    _listening = True
+
+
+def configure_logging(level: Optional[str] = None):
+    """Route all logging through the queue (idempotent); LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE, LOG_QUEUE_SIZE"""
+    global _handler, _sample_rate
+    if _handler is not None:
+        return
+    _sample_rate = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if os.getenv("LOG_FORMAT", "text").lower() == "json"
+                                else TextFormatter())
+    max_queue = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+    _handler = NonBlockingQueueHandler(queue.Queue(max_queue))
+    _handler.addFilter(ContextFilter())
+    _start_listener(stream_handler)
+
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+    # Per-request lines from libraries would flood the logs
+    for noisy in ("httpx", "httpcore", "aiohttp.access", "apscheduler"):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+
+    # The listener thread does not survive os.fork (prefork workers): start a fresh one
+    def after_fork():
+        _handler.queue = queue.Queue(max_queue)
+        _start_listener(stream_handler)
+    
+    os.register_at_fork(after_in_child=after_fork)
+    atexit.register(flush_logs)
+
+
+def flush_logs():
+    """Write out queued records (before exiting, including os._exit)"""
+    global _listening
+    if _listening:
+        _listening = False
+        _listener.stop()
@@ -0,0 +1,213 @@
+"""
+Flood-control-aware scheduling of outbound Telegram API calls.
+
+Plugged into PTB as the Application's rate limiter, so every bot call goes
+through it. Message sends/edits respect Telegram's limits - about 30
+messages/second overall, about 1/second per private chat and 20/minute per
+group - and interactive replies are granted global capacity before bulk
+traffic (calls made with rate_limit_args={"priority": "bulk"}). A 429
+RetryAfter pauses that chat (or everything, for calls without a chat) for
+the requested time and the call is retried.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BULK = 1
+
+# Endpoints that produce or change messages and count against Telegram's flood limits
+LIMITED_ENDPOINT_PREFIXES = ("send", "edit", "copy", "forward", "delete")
+
+OUTBOUND_REQUESTS = REGISTRY.counter(
+    "notezy_outbound_requests_total", "Telegram API calls by endpoint", ["endpoint"])
+OUTBOUND_DELAYED = REGISTRY.counter(
+    "notezy_outbound_delayed_total", "Calls held back by a limit, by which limit", ["reason"])
+OUTBOUND_DELAY_SECONDS = REGISTRY.histogram(
+    "notezy_outbound_delay_seconds", "Time calls were held back before being sent", ["priority"])
+OUTBOUND_RETRIES = REGISTRY.counter(
+    "notezy_outbound_retries_total", "Calls retried after a RetryAfter (429) response", ["endpoint"])
+OUTBOUND_GIVEN_UP = REGISTRY.counter(
+    "notezy_outbound_retry_exhausted_total", "Calls that still hit RetryAfter after max retries", ["endpoint"])
+
+
+class _Bucket:
+    """Token bucket supporting reservations (tokens may go negative)"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def reserve(self, now: float) -> float:
+        """Take a token now, returning how long to wait before using it"""
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class _PriorityGate:
+    """Global token bucket whose waiters are served by priority, then arrival order"""
+
+    def __init__(self, rate: float, burst: float):
+        self.bucket = _Bucket(rate, burst)
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    async def acquire(self, priority: int) -> bool:
+        """Wait for a token; True if the caller had to wait"""
+        if not self._waiters and self.bucket.wait_time(time.monotonic()) == 0:
+            self.bucket.take()
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+        return True
+
+    async def _dispatch(self):
+        while self._waiters:
+            wait = self.bucket.wait_time(time.monotonic())
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.bucket.take()
+                future.set_result(None)
+
+    def cancel(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+
+
+class OutboundScheduler(BaseRateLimiter[Dict[str, Any]]):
+    """Global + per-chat rate limits, priorities and RetryAfter handling for bot calls"""
+
+    def __init__(self, global_rate: float = 30, private_rate: float = 1, private_burst: float = 3,
+                 group_rate: float = 20 / 60, group_burst: float = 5, max_retries: int = 3,
+                 max_chats: int = 10000):
+        self.global_rate = global_rate
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self._gate: Optional[_PriorityGate] = None
+        self._chats: "OrderedDict[Any, _Bucket]" = OrderedDict()
+        self._paused_until: Dict[Any, float] = {}  # chat id (None = every call) -> monotonic time
+
+    @classmethod
+    def from_env(cls) -> "OutboundScheduler":
+        return cls(
+            global_rate=float(os.getenv("OUTBOUND_GLOBAL_RATE", "30")),
+            private_rate=float(os.getenv("OUTBOUND_PRIVATE_CHAT_RATE", "1")),
+            group_rate=float(os.getenv("OUTBOUND_GROUP_CHAT_RATE_PER_MIN", "20")) / 60,
+            max_retries=int(os.getenv("OUTBOUND_MAX_RETRIES", "3"))
+        )
+
+    async def initialize(self) -> None:
+        if self._gate is None:
+            self._gate = _PriorityGate(self.global_rate, self.global_rate)
+
+    async def shutdown(self) -> None:
+        if self._gate is not None:
+            self._gate.cancel()
+
+    def _chat_bucket(self, chat_id) -> _Bucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Groups and channels have negative ids (or @usernames)
+            is_group = isinstance(chat_id, str) or int(chat_id) < 0
+            bucket = self._chats[chat_id] = (_Bucket(self.group_rate, self.group_burst) if is_group
+                                             else _Bucket(self.private_rate, self.private_burst))
+            if len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def _wait_for_capacity(self, chat_id, priority: int, limited: bool):
+        started = time.monotonic()
+        delayed = False
+
+        # Honour RetryAfter pauses, for this chat and for everything
+        for key in dict.fromkeys((None, chat_id)):
+            if key not in self._paused_until:
+                continue
+            pause = self._paused_until[key] - time.monotonic()
+            if pause > 0:
+                OUTBOUND_DELAYED.inc(reason="retry_after")
+                delayed = True
+                await asyncio.sleep(pause)
+            self._paused_until.pop(key, None)
+
+        if limited:
+            if self._gate is None:  # Startup calls can run alongside Application.initialize
+                await self.initialize()
+            if chat_id is not None:
+                wait = self._chat_bucket(chat_id).reserve(time.monotonic())
+                if wait > 0:
+                    OUTBOUND_DELAYED.inc(reason="chat")
+                    delayed = True
+                    await asyncio.sleep(wait)
+            if await self._gate.acquire(priority):
+                OUTBOUND_DELAYED.inc(reason="global")
+                delayed = True
+
+        if delayed:
+            OUTBOUND_DELAY_SECONDS.observe(time.monotonic() - started,
+                                           priority="bulk" if priority == BULK else "interactive")
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        OUTBOUND_REQUESTS.inc(endpoint=endpoint)
+        priority = BULK if (rate_limit_args or {}).get("priority") == "bulk" else INTERACTIVE
+        chat_id = data.get("chat_id")
+        limited = endpoint.startswith(LIMITED_ENDPOINT_PREFIXES)
+
+        retries = 0
+        while True:
+            await self._wait_for_capacity(chat_id, priority, limited)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                delay = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+                self._paused_until[chat_id] = max(self._paused_until.get(chat_id, 0), time.monotonic() + delay)
+                if retries >= self.max_retries:
+                    OUTBOUND_GIVEN_UP.inc(endpoint=endpoint)
+                    raise
+                retries += 1
+                OUTBOUND_RETRIES.inc(endpoint=endpoint)
+                logger.warning(f"⚠️ Telegram flood control on {endpoint} (chat {chat_id}): retrying in {delay:.0f}s")
@@ -0,0 +1,122 @@
+"""
+Pre-fork supervisor for the aiohttp webhook server.
+
+The parent binds the listening socket once, then forks worker processes that
+each build their own application (Telegram Application, NotesDatabase and
+MongoDB pool - none of which survive a fork) and accept connections on the
+shared socket. Crashed workers are restarted, except after a FATAL_EXIT (a
+problem restarting cannot fix, such as a revoked bot token), which stops
+them all. SIGTERM/SIGINT stop them all too.
+
+Linux/macOS only (uses os.fork).
+"""
+
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Callable, Dict
+
+from aiohttp import web
+
+from logs import flush_logs
+
+logger = logging.getLogger(__name__)
+
+WORKER_INDEX_ENV = "WEBHOOK_WORKER_INDEX"
+FATAL_EXIT = 78  # EX_CONFIG: the worker cannot start with this configuration, don't restart it
+
+
+def worker_index() -> int:
+    """0 in the primary (or only) process, 1..N-1 in the other workers"""
+    return int(os.getenv(WORKER_INDEX_ENV, "0"))
+
+
+def is_worker() -> bool:
+    """True in a process forked by serve()"""
+    return WORKER_INDEX_ENV in os.environ
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(index: int, sock: socket.socket, app_factory: Callable[[], web.Application]):
+    os.environ[WORKER_INDEX_ENV] = str(index)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    status = 0
+    try:
+        web.run_app(app_factory(), sock=sock, print=None)
+    except SystemExit as e:
+        logger.error(f"❌ Worker {index} exited with status {e.code}")
+        status = e.code if isinstance(e.code, int) else 1
+    except BaseException as e:
+        logger.error(f"❌ Worker {index} exited: {e}")
+        status = 1
+    flush_logs()  # os._exit skips atexit
+    os._exit(status)
+
+
+def serve(app_factory: Callable[[], web.Application], host: str, port: int, workers: int,
+          restart_delay: float = 1.0):
+    """Run `workers` processes serving app_factory() on one port; blocks until stopped"""
+    sock = bind_socket(host, port)
+    children: Dict[int, int] = {}  # pid -> worker index
+    stopping = False
+    fatal = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(index, sock, app_factory)
+        children[pid] = index
+        logger.info(f"👷 Started worker {index} (pid {pid})")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info(f"🚀 Serving on {host}:{port} with {workers} worker processes")
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = children.pop(pid, None)
+        if index is None:
+            continue
+        if stopping:
+            logger.info(f"✅ Worker {index} stopped")
+            continue
+        if os.waitstatus_to_exitcode(status) == FATAL_EXIT:
+            logger.critical(f"❌ Worker {index} cannot start with this configuration - stopping all workers")
+            fatal = True
+            stop(None, None)
+            continue
+        logger.warning(f"⚠️ Worker {index} (pid {pid}) died with status {status} - restarting")
+        time.sleep(restart_delay)
+        spawn(index)
+
+    sock.close()
+    if fatal:
+        raise SystemExit(FATAL_EXIT)
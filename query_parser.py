@@ -0,0 +1,127 @@
+"""
+Query understanding shared by the greeting and search handlers.
+
+All patterns are compiled and all lookup tables built once at import time.
+classify_message() looks at a message once and returns a QueryIntent telling
+the handlers whether it is a greeting, a semester browse request, a search
+restricted to a semester, or a plain free-text search.
+"""
+
+import re
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+# Intent kinds
+GREETING = "greeting"
+SEMESTER_BROWSE = "semester_browse"
+FILTERED_SEARCH = "filtered_search"
+SEARCH = "search"
+
+# Semester query patterns, tried in order
+SEMESTER_PATTERNS = (
+    re.compile(r'(?:for\s+)?(\d+)(?:st|nd|rd|th)?\s*sem(?:ester)?(?:\s+link)?', re.IGNORECASE),
+    re.compile(r'(?:for\s+)?sem(?:ester)?\s*(\d+)(?:\s+link)?', re.IGNORECASE),
+    re.compile(r'(?:for\s+)?(\w+)\s*cycle(?:\s+link)?', re.IGNORECASE)
+)
+
+# Map semester numbers/names to database semesters
+SEMESTER_MAPPING = MappingProxyType({
+    '1': 'Chemistrycycle', 'first': 'Chemistrycycle', '1st': 'Chemistrycycle',
+    '2': 'Physicscycle', 'second': 'Physicscycle', '2nd': 'Physicscycle',
+    '3': 'Sem3', 'third': 'Sem3', '3rd': 'Sem3',
+    '4': 'Sem4', 'fourth': 'Sem4', '4th': 'Sem4',
+    '5': 'Sem5', 'fifth': 'Sem5', '5th': 'Sem5',
+    '6': 'Sem6', 'sixth': 'Sem6', '6th': 'Sem6',
+    'chemistry': 'Chemistrycycle', 'physics': 'Physicscycle'
+})
+
+# Semester names for display
+SEMESTER_DISPLAY_NAMES = MappingProxyType({
+    'Chemistrycycle': '1st Semester (Chemistry Cycle)',
+    'Physicscycle': '2nd Semester (Physics Cycle)',
+    'Sem3': '3rd Semester',
+    'Sem4': '4th Semester',
+    'Sem5': '5th Semester',
+    'Sem6': '6th Semester'
+})
+
+# Branch names for display
+BRANCH_NAMES = MappingProxyType({
+    'computerscience': 'Computer Science',
+    'electronicsandcommunications': 'ECE',
+    'informationscience': 'Information Science',
+    'aiml': 'AI & ML',
+    'aids': 'AI & DS'
+})
+
+# All greeting patterns folded into one anchored regex
+GREETING_PATTERN = re.compile(
+    r'^(?:'
+    r'hi|hello|hey|hai|hii|helo'                                     # Basic greetings
+    r'|good\s*(?:morning|afternoon|evening|night|day)'                # Good morning/afternoon etc.
+    r'|gm|gn|gd\s*mrng|gd\s*day|gd\s*evng|gd\s*night'                # Abbreviations
+    r'|namaste|namaskar|vanakkam|salaam|assalamualaikum'              # Cultural greetings
+    r'|howdy|sup|yo|wassup|what\'s\s*up'                              # Casual greetings
+    r'|greetings|welcome|bonjour|hola|ciao|aloha'                     # Other languages
+    r')$',
+    re.IGNORECASE
+)
+
+# Words that don't narrow a semester request down to a subject
+FILLER_WORDS = frozenset({'for', 'notes', 'note', 'link', 'links', 'of', 'in', 'the', 'all', 'subjects', 'please', 'pls'})
+
+# Common subject abbreviations students type instead of the full name
+ABBREVIATIONS = MappingProxyType({
+    'math': ('mathematics', 'maths'),
+    'os': ('operating systems', 'operating system'),
+    'cn': ('computer networks', 'computer network', 'networks'),
+    'dbms': ('database', 'database management'),
+    'ds': ('data structures', 'data structure'),
+    'ada': ('analysis and design of algorithms', 'algorithms'),
+    'oops': ('object oriented programming', 'oop'),
+    'se': ('software engineering',),
+    'coa': ('computer organization', 'computer architecture'),
+    'mp': ('microprocessor', 'microcontroller'),
+    'dms': ('discrete mathematical structures', 'discrete mathematics')
+})
+
+# Semester mentions inside a search query (e.g., "3rd sem" -> "sem3")
+SEMESTER_QUERY_PATTERN = re.compile(r'(\d+)(?:st|nd|rd|th)?\s*sem(?:ester)?')
+
+SEARCH_COMMAND_PATTERN = re.compile(r'^/search(?:@\w+)?(?:\s+|$)', re.IGNORECASE)
+
+
+class QueryIntent(NamedTuple):
+    kind: str
+    query: str                      # Search terms, original case
+    semester: Optional[str] = None  # Database semester for browse/filtered search
+
+
+def strip_search_command(text: str) -> str:
+    """Remove a leading /search or /search@botname from a message"""
+    return SEARCH_COMMAND_PATTERN.sub('', text.strip(), count=1).strip()
+
+
+def classify_message(text: str) -> QueryIntent:
+    """Classify a chat message into a greeting, semester browse, filtered search or search"""
+    text = text.strip()
+
+    for pattern in SEMESTER_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        semester = SEMESTER_MAPPING.get(match.group(1).lower())
+        if not semester:
+            continue
+
+        # Anything meaningful besides the semester phrase narrows the search
+        remaining = (text[:match.start()] + ' ' + text[match.end():]).split()
+        terms = [word for word in remaining if word.lower() not in FILLER_WORDS]
+        if terms:
+            return QueryIntent(FILTERED_SEARCH, " ".join(terms), semester)
+        return QueryIntent(SEMESTER_BROWSE, text, semester)
+
+    if GREETING_PATTERN.match(text):
+        return QueryIntent(GREETING, text)
+
+    return QueryIntent(SEARCH, strip_search_command(text))
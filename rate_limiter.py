@@ -0,0 +1,166 @@
+"""
+Rate limiting in front of search.
+
+Token buckets per user and per chat stop one person (or a busy group) from
+turning every message into a MongoDB search cascade, and a global ceiling
+bounds how many searches hit the database at once. Limited messages get a
+single canned reply, then are dropped silently until the sender slows down.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from metrics import REGISTRY
+
+RATE_LIMIT_DECISIONS = REGISTRY.counter(
+    "notezy_rate_limit_decisions_total", "Rate limiter decisions (allowed, or which limit was hit)",
+    ["decision", "action"])
+SEARCH_SLOTS_IN_USE = REGISTRY.gauge(
+    "notezy_search_slots_in_use", "Searches currently holding a global concurrency slot")
+SEARCH_SLOT_WAIT_SECONDS = REGISTRY.histogram(
+    "notezy_search_slot_wait_seconds", "Time searches waited for a global concurrency slot")
+
+LIMITED_REPLY = "⏳ You're sending messages too quickly. Please wait a few seconds and try again."
+BUSY_REPLY = "⏳ The bot is busy right now. Please try your search again in a moment."
+
+
+class SearchBusy(Exception):
+    """No global search slot became free in time"""
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`"""
+
+    __slots__ = ("tokens", "updated", "notified")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+        self.notified = False  # Canned reply already sent for the current limited streak
+
+    def refill(self, rate: float, burst: float, now: float) -> bool:
+        """Add the tokens earned since the last refill; True if one is available"""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        return self.tokens >= 1
+
+    def take(self):
+        self.tokens -= 1
+        self.notified = False
+
+
+class BucketTable:
+    """Token buckets keyed by user or chat id, least recently used evicted"""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+
+    def get(self, key: int, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.burst, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+
+class SearchRateLimiter:
+    """Per-user and per-chat token buckets plus a global concurrent search ceiling"""
+
+    def __init__(self, user_rate: float = 0.5, user_burst: float = 5, chat_rate: float = 1.0,
+                 chat_burst: float = 10, max_concurrent_searches: int = 10, slot_timeout: float = 5.0,
+                 reply_when_limited: bool = True):
+        self.users = BucketTable(user_rate, user_burst)
+        self.chats = BucketTable(chat_rate, chat_burst)
+        self.max_concurrent_searches = max(1, max_concurrent_searches)
+        self.slot_timeout = slot_timeout
+        self.reply_when_limited = reply_when_limited
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.in_use = 0
+        SEARCH_SLOTS_IN_USE.set_function(lambda: self.in_use)
+
+    @classmethod
+    def from_env(cls) -> "SearchRateLimiter":
+        return cls(
+            user_rate=float(os.getenv("RATE_LIMIT_USER_RATE", "0.5")),
+            user_burst=float(os.getenv("RATE_LIMIT_USER_BURST", "5")),
+            chat_rate=float(os.getenv("RATE_LIMIT_CHAT_RATE", "1")),
+            chat_burst=float(os.getenv("RATE_LIMIT_CHAT_BURST", "10")),
+            max_concurrent_searches=int(os.getenv("MAX_CONCURRENT_SEARCHES", "10")),
+            slot_timeout=float(os.getenv("SEARCH_SLOT_TIMEOUT", "5")),
+            reply_when_limited=os.getenv("RATE_LIMIT_REPLY", "1").lower() in ("1", "true", "yes")
+        )
+
+    def limit(self, callback):
+        """Wrap a message handler so rate limited updates never reach it"""
+
+        @functools.wraps(callback)
+        async def wrapper(update, context, *args, **kwargs):
+            user_id = update.effective_user.id if update.effective_user else None
+            chat_id = update.effective_chat.id if update.effective_chat else None
+            decision = self.check(user_id, chat_id)
+            if decision is None:
+                RATE_LIMIT_DECISIONS.inc(decision="allowed", action="handled")
+                return await callback(update, context, *args, **kwargs)
+
+            limit, bucket = decision
+            if self.reply_when_limited and not bucket.notified and update.effective_message:
+                bucket.notified = True
+                RATE_LIMIT_DECISIONS.inc(decision=limit, action="replied")
+                await update.effective_message.reply_text(LIMITED_REPLY)
+            else:
+                RATE_LIMIT_DECISIONS.inc(decision=limit, action="dropped")
+        return wrapper
+
+    def check(self, user_id: Optional[int], chat_id: Optional[int]):
+        """None if the message may proceed, otherwise (limit hit, exhausted bucket)
+
+        A token is only taken once every bucket allows the message, so a message the
+        chat limit rejects is not charged to the user (and vice versa).
+        """
+        now = time.monotonic()
+        with self._lock:
+            buckets = []
+            for limit, table, key in (("user", self.users, user_id), ("chat", self.chats, chat_id)):
+                if key is None:
+                    continue
+                bucket = table.get(key, now)
+                if not bucket.refill(table.rate, table.burst, now):
+                    return limit, bucket
+                buckets.append(bucket)
+            for bucket in buckets:
+                bucket.take()
+        return None
+
+    @asynccontextmanager
+    async def search_slot(self):
+        """Hold one of the global search slots; raises SearchBusy after slot_timeout"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_searches)
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.slot_timeout)
+        except asyncio.TimeoutError:
+            RATE_LIMIT_DECISIONS.inc(decision="concurrency", action="replied")
+            raise SearchBusy()
+        SEARCH_SLOT_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+        self.in_use += 1
+        try:
+            yield
+        finally:
+            self.in_use -= 1
+            self._semaphore.release()
@@ -0,0 +1,160 @@
+"""
+Shared search helpers used by both the MongoDB search path and the
+in-memory search index, so both return identical result shapes
+"""
+
+import heapq
+from operator import itemgetter
+from typing import List, Dict
+
+from query_parser import ABBREVIATIONS, SEMESTER_QUERY_PATTERN
+
+# Fields searched for partial matches with their base weights
+SEARCH_FIELDS = [
+    ("subject_code", 10),    # Highest weight
+    ("subject_name", 8),     # High weight
+    ("full_name", 6),        # Medium weight
+    ("semester", 3),         # Lower weight
+    ("branch", 2)            # Lowest weight
+]
+
+
+def query_variations(query_lower: str) -> List[str]:
+    """Expand a lowercased query into the variations we search for"""
+    variations = [query_lower]
+
+    # Handle semester queries (e.g., "3rd sem" -> "sem3")
+    sem_match = SEMESTER_QUERY_PATTERN.search(query_lower)
+    if sem_match:
+        sem_num = sem_match.group(1)
+        variations.extend([f"sem{sem_num}", f"Sem{sem_num}"])
+
+    # Handle common abbreviations
+    if query_lower in ABBREVIATIONS:
+        variations.extend(ABBREVIATIONS[query_lower])
+
+    return variations
+
+
+def score_match(field: str, weight: int, field_value: str, query_var: str) -> int:
+    """Relevance score for a query variation found in a (lowercased) field value"""
+    score = weight
+
+    # Higher score for exact word matches
+    if query_var in field_value.split():
+        score += 8
+    # Medium score for substring matches
+    elif query_var in field_value:
+        score += 4
+
+    # Bonus for starting with query
+    if field_value.startswith(query_var):
+        score += 5
+
+    # Bonus for shorter matches (more specific)
+    if len(field_value) < 50:
+        score += 3
+
+    # Extra bonus if matched in subject name or code
+    if field in ['subject_name', 'subject_code']:
+        score += 2
+
+    return score
+
+
+def note_key(note: Dict) -> tuple:
+    """Key used to treat notes as duplicates of each other"""
+    return (note.get('subject_code'), note.get('subject_name'), note.get('semester'), note.get('branch'))
+
+
+class BestMatches:
+    """Streaming partial-match accumulator: the best score per unique note,
+    with heap-based top-k selection so only the returned matches are copied"""
+
+    __slots__ = ("_best",)
+
+    def __init__(self):
+        # note_key -> (score, note, matched_field, matched_query)
+        self._best: Dict[tuple, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._best)
+
+    def add(self, note: Dict, score: int, field: str, query_var: str):
+        key = note_key(note)
+        current = self._best.get(key)
+        if current is None or score > current[0]:
+            self._best[key] = (score, note, field, query_var)
+
+    def top(self, limit: int) -> List[Dict]:
+        """Highest scoring matches, ties kept in the order they were first seen"""
+        best = heapq.nlargest(limit, self._best.values(), key=itemgetter(0))
+        return [{
+            **note,
+            'score': score,
+            'matched_field': field,
+            'matched_query': query_var
+        } for score, note, field, query_var in best]
+
+
+def build_exact_result(notes: List[Dict], query: str, match_type: str) -> Dict:
+    """Format exact code/name matches into the search result shape"""
+    results = []
+    for note in notes:
+        results.append({
+            'full_name': note['full_name'],
+            'branch_url': note['branch_url'],
+            'semester': note['semester'],
+            'branch': note['branch'],
+            'subject_code': note.get('subject_code', ''),
+            'subject_name': note.get('subject_name', ''),
+            'exact_match': True,
+            'match_type': match_type
+        })
+    return {"type": "exact", "results": results, "query": query}
+
+
+def build_partial_result(top_matches: List[Dict], query: str, total_matches: int) -> Dict:
+    """Group scored partial matches by branch page into the search result shape"""
+    if not top_matches:
+        return {"type": "none", "results": [], "query": query}
+
+    # Group by branch for better display
+    branch_groups = {}
+    for match in top_matches:
+        url = match['branch_url']
+        if url not in branch_groups:
+            branch_groups[url] = {
+                'subjects': [],
+                'semester': match['semester'],
+                'branch': match['branch'],
+                'max_score': 0
+            }
+        branch_groups[url]['subjects'].append({
+            'full_name': match['full_name'],
+            'score': match['score'],
+            'matched_field': match['matched_field']
+        })
+        branch_groups[url]['max_score'] = max(branch_groups[url]['max_score'], match['score'])
+
+    # Sort branches by best score
+    sorted_branches = sorted(branch_groups.items(),
+                             key=lambda x: x[1]['max_score'], reverse=True)
+
+    results = []
+    for branch_url, data in sorted_branches:
+        results.append({
+            'branch_url': branch_url,
+            'semester': data['semester'],
+            'branch': data['branch'],
+            'subjects': data['subjects'][:10],  # Top 10 subjects per branch
+            'total_subjects': len(data['subjects'])
+        })
+
+    return {
+        "type": "partial",
+        "results": results,
+        "query": query,
+        "total_matches": total_matches
+    }
+
@@ -0,0 +1,236 @@
+"""
+In-memory search index over the notes catalog.
+
+Loads the notes once and answers searches without any MongoDB round trips,
+returning the same result shape as NotesDatabase.search_notes.
+
+Searches run on several threads at once while the catalog watcher folds in
+changes, so reads and writes go through a reader/writer lock: any number of
+searches, or one update.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Iterable, Optional, Set
+
+from search_common import (
+    SEARCH_FIELDS, query_variations, score_match, BestMatches,
+    build_exact_result, build_partial_result
+)
+
+# Fields kept in memory for every note
+NOTE_PROJECTION = {
+    "subject_code": 1, "subject_name": 1, "full_name": 1,
+    "branch_url": 1, "semester": 1, "branch": 1
+}
+
+EXACT_FIELDS = ("subject_code", "subject_name")
+
+
+def _trigrams(value: str) -> Set[str]:
+    """All 3-character substrings of a value"""
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class ReadWriteLock:
+    """Many readers or one writer; a waiting writer holds off new readers so it is not starved"""
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def reading(self):
+        with self._condition:
+            while self._writing or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class SearchIndex:
+    """Trigram inverted index over subject_code, subject_name, full_name, semester and branch"""
+
+    def __init__(self, notes: Optional[List[Dict]] = None):
+        self.notes: Dict[int, Dict] = {}
+        self._ids_by_doc_id: Dict = {}
+        self._next_id = 0
+
+        # lowercased value -> note ids, for exact code/name lookups
+        self._exact: Dict[str, Dict[str, List[int]]] = {field: {} for field in EXACT_FIELDS}
+        # note id -> lowercased value, per searchable field
+        self._values: Dict[str, Dict[int, str]] = {field: {} for field, _ in SEARCH_FIELDS}
+        # trigram -> note ids, per searchable field
+        self._grams: Dict[str, Dict[str, Set[int]]] = {field: {} for field, _ in SEARCH_FIELDS}
+        self._lock = ReadWriteLock()
+
+        for note in notes or []:
+            self._add(note)
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def add(self, note: Dict) -> int:
+        """Index a single note document"""
+        with self._lock.writing():
+            return self._add(note)
+
+    def remove(self, doc_id) -> bool:
+        """Drop a note from the index by its MongoDB _id"""
+        with self._lock.writing():
+            return self._remove(doc_id)
+
+    def update(self, added: Iterable[Dict] = (), removed: Iterable = ()):
+        """Remove and add notes as one change: searches see the index before or after it"""
+        with self._lock.writing():
+            for doc_id in removed:
+                self._remove(doc_id)
+            for note in added:
+                self._add(note)
+
+    def _add(self, note: Dict) -> int:
+        note_id = self._next_id
+        self._next_id += 1
+
+        self.notes[note_id] = {
+            '_id': note.get('_id'),
+            'subject_code': note.get('subject_code'),
+            'subject_name': note.get('subject_name'),
+            'full_name': note.get('full_name'),
+            'branch_url': note.get('branch_url'),
+            'semester': note.get('semester'),
+            'branch': note.get('branch')
+        }
+        if note.get('_id') is not None:
+            self._ids_by_doc_id[note['_id']] = note_id
+
+        for field, _ in SEARCH_FIELDS:
+            if not note.get(field):
+                continue
+            value = str(note[field]).lower()
+            self._values[field][note_id] = value
+            for gram in _trigrams(value):
+                self._grams[field].setdefault(gram, set()).add(note_id)
+            if field in self._exact:
+                self._exact[field].setdefault(value, []).append(note_id)
+
+        return note_id
+
+    def _remove(self, doc_id) -> bool:
+        note_id = self._ids_by_doc_id.pop(doc_id, None)
+        if note_id is None:
+            return False
+
+        del self.notes[note_id]
+        for field, _ in SEARCH_FIELDS:
+            value = self._values[field].pop(note_id, None)
+            if value is None:
+                continue
+            for gram in _trigrams(value):
+                postings = self._grams[field].get(gram)
+                if postings is not None:
+                    postings.discard(note_id)
+                    if not postings:
+                        del self._grams[field][gram]
+            if field in self._exact:
+                ids = self._exact[field].get(value, [])
+                if note_id in ids:
+                    ids.remove(note_id)
+                if not ids:
+                    self._exact[field].pop(value, None)
+        return True
+
+    def exact_notes(self, field: str, values: List[str]) -> List[Dict]:
+        """Notes whose subject_code/subject_name equals one of the lowercased values"""
+        notes = []
+        with self._lock.reading():
+            for value in values:
+                notes.extend(self.notes[note_id] for note_id in self._exact[field].get(value, ()))
+        return notes
+
+    def distinct_values(self, field: str) -> List[str]:
+        """Distinct lowercased subject codes or names"""
+        with self._lock.reading():
+            return list(self._exact[field].keys())
+
+    def _candidates(self, field: str, query_var: str):
+        """Note ids whose field value may contain query_var"""
+        if len(query_var) < 3:
+            # Too short for trigrams - scan the field values directly
+            return self._values[field].keys()
+
+        postings = self._grams[field]
+        gram_sets = []
+        for gram in _trigrams(query_var):
+            ids = postings.get(gram)
+            if not ids:
+                return ()
+            gram_sets.append(ids)
+
+        gram_sets.sort(key=len)
+        candidates = set(gram_sets[0])
+        for ids in gram_sets[1:]:
+            candidates &= ids
+            if not candidates:
+                break
+        return sorted(candidates)
+
+    def search(self, query: str, limit: int = 10, semester: Optional[str] = None) -> Dict:
+        """Search the index using the same strategies as NotesDatabase.search_notes"""
+        with self._lock.reading():
+            return self._search(query, limit, semester)
+
+    def _search(self, query: str, limit: int, semester: Optional[str]) -> Dict:
+        query_lower = query.lower().strip()
+        variations = query_variations(query_lower)
+
+        # Strategy 1 and 2: exact subject code, then exact subject name
+        for field, match_type in (("subject_code", "exact_code"), ("subject_name", "exact_name")):
+            for query_var in variations:
+                notes = [self.notes[note_id] for note_id in self._exact[field].get(query_var.lower(), ())]
+                if semester:
+                    notes = [note for note in notes if note.get("semester") == semester]
+                if notes:
+                    return build_exact_result(notes[:limit], query, match_type)
+
+        # Strategy 3: partial matches, keeping the best score per unique note
+        best_matches = BestMatches()
+        for query_var in variations:
+            needle = query_var.lower()
+            for field, weight in SEARCH_FIELDS:
+                values = self._values[field]
+                for note_id in self._candidates(field, needle):
+                    field_value = values[note_id]
+                    if needle not in field_value:
+                        continue
+                    note = self.notes[note_id]
+                    if semester and note.get("semester") != semester:
+                        continue
+
+                    score = score_match(field, weight, field_value, query_var)
+                    best_matches.add(note, score, field, query_var)
+
+        return build_partial_result(best_matches.top(limit), query, len(best_matches))
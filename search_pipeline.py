@@ -0,0 +1,108 @@
+"""
+Single round trip partial search.
+
+Builds one aggregation pipeline that does the per-field matching, weighting,
+de-duplication and top-k sort of the partial search strategy on the server,
+instead of one find() per query variation, field and match type.
+"""
+
+import re
+from typing import List, Dict, Optional
+
+from search_common import SEARCH_FIELDS
+
+
+def _field_string(field: str) -> Dict:
+    return {"$toLower": {"$toString": {"$ifNull": [f"${field}", ""]}}}
+
+
+def _regex_match(field: str, pattern: str) -> Dict:
+    return {"$regexMatch": {"input": _field_string(field), "regex": pattern, "options": "i"}}
+
+
+def _score_expression(field: str, weight: int, query_var: str) -> Dict:
+    """Server-side equivalent of search_common.score_match, 0 when the field does not match"""
+    escaped = re.escape(query_var)
+
+    # score_match compares the raw variation against the lowercased value,
+    # so variations with uppercase letters (e.g. "Sem3") never earn these bonuses
+    comparable = query_var == query_var.lower()
+
+    bonus = [weight]
+    if comparable:
+        if re.search(r"\s", query_var):
+            # A multi-word variation can never equal a single word
+            bonus.append(4)
+        else:
+            bonus.append({"$cond": [_regex_match(field, rf"(^|\s){escaped}(\s|$)"), 8, 4]})
+        bonus.append({"$cond": [_regex_match(field, f"^{escaped}"), 5, 0]})
+    bonus.append({"$cond": [_regex_match(field, r"^[\s\S]{0,49}$"), 3, 0]})
+    if field in ['subject_name', 'subject_code']:
+        bonus.append(2)
+
+    return {
+        "$cond": [
+            {"$and": [{"$ne": [{"$ifNull": [f"${field}", ""]}, ""]}, _regex_match(field, escaped)]},
+            {"$add": bonus},
+            0
+        ]
+    }
+
+
+def partial_search_combos(query_variations: List[str]) -> List[tuple]:
+    """(field, query variation) pairs in the order their scores appear in the pipeline"""
+    return [(field, query_var) for query_var in query_variations for field, _ in SEARCH_FIELDS]
+
+
+def build_partial_search_pipeline(query_variations: List[str], limit: int,
+                                  semester: Optional[str] = None) -> List[Dict]:
+    """Aggregation pipeline returning {"top": [...], "total": [{"count": n}]}, optionally within one semester"""
+    match_any = []
+    scores = []
+    for query_var in query_variations:
+        for field, weight in SEARCH_FIELDS:
+            match_any.append({field: {"$regex": re.escape(query_var), "$options": "i"}})
+            scores.append(_score_expression(field, weight, query_var))
+
+    note_fields = {
+        "subject_code": 1, "subject_name": 1, "full_name": 1,
+        "branch_url": 1, "semester": 1, "branch": 1
+    }
+
+    score_fields = {f"s{i}": expression for i, expression in enumerate(scores)}
+    score_refs = [f"${name}" for name in score_fields]
+
+    match = {"$or": match_any}
+    if semester:
+        match["semester"] = semester
+
+    return [
+        {"$match": match},
+        {"$project": {**note_fields, **score_fields}},
+        {"$addFields": {"score": {"$max": score_refs}}},
+        # Index of the first field/variation pair that produced the best score
+        {"$addFields": {"combo": {"$switch": {
+            "branches": [{"case": {"$eq": [ref, "$score"]}, "then": i} for i, ref in enumerate(score_refs)],
+            "default": 0
+        }}}},
+        {"$match": {"score": {"$gt": 0}}},
+        # Keep the best scoring document per (code, name, semester, branch)
+        {"$sort": {"score": -1, "_id": 1}},
+        {"$group": {
+            "_id": {
+                "subject_code": "$subject_code",
+                "subject_name": "$subject_name",
+                "semester": "$semester",
+                "branch": "$branch"
+            },
+            "doc_id": {"$first": "$_id"},
+            "full_name": {"$first": "$full_name"},
+            "branch_url": {"$first": "$branch_url"},
+            "score": {"$first": "$score"},
+            "combo": {"$first": "$combo"}
+        }},
+        {"$facet": {
+            "top": [{"$sort": {"score": -1, "doc_id": 1}}, {"$limit": limit}],
+            "total": [{"$count": "count"}]
+        }}
+    ]
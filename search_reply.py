@@ -0,0 +1,62 @@
+"""
+Adaptive search replies.
+
+Sending "🔍 Searching..." and then editing it costs two Telegram API calls,
+even when the search takes a few milliseconds. SearchReply starts the search
+and only posts the placeholder if the answer isn't ready within a budget;
+fast searches are answered with a single message.
+"""
+
+import asyncio
+import os
+from typing import Awaitable, Optional
+
+from metrics import REGISTRY
+
+SEARCH_REPLIES = REGISTRY.counter(
+    "notezy_search_replies_total", "Search answers by mode (direct, or placeholder then edit)", ["mode"])
+SEARCH_OUTBOUND_CALLS = REGISTRY.histogram(
+    "notezy_search_outbound_calls", "Telegram API calls made to answer one search",
+    buckets=(1, 2, 3, 4, 6))
+
+
+class SearchReply:
+    """Answer a search directly, or via a placeholder when the search overruns its budget"""
+
+    def __init__(self, message, placeholder_text: str, budget: Optional[float] = None):
+        self.message = message
+        self.placeholder_text = placeholder_text
+        self.budget = budget if budget is not None else float(os.getenv("SEARCH_REPLY_BUDGET_MS", "400")) / 1000
+        self.placeholder = None
+        self.calls = 0
+
+    async def run(self, awaitable: Awaitable):
+        """Await the search, posting the placeholder if it takes longer than the budget"""
+        task = asyncio.ensure_future(awaitable)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.budget)
+        except asyncio.TimeoutError:
+            self.calls += 1
+            self.placeholder = await self.message.reply_text(self.placeholder_text, parse_mode='Markdown')
+            return await task
+
+    async def send(self, text: str, **kwargs):
+        """Deliver the final answer: edit the placeholder if one was posted, else reply once"""
+        self.calls += 1
+        if self.placeholder is not None:
+            await self.placeholder.edit_text(text, **kwargs)
+        else:
+            await self.message.reply_text(text, **kwargs)
+        self._record()
+
+    async def discard(self, extra_calls: int = 0):
+        """The answer was sent some other way; remove the placeholder if one was posted"""
+        self.calls += extra_calls
+        if self.placeholder is not None:
+            self.calls += 1
+            await self.placeholder.delete()
+        self._record()
+
+    def _record(self):
+        SEARCH_REPLIES.inc(mode="placeholder" if self.placeholder is not None else "direct")
+        SEARCH_OUTBOUND_CALLS.observe(self.calls)
@@ -0,0 +1,135 @@
+"""
+Webhook update de-duplication.
+
+Telegram redelivers an update when the webhook is slow or fails, so every
+update_id is claimed before it is processed. Claims live in a bounded
+in-process map (oldest evicted first) and, optionally, in a shared MongoDB
+collection so several webhook replicas never process the same update twice.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEDUPE_CLAIMS = REGISTRY.counter(
+    "notezy_dedupe_claims_total", "Update claims by result (new/duplicate) and where the duplicate was found",
+    ["result", "backend"])
+DEDUPE_SIZE = REGISTRY.gauge(
+    "notezy_dedupe_recent_updates", "Update ids held by the in-process de-duplication map")
+DEDUPE_ERRORS = REGISTRY.counter(
+    "notezy_dedupe_backend_errors_total", "Shared de-duplication backend failures (claims fall back to local)")
+
+
+class RecentUpdates:
+    """Bounded insertion-ordered set of update ids with O(1) claim and release"""
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = max(1, capacity)
+        self._ids: "OrderedDict[int, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, update_id: int) -> bool:
+        return update_id in self._ids
+
+    def claim(self, update_id: int) -> bool:
+        """Record the id; False if it was already recorded"""
+        with self._lock:
+            if update_id in self._ids:
+                return False
+            self._ids[update_id] = None
+            if len(self._ids) > self.capacity:
+                self._ids.popitem(last=False)  # Evict the oldest claim
+            return True
+
+    def release(self, update_id: int):
+        """Forget the id so a redelivery is processed"""
+        with self._lock:
+            self._ids.pop(update_id, None)
+
+
+class MongoUpdateStore:
+    """Shared claims keyed by update_id, expired by a TTL index"""
+
+    def __init__(self, database, collection_name: str = "processed_updates", ttl_seconds: int = 86400,
+                 ensure_indexes: bool = True):
+        self.collection = database[collection_name]
+        self.ttl_seconds = ttl_seconds
+        if ensure_indexes:
+            self.ensure_indexes()
+
+    def ensure_indexes(self):
+        """Create the indexes (the webhook server does this in the background after startup)"""
+        self.collection.create_index("update_id", unique=True)
+        self.collection.create_index("claimed_at", expireAfterSeconds=self.ttl_seconds)
+
+    def claim(self, update_id: int) -> bool:
+        # _id makes the claim atomic before the update_id index exists
+        try:
+            self.collection.insert_one(
+                {"_id": update_id, "update_id": update_id, "claimed_at": datetime.now(timezone.utc)})
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def release(self, update_id: int):
+        self.collection.delete_one({"update_id": update_id})
+
+
+class UpdateDeduplicator:
+    """Local recency map in front of an optional shared store"""
+
+    def __init__(self, capacity: int = 1000, store: Optional[MongoUpdateStore] = None):
+        self.recent = RecentUpdates(capacity)
+        self.store = store
+        DEDUPE_SIZE.set_function(lambda: len(self.recent))
+
+    @property
+    def backend(self) -> str:
+        return "mongo" if self.store is not None else "memory"
+
+    async def claim(self, update_id: int) -> bool:
+        """True if this process should handle the update"""
+        if not self.recent.claim(update_id):
+            DEDUPE_CLAIMS.inc(result="duplicate", backend="memory")
+            return False
+
+        if self.store is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                claimed = await loop.run_in_executor(None, self.store.claim, update_id)
+            except PyMongoError as e:
+                # Never drop updates because the shared store is unavailable
+                DEDUPE_ERRORS.inc()
+                logger.warning(f"⚠️ Shared dedupe unavailable, using local only: {e}")
+                claimed = True
+            if not claimed:
+                # Another replica owns it; don't remember it locally in case that replica releases it
+                self.recent.release(update_id)
+                DEDUPE_CLAIMS.inc(result="duplicate", backend="mongo")
+                return False
+
+        DEDUPE_CLAIMS.inc(result="new", backend=self.backend)
+        return True
+
+    async def release(self, update_id: int):
+        """Undo a claim when the update was rejected, so Telegram's retry gets through"""
+        self.recent.release(update_id)
+        if self.store is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, self.store.release, update_id)
+            except PyMongoError as e:
+                DEDUPE_ERRORS.inc()
+                logger.warning(f"⚠️ Failed to release update {update_id} in shared dedupe: {e}")
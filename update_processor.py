@@ -0,0 +1,164 @@
+"""
+Concurrent update processing that keeps each chat's updates in order.
+
+PTB processes updates one at a time by default, so one slow search holds up
+every other user. ChatOrderedUpdateProcessor runs up to
+`max_active_updates` handlers at once, but updates from the same chat are
+handled strictly in arrival order, so a "Searching…" edit never races a later
+message in that chat.
+
+Updates waiting for their chat do not occupy an active slot; PTB's own
+semaphore only bounds how many updates are in flight (active + waiting).
+dispatch() starts an update and returns as soon as it holds one of those
+in-flight slots, so a caller feeding updates in (the webhook queue workers)
+is never parked behind a busy chat's lock.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from metrics import REGISTRY
+
+ACTIVE_UPDATES = REGISTRY.gauge(
+    "notezy_active_updates", "Updates whose handlers are running")
+CHAT_WAIT_SECONDS = REGISTRY.histogram(
+    "notezy_chat_order_wait_seconds", "Time an update waited for earlier updates from the same chat")
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Bounded concurrency across chats, strict ordering within a chat"""
+
+    def __init__(self, max_active_updates: int = 8, max_pending_updates: Optional[int] = None):
+        super().__init__(max_pending_updates or max_active_updates * 8)
+        self.max_active_updates = max(1, max_active_updates)
+        self._active: Optional[asyncio.Semaphore] = None
+        self._chat_locks: Dict[int, List] = {}  # chat id -> [lock, updates holding or waiting]
+        self.active = 0
+        ACTIVE_UPDATES.set_function(lambda: self.active)
+
+    @staticmethod
+    def chat_key(update: object) -> Optional[int]:
+        if isinstance(update, Update) and update.effective_chat:
+            return update.effective_chat.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self.chat_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        entry = self._chat_locks.get(key)
+        if entry is None:
+            entry = self._chat_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            started = time.perf_counter()
+            async with entry[0]:
+                CHAT_WAIT_SECONDS.observe(time.perf_counter() - started)
+                await self._run(coroutine)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._chat_locks[key]
+
+    async def dispatch(self, update: object, coroutine: Awaitable[Any]) -> asyncio.Task:
+        """Start processing an update without waiting for it to finish; waits only for an in-flight slot"""
+        await self._semaphore.acquire()
+        return asyncio.create_task(self._process_and_release(update, coroutine))
+
+    async def _process_and_release(self, update: object, coroutine: Awaitable[Any]):
+        try:
+            await self.do_process_update(update, coroutine)
+        finally:
+            self._semaphore.release()
+
+    async def _run(self, coroutine: Awaitable[Any]):
+        async with self._active:
+            self.active += 1
+            try:
+                await coroutine
+            finally:
+                self.active -= 1
+
+    async def initialize(self) -> None:
+        self._active = asyncio.Semaphore(self.max_active_updates)
+
+    async def shutdown(self) -> None:
+        self._chat_locks.clear()
+
+
+if __name__ == "__main__":
+    # Ordering check: interleave a slow chat with fast chats. Fast chats must not wait for the
+    # slow one, and every chat's updates must finish in the order they arrived.
+    def fake_update(chat_id: int) -> Update:
+        return Update.de_json({"update_id": 0, "message": {
+            "message_id": 1, "date": 0, "chat": {"id": chat_id, "type": "private"}}}, None)
+
+    async def run_check():
+        processor = ChatOrderedUpdateProcessor(max_active_updates=4)
+        await processor.initialize()
+        finished = []
+        started = time.perf_counter()
+
+        async def handle(chat_id: int, seq: int, delay: float):
+            await asyncio.sleep(delay)
+            finished.append((chat_id, seq, time.perf_counter() - started))
+
+        tasks = []
+        for seq in range(5):
+            # Chat 1 is slow (0.2 s per update), chats 2 and 3 are fast (and jittery)
+            for chat_id, delay in ((1, 0.2), (2, 0.01 * (5 - seq)), (3, 0.005 * seq)):
+                tasks.append(asyncio.create_task(
+                    processor.process_update(fake_update(chat_id), handle(chat_id, seq, delay))))
+        await asyncio.gather(*tasks)
+
+        for chat_id in (1, 2, 3):
+            sequence = [seq for chat, seq, _ in finished if chat == chat_id]
+            assert sequence == list(range(5)), f"chat {chat_id} finished out of order: {sequence}"
+
+        fast_done = max(elapsed for chat, _, elapsed in finished if chat != 1)
+        slow_done = max(elapsed for chat, _, elapsed in finished if chat == 1)
+        assert fast_done < 0.2 < slow_done, \
+            f"fast chats took {fast_done:.2f}s behind a slow chat that took {slow_done:.2f}s"
+        print(f"Ordering: fast chats done in {fast_done:.2f}s, slow chat in {slow_done:.2f}s")
+
+    async def run_queue_check():
+        # Same through the webhook's UpdateQueue: a chat with a backlog longer than the worker
+        # pool must not park every worker on its lock
+        from update_queue import UpdateQueue
+
+        processor = ChatOrderedUpdateProcessor(max_active_updates=8)
+        await processor.initialize()
+        finished = []
+        started = time.perf_counter()
+
+        async def handle(chat_id: int, seq: int, delay: float):
+            await asyncio.sleep(delay)
+            finished.append((chat_id, seq, time.perf_counter() - started))
+
+        async def process(item):
+            chat_id, seq, delay = item
+            return await processor.dispatch(fake_update(chat_id), handle(chat_id, seq, delay))
+
+        queue = UpdateQueue(process, workers=16, max_size=256)
+        queue.start()
+        for seq in range(20):
+            queue.submit((1, seq, 0.2))
+        queue.submit((2, 0, 0.01))
+        leftover, interrupted = await queue.drain(timeout=10)
+
+        sequence = [seq for chat, seq, _ in finished if chat == 1]
+        assert sequence == list(range(20)), f"queued chat finished out of order: {sequence}"
+        assert not leftover and not interrupted, \
+            f"drain left {len(leftover)} queued and {interrupted} interrupted"
+        other_done = next(elapsed for chat, _, elapsed in finished if chat == 2)
+        assert other_done < 0.1, f"other chat took {other_done:.2f}s behind a 20-update backlog on 16 workers"
+        print(f"Hand-off: other chat done in {other_done:.2f}s behind a 20-update backlog on 16 workers")
+
+    asyncio.run(run_check())
+    asyncio.run(run_queue_check())
@@ -0,0 +1,208 @@
+"""
+Bounded update queue drained by a pool of asyncio workers.
+
+The webhook handler enqueues updates and acknowledges Telegram right away;
+the workers run the (slow) handlers afterwards. When the queue is full the
+update is rejected so the webhook can answer with a status Telegram retries.
+
+`process` may hand an update off by returning an asyncio.Task: the worker
+moves on to the next update at once and the task is tracked (busy count,
+outcome, drain) until it finishes. That keeps a worker from sitting on an
+update that is only waiting for its turn, e.g. behind its chat's lock.
+
+On shutdown the queue is drained: no new updates are accepted and the
+workers get a deadline to finish what is queued. Updates still waiting at the
+deadline can be saved to MongoDB (PendingUpdateStore) and replayed by the
+next process that starts.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from pymongo.errors import BulkWriteError
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    "notezy_update_queue_depth", "Updates waiting for a worker")
+QUEUE_CAPACITY = REGISTRY.gauge(
+    "notezy_update_queue_capacity", "Maximum queued updates before new ones are rejected")
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "notezy_update_queue_wait_seconds", "Time an update waited in the queue before a worker picked it up")
+QUEUE_PROCESS_SECONDS = REGISTRY.histogram(
+    "notezy_update_queue_process_seconds", "Time from a worker picking an update up until it was processed")
+QUEUE_UPDATES = REGISTRY.counter(
+    "notezy_update_queue_updates_total",
+    "Updates by queue outcome (enqueued/dropped/processed/failed/interrupted)",
+    ["outcome"])
+QUEUE_BUSY_WORKERS = REGISTRY.gauge(
+    "notezy_update_queue_busy_workers", "Updates taken off the queue and still being processed")
+
+
+class UpdateQueue:
+    """asyncio.Queue with a fixed worker pool; enqueue never blocks"""
+
+    def __init__(self, process: Callable[[object], Awaitable], workers: int = 4, max_size: int = 256):
+        self.process = process
+        self.worker_count = max(1, workers)
+        self.max_size = max(1, max_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._handed_off: Set[asyncio.Task] = set()
+        self.busy = 0
+        self.accepting = True
+
+        QUEUE_DEPTH.set_function(self.depth)
+        QUEUE_CAPACITY.set(self.max_size)
+        QUEUE_BUSY_WORKERS.set_function(lambda: self.busy)
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def is_full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    def live_workers(self) -> int:
+        return sum(1 for worker in self._workers if not worker.done())
+
+    def start(self):
+        """Create the queue and workers on the running event loop"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [asyncio.create_task(self._worker(index)) for index in range(self.worker_count)]
+        logger.info(f"✅ Started {self.worker_count} update workers (queue size {self.max_size})")
+
+    def submit(self, update) -> bool:
+        """Enqueue an update; False when the queue is full (or not started, or draining)"""
+        if self._queue is None or not self.accepting:
+            return False
+        try:
+            self._queue.put_nowait((time.perf_counter(), update))
+        except asyncio.QueueFull:
+            QUEUE_UPDATES.inc(outcome="dropped")
+            return False
+        QUEUE_UPDATES.inc(outcome="enqueued")
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            enqueued_at, update = await self._queue.get()
+            started = time.perf_counter()
+            QUEUE_WAIT_SECONDS.observe(started - enqueued_at)
+            self.busy += 1
+            handed_off = False
+            try:
+                task = await self.process(update)
+                if isinstance(task, asyncio.Task):
+                    handed_off = True
+                    self._handed_off.add(task)
+                    task.add_done_callback(functools.partial(self._finished, index, started))
+                else:
+                    QUEUE_UPDATES.inc(outcome="processed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                QUEUE_UPDATES.inc(outcome="failed")
+                logger.exception(f"❌ Worker {index} failed to process update: {e}")
+            finally:
+                if not handed_off:
+                    self.busy -= 1
+                    QUEUE_PROCESS_SECONDS.observe(time.perf_counter() - started)
+                self._queue.task_done()
+
+    def _finished(self, index: int, started: float, task: asyncio.Task):
+        """Done callback for an update a worker handed off"""
+        self._handed_off.discard(task)
+        self.busy -= 1
+        QUEUE_PROCESS_SECONDS.observe(time.perf_counter() - started)
+        if task.cancelled():
+            return  # Counted as interrupted by drain()
+        error = task.exception()
+        if error is None:
+            QUEUE_UPDATES.inc(outcome="processed")
+        else:
+            QUEUE_UPDATES.inc(outcome="failed")
+            logger.error(f"❌ Worker {index} failed to process update: {error}", exc_info=error)
+
+    async def drain(self, timeout: float) -> Tuple[List, int]:
+        """Stop accepting updates and give the workers `timeout` seconds to finish the queue.
+
+        Returns (updates never started, updates interrupted mid-processing); the workers are stopped.
+        """
+        self.accepting = False
+        if self._queue is None:
+            return [], 0
+        deadline = time.perf_counter() + timeout
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        remaining = deadline - time.perf_counter()
+        if self._handed_off and remaining > 0:
+            await asyncio.wait(set(self._handed_off), timeout=remaining)
+
+        leftover = []
+        while not self._queue.empty():
+            _, update = self._queue.get_nowait()
+            self._queue.task_done()
+            leftover.append(update)
+        interrupted = self.busy
+        if interrupted:
+            QUEUE_UPDATES.inc(interrupted, outcome="interrupted")
+        await self.stop()
+        return leftover, interrupted
+
+    async def stop(self):
+        """Cancel the workers and handed-off updates (queued updates are abandoned)"""
+        tasks = self._workers + list(self._handed_off)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+
+
+class PendingUpdateStore:
+    """Raw updates saved at shutdown for the next process to replay; expired by a TTL index"""
+
+    def __init__(self, database, collection_name: str = "pending_updates", ttl_seconds: int = 3600,
+                 ensure_indexes: bool = True):
+        self.collection = database[collection_name]
+        self.ttl_seconds = ttl_seconds
+        if ensure_indexes:
+            self.ensure_indexes()
+
+    def ensure_indexes(self):
+        """Create the TTL index (the webhook server does this in the background after startup)"""
+        self.collection.create_index("saved_at", expireAfterSeconds=self.ttl_seconds)
+
+    def save(self, updates: List[Dict]) -> int:
+        """Store updates keyed by update_id; returns how many were saved"""
+        if not updates:
+            return 0
+        now = datetime.now(timezone.utc)
+        docs = [{"_id": update["update_id"], "update": update, "saved_at": now} for update in updates]
+        try:
+            return len(self.collection.insert_many(docs, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            return e.details.get("nInserted", 0)  # The rest were already saved
+
+    def take(self, limit: int) -> List[Dict]:
+        """Remove and return up to `limit` saved updates, oldest first (safe with several takers)"""
+        updates = []
+        while len(updates) < limit:
+            doc = self.collection.find_one_and_delete({}, sort=[("_id", 1)])
+            if doc is None:
+                break
+            updates.append(doc["update"])
+        return updates
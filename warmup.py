@@ -0,0 +1,77 @@
+"""
+Warm-up run before the bot goes live.
+
+Right after a deploy the first students would pay for cold starts: no
+pooled MongoDB connections, a cold working set for the regex scans, an
+unbuilt fuzzy index and empty search and semester caches. warm_up() pays
+those costs up front (and rewrites the catalog snapshot if it is stale);
+the webhook is only registered (and polling only starts) once it has
+finished.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Iterable, Optional
+
+from metrics import REGISTRY
+from query_parser import SEMESTER_DISPLAY_NAMES
+
+logger = logging.getLogger(__name__)
+
+WARMUP_SECONDS = REGISTRY.gauge(
+    "notezy_warmup_seconds", "Time spent in each warm-up step", ["step"])
+
+# Common searches replayed to fill the search cache (WARMUP_QUERIES overrides, empty disables)
+DEFAULT_WARMUP_QUERIES = (
+    "data structures", "operating systems", "dbms", "computer networks",
+    "mathematics", "python", "java", "physics", "chemistry"
+)
+
+
+def warmup_queries() -> Iterable[str]:
+    configured = os.getenv("WARMUP_QUERIES")
+    if configured is None:
+        return DEFAULT_WARMUP_QUERIES
+    return [query.strip() for query in configured.split(",") if query.strip()]
+
+
+async def _step(name: str, awaitable) -> Optional[object]:
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    except Exception as e:
+        logger.warning(f"⚠️ Warm-up step '{name}' failed: {e}")
+        return None
+    finally:
+        WARMUP_SECONDS.set(time.perf_counter() - started, step=name)
+
+
+async def warm_up(async_db, search_limit: int = 100, write_snapshot: bool = True) -> float:
+    """Open pool connections, load the catalog and prime the caches; returns seconds taken
+
+    write_snapshot: rewrite a stale catalog snapshot (only one prefork worker should)
+    """
+    started = time.perf_counter()
+    logger.info("🔥 Warming up...")
+
+    # Several concurrent round trips so the pool opens that many connections
+    connections = min(async_db.max_workers, 8)
+    await _step("connections", asyncio.gather(*(async_db.count_notes() for _ in range(connections))))
+
+    notes = await _step("catalog", async_db.warm_catalog())
+    if write_snapshot:
+        await _step("snapshot", async_db.ensure_snapshot())
+
+    semesters = list(SEMESTER_DISPLAY_NAMES)
+    await _step("semesters", asyncio.gather(*(async_db.get_semester_branches(s) for s in semesters)))
+
+    queries = list(warmup_queries())
+    await _step("searches", asyncio.gather(*(async_db.search_notes(q, limit=search_limit) for q in queries)))
+
+    elapsed = time.perf_counter() - started
+    WARMUP_SECONDS.set(elapsed, step="total")
+    logger.info(f"🔥 Warm-up finished in {elapsed:.2f}s ({notes or 0} notes, {len(semesters)} semesters, "
+                f"{len(queries)} searches cached)")
+    return elapsed
@@ -1,20 +1,94 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
-from telegram.error import Conflict
+from telegram.error import Conflict, NetworkError, RetryAfter
+from pymongo.errors import PyMongoError
 import os
+import asyncio
 from dotenv import load_dotenv
 from aiohttp import web
-import re
 from database import NotesDatabase
+from async_database import AsyncNotesDatabase
+from rate_limiter import SearchRateLimiter, SearchBusy, BUSY_REPLY
+from update_processor import ChatOrderedUpdateProcessor
+from search_reply import SearchReply
+from outbound_scheduler import OutboundScheduler
+from metrics import REGISTRY, STARTUP, track_handler
+from update_queue import UpdateQueue, PendingUpdateStore
+from warmup import warm_up
+from catalog_watcher import CatalogWatcher
+from health import MongoPing, liveness, readiness
+from update_dedupe import UpdateDeduplicator, MongoUpdateStore
+import prefork
+from query_parser import (
+    classify_message, strip_search_command, QueryIntent,
+    GREETING, SEMESTER_BROWSE, FILTERED_SEARCH, SEMESTER_DISPLAY_NAMES, BRANCH_NAMES
+)
+from logs import configure_logging, bind_update, sampled_in, sampled, SAMPLED
+from typing import Any, Dict, Optional
+import logging
+import time
+
+try:
+    import orjson  # Optional: several times faster than json for webhook payloads
+    json_loads = orjson.loads
+except ImportError:
+    import json
+    json_loads = json.loads
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger("webhook_bot")
+
 # Database will be initialized in main() to avoid import-time connections
 db = None
+async_db = None  # Non-blocking facade used by the handlers
+rate_limiter = None  # Per-user/chat token buckets and the global search ceiling
+update_queue = None  # Webhook updates waiting for a worker
+pending_updates = None  # Queued updates saved at shutdown, replayed on the next start
+application_ready = None  # Set once the Telegram application is initialized
+mongo_ping = None  # Background MongoDB ping read by /readyz
 
 # Sync functionality removed - bot now focused on search and help only
-processed_updates = set()  # Track processed update IDs to prevent duplicates
+deduplicator = None  # Claims update IDs so redelivered updates are skipped
+
+UPDATES_TOTAL = REGISTRY.counter(
+    "notezy_webhook_updates_total", "Webhook updates by outcome", ["status"])
+UPDATE_SECONDS = REGISTRY.histogram(
+    "notezy_webhook_update_seconds", "Time from webhook request to acknowledgement")
+
+# The only update types the handlers use; Telegram doesn't send (or bill the webhook for) the rest
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+# Static menus, built once at import instead of on every command or button press
+SEMESTER_LINKS = {
+    "1st Semester": "https://www.notezy.online/Chemistrycycle",
+    "2nd Semester": "https://www.notezy.online/Physicscycle",
+    "3rd Semester": "https://www.notezy.online/Sem3",
+    "4th Semester": "https://www.notezy.online/Sem4",
+    "5th Semester": "https://www.notezy.online/Sem5",
+    "6th Semester": "https://www.notezy.online/Sem6"
+}
+BACK_TO_MENU_BUTTON = InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")
+MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📚 Semesters", callback_data="semesters")],
+    [InlineKeyboardButton("🏫 Branches", callback_data="branches")],
+    [InlineKeyboardButton("🔍 Search Notes", callback_data="search")],
+    [InlineKeyboardButton("ℹ️ About", callback_data="about")],
+    [InlineKeyboardButton("📝 Feedback", callback_data="feedback")],
+    [InlineKeyboardButton("🆘 Help", callback_data="help")]
+])
+BACK_TO_MENU_MARKUP = InlineKeyboardMarkup([[BACK_TO_MENU_BUTTON]])
+SEMESTERS_MENU_MARKUP = InlineKeyboardMarkup(
+    [[InlineKeyboardButton(sem, url=link)] for sem, link in SEMESTER_LINKS.items()] + [[BACK_TO_MENU_BUTTON]])
+SEMESTER_LINKS_MARKUP = InlineKeyboardMarkup([  # /semesters names the first-year cycles
+    [InlineKeyboardButton("1st Semester (Chemistry Cycle)", url="https://www.notezy.online/Chemistrycycle")],
+    [InlineKeyboardButton("2nd Semester (Physics Cycle)", url="https://www.notezy.online/Physicscycle")],
+    [InlineKeyboardButton("3rd Semester", url="https://www.notezy.online/Sem3")],
+    [InlineKeyboardButton("4th Semester", url="https://www.notezy.online/Sem4")],
+    [InlineKeyboardButton("5th Semester", url="https://www.notezy.online/Sem5")],
+    [InlineKeyboardButton("6th Semester", url="https://www.notezy.online/Sem6")]
+])
 
 # AI features removed - keeping bot lightweight and focused
 
@@ -26,19 +100,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "Choose an option below to get started:"
     )
 
-    # Create main menu buttons
-    keyboard = [
-        [InlineKeyboardButton("📚 Semesters", callback_data="semesters")],
-        [InlineKeyboardButton("🏫 Branches", callback_data="branches")],
-        [InlineKeyboardButton("🔍 Search Notes", callback_data="search")],
-        [InlineKeyboardButton("ℹ️ About", callback_data="about")],
-        [InlineKeyboardButton("📝 Feedback", callback_data="feedback")],
-        [InlineKeyboardButton("🆘 Help", callback_data="help")]
-    ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    await update.message.reply_text(welcome_text, reply_markup=reply_markup)
+    await update.message.reply_text(welcome_text, reply_markup=MAIN_MENU_MARKUP)
 
 
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -51,25 +113,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if callback_data == "semesters":
         # Show semester selection
         text = "📚 Choose your semester to view notes:"
-        
-        semesters = {
-            "1st Semester": "https://www.notezy.online/Chemistrycycle",
-            "2nd Semester": "https://www.notezy.online/Physicscycle", 
-            "3rd Semester": "https://www.notezy.online/Sem3",
-            "4th Semester": "https://www.notezy.online/Sem4",
-            "5th Semester": "https://www.notezy.online/Sem5",
-            "6th Semester": "https://www.notezy.online/Sem6"
-        }
-        
-        keyboard = []
-        for sem, link in semesters.items():
-            keyboard.append([InlineKeyboardButton(sem, url=link)])
-        
-        # Add back button
-        keyboard.append([InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(text, reply_markup=reply_markup)
+        await query.edit_message_text(text, reply_markup=SEMESTERS_MENU_MARKUP)
 
     elif callback_data == "branches":
         # Show branches info
@@ -83,8 +127,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "📖 Notes are available for all branches across all semesters!"
         )
         
-        keyboard = [[InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_MENU_MARKUP
         
         await query.edit_message_text(text, reply_markup=reply_markup)
 
@@ -98,8 +141,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Just type your search query below! 📝"
         )
         
-        keyboard = [[InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_MENU_MARKUP
         
         await query.edit_message_text(search_text, reply_markup=reply_markup, parse_mode='Markdown')
 
@@ -120,8 +162,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "💬 For support: notezyhelp@gmail.com"
         )
         
-        keyboard = [[InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_MENU_MARKUP
         
         await query.edit_message_text(text, reply_markup=reply_markup)
 
@@ -133,8 +174,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Your feedback helps us improve Notezy Bot for all students! 🙏"
         )
         
-        keyboard = [[InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_MENU_MARKUP
         
         await query.edit_message_text(text, reply_markup=reply_markup)
 
@@ -156,8 +196,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "🌐 Visit: https://www.notezy.online"
         )
         
-        keyboard = [[InlineKeyboardButton("⬅️ Back to Menu", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_MENU_MARKUP
         
         await query.edit_message_text(text, reply_markup=reply_markup)
 
@@ -168,136 +207,82 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Your quick and chat-responsive study companion!\n"
             "Choose an option below to get started:"
         )
+        await query.edit_message_text(welcome_text, reply_markup=MAIN_MENU_MARKUP)
+
+async def send_semester_links(update: Update, semester: str) -> bool:
+    """Reply with the branch links for a semester, False if it has no notes"""
+    # Get all branches for this semester
+    branches = await async_db.get_semester_branches(semester)
+    if not branches:
+        return False
+
+    semester_display = SEMESTER_DISPLAY_NAMES.get(semester, semester)
+
+    # Create branch links
+    branch_links = []
+    for branch in sorted(branches):
+        branch_url = f"https://www.notezy.online/{semester}/{branch}"
+        branch_display = BRANCH_NAMES.get(branch, branch.title())
+        branch_links.append(f"🔗 [{branch_display}]({branch_url})")
+
+    response_text = (
+        f"📚 *{semester_display} Notes*\n\n"
+        f"Choose your branch:\n" +
+        "\n".join(branch_links) +
+        f"\n\n💡 Or search for specific subjects like 'Data Structures' or '18CS51'"
+    )
 
-        keyboard = [
-            [InlineKeyboardButton("📚 Semesters", callback_data="semesters")],
-            [InlineKeyboardButton("🏫 Branches", callback_data="branches")],
-            [InlineKeyboardButton("🔍 Search Notes", callback_data="search")],
-            [InlineKeyboardButton("ℹ️ About", callback_data="about")],
-            [InlineKeyboardButton("📝 Feedback", callback_data="feedback")],
-            [InlineKeyboardButton("🆘 Help", callback_data="help")]
-        ]
+    await update.message.reply_text(
+        response_text,
+        parse_mode='Markdown',
+        disable_web_page_preview=True
+    )
+    return True
 
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(welcome_text, reply_markup=reply_markup)
 
 async def greeting(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    message_text = update.message.text.lower().strip()
-
-    # Define semester query patterns
-    semester_patterns = [
-        r'(?:for\s+)?(\d+)(?:st|nd|rd|th)?\s*sem(?:ester)?(?:\s+link)?',
-        r'(?:for\s+)?sem(?:ester)?\s*(\d+)(?:\s+link)?',
-        r'(?:for\s+)?(\w+)\s*cycle(?:\s+link)?'
-    ]
+    intent = classify_message(update.message.text)
 
-    # Check if message matches any semester pattern
-    for pattern in semester_patterns:
-        match = re.search(pattern, message_text)
-        if match:
-            semester_num = match.group(1)
-
-            # Map semester numbers/names to database semesters
-            semester_mapping = {
-                '1': 'Chemistrycycle', 'first': 'Chemistrycycle', '1st': 'Chemistrycycle',
-                '2': 'Physicscycle', 'second': 'Physicscycle', '2nd': 'Physicscycle',
-                '3': 'Sem3', 'third': 'Sem3', '3rd': 'Sem3',
-                '4': 'Sem4', 'fourth': 'Sem4', '4th': 'Sem4',
-                '5': 'Sem5', 'fifth': 'Sem5', '5th': 'Sem5',
-                '6': 'Sem6', 'sixth': 'Sem6', '6th': 'Sem6',
-                'chemistry': 'Chemistrycycle', 'physics': 'Physicscycle'
-            }
+    if intent.kind == SEMESTER_BROWSE:
+        if await send_semester_links(update, intent.semester):
+            return
 
-            semester = semester_mapping.get(semester_num.lower())
-            if semester:
-                # Get all branches for this semester
-                branches = db.collection.distinct("branch", {"semester": semester})
-
-                if branches:
-                    # Format semester name for display
-                    display_names = {
-                        'Chemistrycycle': '1st Semester (Chemistry Cycle)',
-                        'Physicscycle': '2nd Semester (Physics Cycle)',
-                        'Sem3': '3rd Semester',
-                        'Sem4': '4th Semester',
-                        'Sem5': '5th Semester',
-                        'Sem6': '6th Semester'
-                    }
-
-                    semester_display = display_names.get(semester, semester)
-
-                    # Create branch links
-                    branch_links = []
-                    branch_names = {
-                        'computerscience': 'Computer Science',
-                        'electronicsandcommunications': 'ECE',
-                        'informationscience': 'Information Science',
-                        'aiml': 'AI & ML',
-                        'aids': 'AI & DS'
-                    }
-
-                    for branch in sorted(branches):
-                        branch_url = f"https://www.notezy.online/{semester}/{branch}"
-                        branch_display = branch_names.get(branch, branch.title())
-                        branch_links.append(f"🔗 [{branch_display}]({branch_url})")
-
-                    response_text = (
-                        f"📚 *{semester_display} Notes*\n\n"
-                        f"Choose your branch:\n" +
-                        "\n".join(branch_links) +
-                        f"\n\n💡 Or search for specific subjects like 'Data Structures' or '18CS51'"
-                    )
-
-                    await update.message.reply_text(
-                        response_text,
-                        parse_mode='Markdown',
-                        disable_web_page_preview=True
-                    )
-                    return
-
-    # Define greeting patterns
-    greeting_patterns = [
-        r'^(hi|hello|hey|hai|hii|helo)$',  # Basic greetings
-        r'^(good\s*(morning|afternoon|evening|night|day))$',  # Good morning/afternoon etc.
-        r'^(gm|gn|gd\s*mrng|gd\s*day|gd\s*evng|gd\s*night)$',  # Abbreviations
-        r'^(namaste|namaskar|vanakkam|salaam|assalamualaikum)$',  # Cultural greetings
-        r'^(howdy|sup|yo|wassup|what\'s\s*up)$',  # Casual greetings
-        r'^(greetings|welcome|bonjour|hola|ciao|aloha)$'  # Other languages
-    ]
+    elif intent.kind == GREETING:
+        # Get user's first name if available
+        user_name = update.effective_user.first_name or "there"
 
-    # Check if message matches any greeting pattern
-    for pattern in greeting_patterns:
-        if re.match(pattern, message_text):
-            # Get user's first name if available
-            user_name = update.effective_user.first_name or "there"
-
-            # Simple greeting response
-            await update.message.reply_text(
-                f"👋 Hello {user_name}! I'm your Notezy assistant for VTU engineering notes! 📚\n\n"
-                "💡 Try searching for subjects like 'Data Structures' or '18CS51'\n"
-                "🔍 What notes are you looking for today?",
-                parse_mode='Markdown'
-            )
-
-            return
+        # Simple greeting response
+        await update.message.reply_text(
+            f"👋 Hello {user_name}! I'm your Notezy assistant for VTU engineering notes! 📚\n\n"
+            "💡 Try searching for subjects like 'Data Structures' or '18CS51'\n"
+            "🔍 What notes are you looking for today?",
+            parse_mode='Markdown'
+        )
+        return
 
     # If not a greeting or semester query, let it fall through to search handler
-    await search(update, context)
-
+    await search(update, context, intent)
 
 
+async def run_search(query: str, limit: int, semester: Optional[str] = None):
+    """Search through the global concurrent search ceiling"""
+    async with rate_limiter.search_slot():
+        return await async_db.search_notes(query, limit=limit, semester=semester)
 
 
-async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    # Get query from command args if available, otherwise from message text
+async def search(update: Update, context: ContextTypes.DEFAULT_TYPE, intent: Optional[QueryIntent] = None):
+    # Get query from command args if available, otherwise from the classified message
+    semester = None
     if context.args:
         # Called as /search query - use the args
         query = " ".join(context.args).strip()
+    elif intent is not None:
+        query = intent.query
+        if intent.kind == FILTERED_SEARCH:
+            semester = intent.semester
     else:
-        # Called as direct message - use full text but remove /search prefix if present
-        query = update.message.text.strip()
-        if query.lower().startswith('/search '):
-            query = query[8:].strip()  # Remove '/search ' prefix
+        # Called as direct message - use full text but remove /search or /search@botname prefix
+        query = strip_search_command(update.message.text)
 
     if not query:
         await update.message.reply_text(
@@ -310,14 +295,20 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    # Send searching message to user
-    search_message = await update.message.reply_text(
-        f"🔍 *Searching for '{query}'...*\n⏳ Please wait...",
-        parse_mode='Markdown'
-    )
+    # Answer in one message when the search is fast; post a placeholder only if it overruns
+    reply = SearchReply(update.message, f"🔍 *Searching for '{query}'...*\n⏳ Please wait...")
 
     # Search in database
-    search_result = db.search_notes(query, limit=100)
+    try:
+        search_result = await reply.run(run_search(query, limit=100, semester=semester))
+    except SearchBusy:
+        await reply.send(BUSY_REPLY)
+        return
+
+    # Nothing for this subject in the requested semester - show the semester's branches instead
+    if semester and search_result["type"] == "none" and await send_semester_links(update, semester):
+        await reply.discard(extra_calls=1)
+        return
 
     if search_result["type"] == "exact":
         # Found exact matches
@@ -371,7 +362,7 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
         response_text = f"🔍 *Found {total_subjects} subject(s) matching '{query}':*\n\n"
         response_text += "\n\n".join(formatted_results)
 
-        await search_message.edit_text(
+        await reply.send(
             response_text,
             parse_mode='Markdown',
             disable_web_page_preview=True
@@ -415,7 +406,7 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if total_matches > 20:
             response_text += f"\n\n💡 *Tip: Try more specific terms like subject codes (e.g., BCS301) for exact matches*"
 
-        await search_message.edit_text(
+        await reply.send(
             response_text,
             parse_mode='Markdown',
             disable_web_page_preview=True
@@ -459,7 +450,7 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         response_text = "\n\n".join(response_parts)
 
-        await search_message.edit_text(
+        await reply.send(
             response_text,
             parse_mode='Markdown',
             disable_web_page_preview=True
@@ -467,7 +458,7 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     else:
         # No matches at all
-        total_notes = db.count_notes()
+        total_notes = await async_db.count_notes()
 
         response_text = (
             f"❌ *{query}* not found in our database.\n\n"
@@ -476,34 +467,19 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"🔍 Try searching for a different subject or semester!"
         )
 
-        await search_message.edit_text(
+        await reply.send(
             response_text,
             parse_mode='Markdown'
         )
 
 async def semesters_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show all available semesters with links"""
-    semesters = {
-        "1st Semester (Chemistry Cycle)": "https://www.notezy.online/Chemistrycycle",
-        "2nd Semester (Physics Cycle)": "https://www.notezy.online/Physicscycle", 
-        "3rd Semester": "https://www.notezy.online/Sem3",
-        "4th Semester": "https://www.notezy.online/Sem4",
-        "5th Semester": "https://www.notezy.online/Sem5",
-        "6th Semester": "https://www.notezy.online/Sem6"
-    }
-
-    keyboard = []
-    for sem, link in semesters.items():
-        keyboard.append([InlineKeyboardButton(sem, url=link)])
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     text = (
         "📚 *Available Semesters*\n\n"
         "Click on your semester to view notes:"
     )
 
-    await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    await update.message.reply_text(text, reply_markup=SEMESTER_LINKS_MARKUP, parse_mode='Markdown')
 
 async def branches_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show all available VTU branches"""
@@ -589,41 +565,70 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def webhook_handler(request):
     """Handle incoming webhook updates from Telegram"""
-    global processed_updates
-    
+    started = time.perf_counter()
     try:
-        print("📨 Received webhook request")
-        data = await request.json()
-        print(f"📦 Update data keys: {list(data.keys()) if isinstance(data, dict) else 'not dict'}")
-        update = Update.de_json(data, application.bot)
+        # Shutting down: Telegram retries, and the retry reaches the replacement process
+        if not update_queue.accepting:
+            UPDATES_TOTAL.inc(status="shutting_down")
+            return web.Response(text="SHUTTING DOWN", status=503, headers={"Retry-After": "1"})
         
-        # Check for duplicate updates to prevent recursive processing
-        update_id = update.update_id
-        if update_id in processed_updates:
-            print(f"⚠️ Duplicate update {update_id} detected - skipping")
-            return web.Response(text="DUPLICATE", status=200)
+        try:
+            data = json_loads(await request.read())
+        except ValueError:
+            data = None
+        update_id = data.get("update_id") if isinstance(data, dict) else None
+        if not isinstance(update_id, int):
+            logger.warning("⚠️ Webhook request without a valid update - ignoring")
+            UPDATES_TOTAL.inc(status="invalid")
+            return web.Response(text="BAD REQUEST", status=400)
         
-        # Add to processed updates (keep only last 100 to prevent memory issues)
-        processed_updates.add(update_id)
-        if len(processed_updates) > 100:
-            # Remove oldest entries
-            processed_updates = set(list(processed_updates)[-50:])
+        bind_update(update_id)
         
-        print(f"🔄 Processing update {update_id}...")
+        # Check for duplicate updates before building the Update object
+        if not await deduplicator.claim(update_id):
+            if sampled_in():
+                logger.info("♻️ Duplicate update %s - skipping", update_id, extra=SAMPLED)
+            UPDATES_TOTAL.inc(status="duplicate")
+            return web.Response(text="DUPLICATE", status=200)
         
-        # Make sure application is initialized
-        if not hasattr(application, '_initialized') or not application._initialized:
-            print("⚠️ Application not initialized, skipping update...")
-            return web.Response(text="INITIALIZING", status=503)
+        # Acknowledge right away (even while the application is still initializing); a worker
+        # runs the handlers. Telegram retries non-2xx responses
+        if not update_queue.submit(data):
+            logger.warning("⚠️ Update queue full (%d) - rejecting update %s", update_queue.max_size, update_id)
+            await deduplicator.release(update_id)  # Let the retry through
+            UPDATES_TOTAL.inc(status="queue_full")
+            return web.Response(text="BUSY", status=503, headers={"Retry-After": "1"})
         
-        await application.process_update(update)
-        print(f"✅ Update {update_id} processed successfully")
+        if sampled_in():
+            depth = update_queue.depth()
+            logger.info("📥 Queued update %s (depth %d)", update_id, depth, extra=sampled(queue_depth=depth))
+        UPDATES_TOTAL.inc(status="queued")
+        if "first_update" not in STARTUP.phases:
+            logger.info(f"⏱️ First update accepted {STARTUP.mark('first_update'):.2f}s after start")
         return web.Response(text="OK")
     except Exception as e:
-        print(f"❌ Webhook error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Webhook error: {e}")
+        UPDATES_TOTAL.inc(status="error")
         return web.Response(text="ERROR", status=500)
+    finally:
+        UPDATE_SECONDS.observe(time.perf_counter() - started)
+
+async def process_queued_update(data: Dict[str, Any]) -> asyncio.Task:
+    """Build the Update and hand it to the application's update processor.
+    
+    Returns the processing task as soon as the processor has a slot for it, without waiting
+    for the handlers (or for earlier updates from the same chat), so the queue worker is
+    free for other chats right away.
+    """
+    bind_update(data["update_id"])
+    await application_ready.wait()
+    update = Update.de_json(data, application.bot)
+    return await application.update_processor.dispatch(update, handle_update(update))
+
+async def handle_update(update: Update):
+    await application.process_update(update)
+    if "first_update_handled" not in STARTUP.phases:
+        logger.info(f"⏱️ First update handled {STARTUP.mark('first_update_handled'):.2f}s after start")
 
 async def health_check(request):
     """Health check endpoint for Render"""
@@ -634,85 +639,243 @@ async def health_check(request):
         status += " - Bot Initializing"
     return web.Response(text=status)
 
-async def on_startup(app):
-    """Set up webhook on startup"""
+async def livez(request):
+    """Liveness: the event loop answers and the update workers are running (restart if not)"""
+    alive, report = liveness(update_queue)
+    return web.json_response(report, status=200 if alive else 503)
+
+async def readyz(request):
+    """Readiness: MongoDB reachable (or the snapshot can serve), queue not saturated, warmed up"""
+    ready, report = readiness(db, update_queue, mongo_ping,
+                              saturation=float(os.getenv("READY_QUEUE_SATURATION", "0.9")))
+    return web.json_response(report, status=200 if ready else 503)
+
+async def metrics_handler(request):
+    """Prometheus metrics endpoint"""
+    return web.Response(body=REGISTRY.render().encode("utf-8"),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+async def refresh_snapshot_loop():
+    """Rewrite the local catalog snapshot after the catalog changes (primary worker only)"""
+    interval = float(os.getenv("CATALOG_REFRESH_INTERVAL", "30"))
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if await async_db.ensure_snapshot():
+                logger.info("💾 Catalog snapshot refreshed")
+        except Exception as e:
+            logger.warning(f"⚠️ Catalog snapshot refresh failed: {e}")
+
+async def replay_pending_updates():
+    """Queue updates a previous process saved when it shut down"""
+    if pending_updates is None:
+        return
+    loop = asyncio.get_running_loop()
     try:
-        print("🔄 Initializing Telegram application...")
-        
-        # Initialize the application
-        await application.initialize()
-        print("✅ Telegram application initialized")
-        
-        # Set up bot commands in a simple way
-        print("📝 Setting up bot commands...")
-        commands = [
-            BotCommand("start", "Welcome message & semester links"),
-            BotCommand("help", "Show help message"),
-            BotCommand("semesters", "List all semesters with links"),
-            BotCommand("branches", "List all VTU branches"),
-            BotCommand("about", "Info about Notezy Bot"),
-            BotCommand("feedback", "Send feedback"),
-            # BotCommand("sync", "Sync notes from database (Admin only)"),  # REMOVED
-        ]
-        
+        updates = await loop.run_in_executor(None, pending_updates.take, update_queue.max_size)
+    except PyMongoError as e:
+        logger.warning(f"⚠️ Could not load saved updates: {e}")
+        return
+    queued = sum(1 for update in updates if update_queue.submit(update))
+    if updates:
+        logger.info(f"♻️ Replaying {queued} updates saved by the previous process ({len(updates) - queued} dropped)")
+
+async def initialize_application():
+    """Initialize the Telegram application (get_me etc.), retrying network errors
+    
+    Anything else (an invalid token, bad configuration) will not fix itself: the process exits
+    with prefork.FATAL_EXIT, so it is not restarted, instead of accepting updates it can never
+    handle. Network errors exit with 1 (restarted) after TELEGRAM_INIT_ATTEMPTS tries.
+    """
+    attempts = int(os.getenv("TELEGRAM_INIT_ATTEMPTS", "24"))
+    for attempt in range(1, attempts + 1):
         try:
-            await application.bot.set_my_commands(commands)
-            print("✅ Bot commands registered successfully")
+            await application.initialize()
+            break
+        except (NetworkError, RetryAfter) as e:
+            if attempt == attempts:
+                logger.critical(f"❌ Telegram application initialization failed {attempts} times: {e} - exiting")
+                raise SystemExit(1)
+            delay = 5
+            if isinstance(e, RetryAfter):
+                delay = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+            logger.error(f"❌ Telegram application initialization failed: {e} - retrying in {delay:g}s "
+                         f"({attempt}/{attempts})")
+            await asyncio.sleep(delay)
         except Exception as e:
-            print(f"⚠️ Failed to register commands: {e}")
-        
-        # Set webhook
-        webhook_url = f"{WEBHOOK_URL}/webhook"
-        print(f"🔗 Setting webhook to: {webhook_url}")
-        await application.bot.set_webhook(webhook_url)
-        print(f"✅ Webhook set successfully to {webhook_url}")
-        
-        print("🎉 Startup completed successfully!")
-        
+            logger.critical(f"❌ Telegram application initialization failed: {e!r} - exiting")
+            raise SystemExit(prefork.FATAL_EXIT)
+    application_ready.set()
+    logger.info(f"✅ Telegram application initialized ({STARTUP.mark('telegram_ready'):.2f}s after start)")
+
+async def register_commands():
+    """Publish the bot's command menu"""
+    commands = [
+        BotCommand("start", "Welcome message & semester links"),
+        BotCommand("help", "Show help message"),
+        BotCommand("semesters", "List all semesters with links"),
+        BotCommand("branches", "List all VTU branches"),
+        BotCommand("about", "Info about Notezy Bot"),
+        BotCommand("feedback", "Send feedback"),
+        # BotCommand("sync", "Sync notes from database (Admin only)"),  # REMOVED
+    ]
+    try:
+        await application.bot.set_my_commands(commands)
+        logger.info("✅ Bot commands registered successfully")
     except Exception as e:
-        print(f"❌ Startup failed: {e}")
-        import traceback
-        traceback.print_exc()
-        print("⚠️ Bot may not work correctly, but server will continue running...")
+        logger.warning(f"⚠️ Failed to register commands: {e}")
 
-def main():
-    """Main function for webhook bot"""
-    global db, application, BOT_TOKEN, WEBHOOK_URL
-
-    print("🚀 Starting webhook bot initialization...")
+async def register_webhook():
+    """Point Telegram at this server"""
+    webhook_url = f"{WEBHOOK_URL}/webhook"
+    logger.info(f"🔗 Setting webhook to: {webhook_url}")
+    try:
+        await application.bot.set_webhook(webhook_url, allowed_updates=ALLOWED_UPDATES)
+        logger.info(f"✅ Webhook set successfully to {webhook_url} ({STARTUP.mark('webhook_set'):.2f}s after start)")
+    except Exception as e:
+        logger.error(f"❌ Failed to set webhook: {e}")
 
-    # Initialize database here to avoid import-time connections
-    print("📊 Initializing database...")
+async def reconcile_indexes():
+    """Create missing indexes and run migrations without holding up startup"""
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
     try:
-        db = NotesDatabase()
-        print("✅ Database initialized successfully")
+        await async_db.reconcile_indexes()
+        for store in (deduplicator.store, pending_updates):
+            if store is not None:
+                await loop.run_in_executor(None, store.ensure_indexes)
+        logger.info(f"✅ Indexes reconciled in {time.perf_counter() - started:.1f}s")
     except Exception as e:
-        print(f"❌ Database initialization failed: {e}")
-        raise
+        logger.warning(f"⚠️ Index reconciliation failed: {e}")
+
+async def warm_up_and_go_live():
+    """Warm the caches, then (primary worker only) point the webhook here"""
+    # The snapshot file is shared by the prefork workers: only the primary rewrites it
+    await warm_up(async_db, write_snapshot=prefork.worker_index() == 0)
+    STARTUP.mark("warm")
+    if prefork.worker_index() == 0:
+        await register_webhook()
+
+async def setup_telegram():
+    """Telegram round trips and warm-up, run concurrently while the server already accepts updates"""
+    steps = [initialize_application(), warm_up_and_go_live()]
+    # Commands and the webhook are global to the bot - only the primary worker sets them
+    if prefork.worker_index() == 0:
+        steps.append(register_commands())
+    await asyncio.gather(*steps)
+    logger.info(f"🎉 Worker {prefork.worker_index()} startup completed ({time.perf_counter() - STARTUP.started:.2f}s)")
 
-    # Get environment variables
-    BOT_TOKEN = os.getenv("BOT_TOKEN")
-    PORT = int(os.getenv("PORT", 8080))
-    RENDER_EXTERNAL_HOSTNAME = os.getenv("RENDER_EXTERNAL_HOSTNAME")
+async def on_startup(app):
+    """Start accepting updates right away; Telegram setup, warm-up and index reconciliation run in the background"""
+    global application_ready
+    application_ready = asyncio.Event()  # Queued updates wait on this until get_me has succeeded
+    
+    # Workers that process the updates the webhook acknowledges
+    update_queue.start()
+    
+    app["telegram_setup"] = asyncio.create_task(setup_telegram())
+    app["index_reconcile"] = asyncio.create_task(reconcile_indexes())
+    app["pending_replay"] = asyncio.create_task(replay_pending_updates())
+    app["mongo_ping"] = asyncio.create_task(mongo_ping.run())
+    
+    # Pick up catalog changes made by other workers, replicas and sync scripts
+    app["catalog_watch"] = asyncio.create_task(CatalogWatcher.from_env(db).run())
+    if prefork.worker_index() == 0:
+        app["snapshot_refresh"] = asyncio.create_task(refresh_snapshot_loop())
+    logger.info(f"🚪 Accepting updates {STARTUP.mark('accepting'):.2f}s after start")
+
+async def on_shutdown(app):
+    """Stop taking updates and let the queue drain before the process exits"""
+    app["shutdown_started"] = time.perf_counter()
+    timeout = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "20"))
+    logger.info(f"🛑 Shutting down: draining {update_queue.depth()} queued and {update_queue.busy} "
+                f"running updates (up to {timeout:g}s)...")
+    
+    for task in ("telegram_setup", "index_reconcile", "pending_replay", "catalog_watch", "snapshot_refresh", "mongo_ping"):
+        if task in app:
+            app[task].cancel()
+    
+    leftover, interrupted = await update_queue.drain(timeout)
+    saved = 0
+    if leftover and pending_updates is not None:
+        try:
+            saved = await asyncio.get_running_loop().run_in_executor(None, pending_updates.save, leftover)
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Could not save queued updates: {e}")
+    
+    elapsed = time.perf_counter() - app["shutdown_started"]
+    logger.info(f"✅ Update queue drained in {elapsed:.1f}s - {saved} saved for replay, "
+                f"{len(leftover) - saved} dropped, {interrupted} interrupted")
 
-    print(f"🔧 Environment variables:")
-    print(f"  - BOT_TOKEN: {'***' + BOT_TOKEN[-10:] if BOT_TOKEN else 'NOT SET'}")
-    print(f"  - PORT: {PORT}")
-    print(f"  - RENDER_EXTERNAL_HOSTNAME: {RENDER_EXTERNAL_HOSTNAME}")
+async def on_cleanup(app):
+    """Close the Telegram HTTP client and the MongoDB pool"""
+    try:
+        await application.shutdown()
+        logger.info("✅ Telegram application shut down")
+    except Exception as e:
+        logger.warning(f"⚠️ Telegram application shutdown failed: {e}")
+    
+    async_db.shutdown(wait=False)
+    db.close()
+    elapsed = time.perf_counter() - app.get("shutdown_started", time.perf_counter())
+    logger.info(f"👋 Shutdown completed in {elapsed:.1f}s")
 
-    if not BOT_TOKEN:
-        raise Exception("❌ BOT_TOKEN missing from environment!")
+def create_app() -> web.Application:
+    """Build this process's database, Telegram application and aiohttp app"""
+    global db, async_db, application, update_queue, deduplicator, rate_limiter, pending_updates, mongo_ping
 
-    if not RENDER_EXTERNAL_HOSTNAME:
-        raise Exception("❌ RENDER_EXTERNAL_HOSTNAME missing from environment!")
+    if prefork.is_worker():
+        STARTUP.restart()  # Time this forked worker from its own start
+    
+    # Initialize database here to avoid import-time connections (and per worker process).
+    # Only the ping is waited for; indexes are reconciled and the catalog (shared version,
+    # SEARCH_INDEX) is loaded in the background after startup
+    logger.info(f"📊 Initializing database (worker {prefork.worker_index()})...")
+    try:
+        db = NotesDatabase(ensure_indexes=False, load_catalog=False)
+        async_db = AsyncNotesDatabase(db)
+        mongo_ping = MongoPing.from_env(db)
+        logger.info(f"✅ Database initialized successfully ({STARTUP.mark('db_ready'):.2f}s after start)")
+        
+        # Update de-duplication: in-process, or shared through MongoDB across workers/replicas
+        # (booted from the catalog snapshot while MongoDB is down: in-process only, nothing saved)
+        store = None
+        if os.getenv("DEDUPE_BACKEND", "memory").lower() == "mongo" and not db.offline:
+            store = MongoUpdateStore(db.db, ttl_seconds=int(os.getenv("DEDUPE_TTL", "86400")),
+                                     ensure_indexes=False)
+        deduplicator = UpdateDeduplicator(int(os.getenv("DEDUPE_CAPACITY", "1000")), store)
+        logger.info(f"✅ Update de-duplication: {deduplicator.backend}")
+        
+        pending_updates = None
+        if not db.offline:
+            pending_updates = PendingUpdateStore(db.db, ttl_seconds=int(os.getenv("PENDING_UPDATE_TTL", "3600")),
+                                                 ensure_indexes=False)
+    except Exception as e:
+        logger.error(f"❌ Database initialization failed: {e}")
+        raise
 
-    WEBHOOK_URL = f"https://{RENDER_EXTERNAL_HOSTNAME}"
-    print(f"🌐 Webhook base URL: {WEBHOOK_URL}")
+    rate_limiter = SearchRateLimiter.from_env()
 
     # Create Telegram application
-    print("🤖 Creating Telegram application...")
-    application = ApplicationBuilder().token(BOT_TOKEN).build()
-    print("✅ Telegram application created")
+    logger.info("🤖 Creating Telegram application...")
+    # Handle updates concurrently, but each chat's updates in order; pace outbound calls
+    # to Telegram's flood limits
+    application = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(ChatOrderedUpdateProcessor(int(os.getenv("CONCURRENT_UPDATES", "8"))))
+        .rate_limiter(OutboundScheduler.from_env())
+        .build()
+    )
+    logger.info("✅ Telegram application created")
+    
+    # Queue workers hand updates off to the update processor, which applies the concurrency
+    # limit and per-chat ordering; a worker is only held until the processor has a slot
+    update_queue = UpdateQueue(
+        process_queued_update,
+        workers=int(os.getenv("WEBHOOK_WORKERS", "16")),
+        max_size=int(os.getenv("WEBHOOK_QUEUE_SIZE", "256"))
+    )
     
     # Commands will be set up in the startup handler to avoid event loop conflicts
 
@@ -720,45 +883,88 @@ def main():
     async def error_handler(update: Update, context):
         """Handle Telegram API errors"""
         if isinstance(context.error, Conflict):
-            print("❌ Conflict error: Multiple bot instances detected")
-            print("💡 Make sure only one bot instance is running")
+            logger.error("❌ Conflict error: Multiple bot instances detected")
+            logger.info("💡 Make sure only one bot instance is running")
+        elif isinstance(context.error, RetryAfter):
+            logger.error(f"❌ Telegram flood control persisted after retries: {context.error}")
         else:
-            print(f"❌ Update error: {context.error}")
+            logger.error(f"❌ Update error: {context.error}", exc_info=context.error)
 
     application.add_error_handler(error_handler)
 
     # Add handlers
-    print("📝 Adding command handlers...")
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("semesters", semesters_command))
-    application.add_handler(CommandHandler("branches", branches_command))
-    application.add_handler(CommandHandler("about", about_command))
-    application.add_handler(CommandHandler("feedback", feedback_command))
+    logger.info("📝 Adding command handlers...")
+    application.add_handler(CommandHandler("start", track_handler(start)))
+    application.add_handler(CommandHandler("help", track_handler(help_command)))
+    application.add_handler(CommandHandler("semesters", track_handler(semesters_command)))
+    application.add_handler(CommandHandler("branches", track_handler(branches_command)))
+    application.add_handler(CommandHandler("about", track_handler(about_command)))
+    application.add_handler(CommandHandler("feedback", track_handler(feedback_command)))
     # Sync functionality removed for stability
-    application.add_handler(CallbackQueryHandler(handle_callback))  # Handle button callbacks
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, greeting))  # Handle greetings and search
-    print("✅ Handlers added (SYNC REMOVED)")
+    application.add_handler(CallbackQueryHandler(track_handler(handle_callback)))  # Handle button callbacks
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, track_handler(rate_limiter.limit(greeting))))  # Handle greetings and search
+    logger.info("✅ Handlers added (SYNC REMOVED)")
 
     # Create aiohttp web application
-    print("🌐 Creating aiohttp web application...")
+    logger.info("🌐 Creating aiohttp web application...")
     app = web.Application()
 
     # Add routes
     app.router.add_post('/webhook', webhook_handler)
     app.router.add_get('/', health_check)
     app.router.add_get('/health', health_check)
-    print("✅ Routes added")
+    app.router.add_get('/livez', livez)
+    app.router.add_get('/readyz', readyz)
+    app.router.add_get('/metrics', metrics_handler)
+    logger.info("✅ Routes added")
 
-    # Add startup handler
+    # Add startup and shutdown handlers
     app.on_startup.append(on_startup)
-    print("✅ Startup handler added")
+    app.on_shutdown.append(on_shutdown)
+    app.on_cleanup.append(on_cleanup)
+    logger.info("✅ Startup and shutdown handlers added")
+    return app
 
-    print("🤖 Notezy Bot is starting with webhook...")
-    print(f"🌐 Webhook URL: {WEBHOOK_URL}")
-    print(f"🔌 Port: {PORT}")
-    print("💡 Use /sync command to update notes from database")
+def main():
+    """Main function for webhook bot"""
+    global BOT_TOKEN, WEBHOOK_URL
+
+    configure_logging()
+    logger.info("🚀 Starting webhook bot initialization...")
+
+    # Get environment variables
+    BOT_TOKEN = os.getenv("BOT_TOKEN")
+    PORT = int(os.getenv("PORT", 8080))
+    RENDER_EXTERNAL_HOSTNAME = os.getenv("RENDER_EXTERNAL_HOSTNAME")
+    PROCESSES = int(os.getenv("WEBHOOK_PROCESSES", "1"))
+
+    logger.info("🔧 Environment variables:")
+    logger.info(f"  - BOT_TOKEN: {'***' + BOT_TOKEN[-10:] if BOT_TOKEN else 'NOT SET'}")
+    logger.info(f"  - PORT: {PORT}")
+    logger.info(f"  - RENDER_EXTERNAL_HOSTNAME: {RENDER_EXTERNAL_HOSTNAME}")
+    logger.info(f"  - WEBHOOK_PROCESSES: {PROCESSES}")
+
+    if not BOT_TOKEN:
+        raise Exception("❌ BOT_TOKEN missing from environment!")
+
+    if not RENDER_EXTERNAL_HOSTNAME:
+        raise Exception("❌ RENDER_EXTERNAL_HOSTNAME missing from environment!")
+
+    WEBHOOK_URL = f"https://{RENDER_EXTERNAL_HOSTNAME}"
+    logger.info(f"🌐 Webhook base URL: {WEBHOOK_URL}")
+
+    logger.info("🤖 Notezy Bot is starting with webhook...")
+    logger.info(f"🌐 Webhook URL: {WEBHOOK_URL}")
+    logger.info(f"🔌 Port: {PORT}")
+
+    if PROCESSES > 1:
+        # Redeliveries can land on any worker, so claims must be shared
+        if os.getenv("DEDUPE_BACKEND", "memory").lower() != "mongo":
+            logger.info("💡 Multiple worker processes: using DEDUPE_BACKEND=mongo")
+            os.environ["DEDUPE_BACKEND"] = "mongo"
+        prefork.serve(create_app, "0.0.0.0", PORT, PROCESSES)
+        return
 
     # Start the web server
-    print("🚀 Starting web server...")
-    web.run_app(app, host="0.0.0.0", port=PORT)
+    logger.info("🚀 Starting web server...")
+    web.run_app(create_app(), host="0.0.0.0", port=PORT, print=logger.info)